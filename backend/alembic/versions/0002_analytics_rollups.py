@@ -0,0 +1,44 @@
+"""Daily analytics rollup table
+
+Creates calculator_daily_stats and fills it from the sessions already
+recorded, aggregated by calculator and day. Later sessions are added as
+they are ingested.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('calculator_daily_stats',
+    sa.Column('calculator_id', sa.UUID(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('views', sa.Integer(), nullable=False),
+    sa.Column('completions', sa.Integer(), nullable=False),
+    sa.Column('leads', sa.Integer(), nullable=False),
+    sa.Column('completion_seconds', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['calculator_id'], ['calculators.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('calculator_id', 'day')
+    )
+    op.execute("""
+        INSERT INTO calculator_daily_stats (calculator_id, day, views, completions, leads, completion_seconds)
+        SELECT calculator_id, created_at::date, count(*), count(completed_at), count(lead_email),
+               coalesce(sum(extract(epoch FROM completed_at - created_at)), 0)
+        FROM calculator_sessions
+        GROUP BY calculator_id, created_at::date
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('calculator_daily_stats')
@@ -0,0 +1,36 @@
+"""Result histogram rollup table
+
+Creates calculator_result_buckets. Sessions recorded before this revision
+are added by the backfill job: python -m app.services.analytics_rollup.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 09:15:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('calculator_result_buckets',
+    sa.Column('calculator_id', sa.UUID(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('metric', sa.String(length=255), nullable=False),
+    sa.Column('bucket', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['calculator_id'], ['calculators.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('calculator_id', 'day', 'metric', 'bucket')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('calculator_result_buckets')
@@ -0,0 +1,120 @@
+"""Index and partition calculator_sessions
+
+Rebuilds calculator_sessions as a table range-partitioned by month on
+created_at, with indexes for the analytics and lead queries:
+(calculator_id, created_at), and the same restricted to sessions with a
+lead. The primary key becomes (id, created_at) and session_token loses its
+unique constraint, since unique constraints on a partitioned table must
+include the partition key. Existing rows are copied into partitions covering
+their months; later months are created by app/services/session_partitions.py.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 09:20:00.000000
+
+"""
+from datetime import date, datetime
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+COLUMNS = (
+    "id, calculator_id, session_token, inputs, results, lead_email, lead_name, lead_company, "
+    "ip_address, user_agent, referrer, completed, exported, created_at, completed_at"
+)
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _session_columns(created_at_nullable: bool):
+    return [
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('calculator_id', sa.UUID(), nullable=False),
+        sa.Column('session_token', sa.String(length=255), nullable=False),
+        sa.Column('inputs', sa.JSON(), nullable=True),
+        sa.Column('results', sa.JSON(), nullable=True),
+        sa.Column('lead_email', sa.String(length=255), nullable=True),
+        sa.Column('lead_name', sa.String(length=255), nullable=True),
+        sa.Column('lead_company', sa.String(length=255), nullable=True),
+        sa.Column('ip_address', postgresql.INET(), nullable=True),
+        sa.Column('user_agent', sa.Text(), nullable=True),
+        sa.Column('referrer', sa.Text(), nullable=True),
+        sa.Column('completed', sa.Boolean(), nullable=True),
+        sa.Column('exported', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'),
+                  nullable=created_at_nullable),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['calculator_id'], ['calculators.id'], ondelete='CASCADE',
+                                name='calculator_sessions_calculator_id_fkey'),
+    ]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    op.rename_table('calculator_sessions', 'calculator_sessions_unpartitioned')
+    op.execute("ALTER INDEX calculator_sessions_pkey RENAME TO calculator_sessions_unpartitioned_pkey")
+    op.execute("ALTER INDEX ix_calculator_sessions_session_token RENAME TO ix_calculator_sessions_unpartitioned_token")
+
+    op.create_table('calculator_sessions',
+    *_session_columns(created_at_nullable=False),
+    sa.PrimaryKeyConstraint('id', 'created_at', name='calculator_sessions_pkey'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+
+    # Monthly partitions from the oldest session through a few months ahead, plus a catch-all
+    oldest = None
+    if not context.is_offline_mode():
+        oldest = bind.execute(sa.text("SELECT min(created_at) FROM calculator_sessions_unpartitioned")).scalar()
+    month = (oldest or datetime.utcnow()).date().replace(day=1)
+    last = _add_months(datetime.utcnow().date().replace(day=1), MONTHS_AHEAD)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE calculator_sessions_p{month:%Y%m} PARTITION OF calculator_sessions "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+    op.execute("CREATE TABLE calculator_sessions_default PARTITION OF calculator_sessions DEFAULT")
+
+    op.execute(
+        f"INSERT INTO calculator_sessions ({COLUMNS}) "
+        f"SELECT {COLUMNS.replace('created_at,', 'COALESCE(created_at, now()),')} "
+        f"FROM calculator_sessions_unpartitioned"
+    )
+    op.drop_table('calculator_sessions_unpartitioned')
+
+    # Indexes are built after the copy, which is faster than maintaining them row by row
+    op.create_index(op.f('ix_calculator_sessions_session_token'), 'calculator_sessions', ['session_token'], unique=False)
+    op.create_index('ix_calculator_sessions_calculator_created', 'calculator_sessions',
+                    ['calculator_id', 'created_at'], unique=False)
+    op.create_index('ix_calculator_sessions_leads', 'calculator_sessions', ['calculator_id', 'created_at'],
+                    unique=False, postgresql_where=sa.text('lead_email IS NOT NULL'))
+
+
+def downgrade() -> None:
+    op.rename_table('calculator_sessions', 'calculator_sessions_partitioned')
+    op.execute("ALTER INDEX calculator_sessions_pkey RENAME TO calculator_sessions_partitioned_pkey")
+    op.execute("ALTER INDEX ix_calculator_sessions_session_token RENAME TO ix_calculator_sessions_partitioned_token")
+    op.execute("ALTER INDEX ix_calculator_sessions_calculator_created RENAME TO ix_calculator_sessions_partitioned_created")
+    op.execute("ALTER INDEX ix_calculator_sessions_leads RENAME TO ix_calculator_sessions_partitioned_leads")
+
+    op.create_table('calculator_sessions',
+    *_session_columns(created_at_nullable=True),
+    sa.PrimaryKeyConstraint('id', name='calculator_sessions_pkey')
+    )
+    op.execute(f"INSERT INTO calculator_sessions ({COLUMNS}) SELECT {COLUMNS} FROM calculator_sessions_partitioned")
+    op.drop_table('calculator_sessions_partitioned')  # Drops its partitions too
+    op.create_index(op.f('ix_calculator_sessions_session_token'), 'calculator_sessions', ['session_token'], unique=True)
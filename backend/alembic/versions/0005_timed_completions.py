@@ -0,0 +1,30 @@
+"""Count timed completions in the daily rollups
+
+Sessions only have a duration when the client reports when they started;
+the average time to complete divides by these rather than all completions.
+Existing days count as untimed.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 14:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('calculator_daily_stats',
+                  sa.Column('timed_completions', sa.Integer(), nullable=False, server_default='0'))
+    op.execute("UPDATE calculator_daily_stats SET completion_seconds = 0")
+
+
+def downgrade() -> None:
+    op.drop_column('calculator_daily_stats', 'timed_completions')
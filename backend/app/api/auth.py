@@ -1,44 +1,45 @@
 """Authentication API endpoints"""
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..database import get_db
 from ..schemas.auth import UserSignup, UserLogin, AuthResponse, TokenResponse, RefreshTokenRequest, UserResponse
 from ..services.auth_service import AuthService
-from ..middleware.auth import get_current_user
+from ..services.passwords import get_password_hasher
+from ..middleware.auth import get_current_user, require_admin
 from ..models.user import User
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
 
 
 @router.post("/signup", response_model=AuthResponse, status_code=status.HTTP_201_CREATED)
-def signup(signup_data: UserSignup, db: Session = Depends(get_db)):
+async def signup(signup_data: UserSignup, request: Request, db: AsyncSession = Depends(get_db)):
     """
     Register a new user and organization.
 
     Creates a new organization and user account with a 14-day free trial.
     Returns user data, organization data, and authentication tokens.
     """
-    return AuthService.signup(db, signup_data)
+    return await AuthService.signup(db, signup_data, request.client.host if request.client else None)
 
 
 @router.post("/login", response_model=AuthResponse)
-def login(login_data: UserLogin, db: Session = Depends(get_db)):
+async def login(login_data: UserLogin, request: Request, db: AsyncSession = Depends(get_db)):
     """
     Authenticate user and get tokens.
 
     Returns user data, organization data, and authentication tokens.
     """
-    return AuthService.login(db, login_data)
+    return await AuthService.login(db, login_data, request.client.host if request.client else None)
 
 
 @router.post("/refresh", response_model=TokenResponse)
-def refresh_token(refresh_data: RefreshTokenRequest, db: Session = Depends(get_db)):
+async def refresh_token(refresh_data: RefreshTokenRequest, db: AsyncSession = Depends(get_db)):
     """
     Refresh access token using refresh token.
 
     Returns new access token and refresh token.
     """
-    return AuthService.refresh_token(db, refresh_data.refresh_token)
+    return await AuthService.refresh_token(db, refresh_data.refresh_token)
 
 
 @router.get("/me", response_model=UserResponse)
@@ -51,6 +52,17 @@ def get_me(current_user: User = Depends(get_current_user)):
     return UserResponse.model_validate(current_user)
 
 
+@router.get("/password-pool", dependencies=[Depends(require_admin)])
+def password_pool_stats():
+    """
+    Password hashing pool occupancy.
+
+    Returns workers, jobs in flight and queued, and rejected/throttled counts.
+    Requires an admin.
+    """
+    return get_password_hasher().stats()
+
+
 @router.post("/logout")
 def logout():
     """
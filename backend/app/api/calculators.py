@@ -1,11 +1,14 @@
 """Calculator API endpoints"""
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
 from typing import Optional
 from uuid import UUID
 
 from ..database import get_db
-from ..middleware.auth import get_current_user, get_current_organization, get_optional_user
+from ..middleware.auth import (
+    get_current_user, get_current_organization, get_optional_user, get_optional_api_key_principal
+)
 from ..models.user import User
 from ..models.organization import Organization
 from ..schemas.calculator import (
@@ -13,15 +16,16 @@ from ..schemas.calculator import (
     CalculatorListResponse, SessionCreate, SessionResponse,
     LeadCaptureRequest, AnalyticsResponse
 )
+from ..services.api_keys import APIKeyPrincipal
 from ..services.calculator_service import CalculatorService
 
 router = APIRouter(prefix="/api/calculators", tags=["Calculators"])
 
 
 @router.post("", response_model=CalculatorResponse, status_code=status.HTTP_201_CREATED)
-def create_calculator(
+async def create_calculator(
     calculator_data: CalculatorCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -30,16 +34,16 @@ def create_calculator(
     Creates a calculator for the user's organization.
     Calculator is created in draft status by default.
     """
-    calculator = CalculatorService.create_calculator(db, current_user, calculator_data)
+    calculator = await CalculatorService.create_calculator(db, current_user, calculator_data)
     return CalculatorResponse.model_validate(calculator)
 
 
 @router.get("", response_model=CalculatorListResponse)
-def list_calculators(
+async def list_calculators(
     page: int = 1,
     page_size: int = 20,
     status: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_org: Organization = Depends(get_current_organization)
 ):
     """
@@ -47,15 +51,15 @@ def list_calculators(
 
     Supports pagination and filtering by status.
     """
-    return CalculatorService.list_calculators(
+    return await CalculatorService.list_calculators(
         db, current_org.id, page, page_size, status
     )
 
 
 @router.get("/{calculator_id}", response_model=CalculatorResponse)
-def get_calculator(
+async def get_calculator(
     calculator_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_org: Organization = Depends(get_current_organization)
 ):
     """
@@ -63,15 +67,15 @@ def get_calculator(
 
     Only returns calculators owned by the user's organization.
     """
-    calculator = CalculatorService.get_calculator(db, calculator_id, current_org.id)
+    calculator = await CalculatorService.get_calculator(db, calculator_id, current_org.id)
     return CalculatorResponse.model_validate(calculator)
 
 
 @router.patch("/{calculator_id}", response_model=CalculatorResponse)
-def update_calculator(
+async def update_calculator(
     calculator_id: UUID,
     update_data: CalculatorUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_org: Organization = Depends(get_current_organization)
 ):
     """
@@ -79,16 +83,16 @@ def update_calculator(
 
     Can update name, description, config, or status.
     """
-    calculator = CalculatorService.update_calculator(
+    calculator = await CalculatorService.update_calculator(
         db, calculator_id, current_org.id, update_data
     )
     return CalculatorResponse.model_validate(calculator)
 
 
 @router.delete("/{calculator_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_calculator(
+async def delete_calculator(
     calculator_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_org: Organization = Depends(get_current_organization)
 ):
     """
@@ -96,13 +100,13 @@ def delete_calculator(
 
     Permanently deletes the calculator and all associated sessions.
     """
-    CalculatorService.delete_calculator(db, calculator_id, current_org.id)
+    await CalculatorService.delete_calculator(db, calculator_id, current_org.id)
 
 
 @router.post("/{calculator_id}/publish", response_model=CalculatorResponse)
-def publish_calculator(
+async def publish_calculator(
     calculator_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_org: Organization = Depends(get_current_organization)
 ):
     """
@@ -110,14 +114,14 @@ def publish_calculator(
 
     Makes the calculator publicly accessible via embed/public URL.
     """
-    calculator = CalculatorService.publish_calculator(db, calculator_id, current_org.id)
+    calculator = await CalculatorService.publish_calculator(db, calculator_id, current_org.id)
     return CalculatorResponse.model_validate(calculator)
 
 
 @router.get("/{calculator_id}/analytics", response_model=AnalyticsResponse)
-def get_calculator_analytics(
+async def get_calculator_analytics(
     calculator_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_org: Organization = Depends(get_current_organization)
 ):
     """
@@ -125,16 +129,26 @@ def get_calculator_analytics(
 
     Returns views, completions, conversion rate, leads captured, etc.
     """
-    return CalculatorService.get_analytics(db, calculator_id, current_org.id)
+    return await CalculatorService.get_analytics(db, calculator_id, current_org.id)
+
+
+# Public endpoints (no auth required; server-to-server callers may send an X-API-Key)
 
+def _check_api_key_organization(api_key: Optional[APIKeyPrincipal], calculator: CalculatorResponse) -> None:
+    """An API key, when sent, must belong to the calculator's organization"""
+    if api_key is not None and api_key.organization.id != calculator.organization_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="API key does not belong to this calculator's organization"
+        )
 
-# Public endpoints (no auth required)
 
 @router.get("/public/{org_slug}/{calc_slug}", response_model=CalculatorResponse)
-def get_public_calculator(
+async def get_public_calculator(
     org_slug: str,
     calc_slug: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    api_key: Optional[APIKeyPrincipal] = Depends(get_optional_api_key_principal)
 ):
     """
     Get a published calculator by organization and calculator slug.
@@ -142,8 +156,9 @@ def get_public_calculator(
     This is a public endpoint - no authentication required.
     Used for rendering the calculator embed/public page.
     """
-    calculator = CalculatorService.get_calculator_by_slug(db, org_slug, calc_slug)
-    return CalculatorResponse.model_validate(calculator)
+    calculator = await CalculatorService.get_published_calculator(db, org_slug, calc_slug)
+    _check_api_key_organization(api_key, calculator)
+    return calculator
 
 
 @router.post("/public/{org_slug}/{calc_slug}/calculate", response_model=SessionResponse)
@@ -152,16 +167,22 @@ async def calculate_public(
     calc_slug: str,
     inputs: dict,
     request: Request,
-    db: Session = Depends(get_db)
+    started_at: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+    api_key: Optional[APIKeyPrincipal] = Depends(get_optional_api_key_principal)
 ):
     """
     Calculate results for a public calculator.
 
     Creates a session with the provided inputs and returns results.
-    This is a public endpoint - no authentication required.
+    The embed passes started_at, when the visitor opened the calculator,
+    for the average time to complete.
+    This is a public endpoint - no authentication required. Integrations
+    calling it server-to-server authenticate with an X-API-Key header.
     """
     # Get calculator
-    calculator = CalculatorService.get_calculator_by_slug(db, org_slug, calc_slug)
+    calculator = await CalculatorService.get_published_calculator(db, org_slug, calc_slug)
+    _check_api_key_organization(api_key, calculator)
 
     # Extract tracking info
     ip_address = request.client.host if request.client else None
@@ -169,17 +190,17 @@ async def calculate_public(
     referrer = request.headers.get("referer")
 
     # Create session and calculate
-    session = CalculatorService.create_session(
-        db, calculator, inputs, ip_address, user_agent, referrer
+    session = await CalculatorService.create_session(
+        db, calculator, inputs, ip_address, user_agent, referrer, started_at
     )
 
     return SessionResponse.model_validate(session)
 
 
 @router.post("/sessions/capture-lead", response_model=SessionResponse)
-def capture_lead(
+async def capture_lead(
     lead_data: LeadCaptureRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Capture lead information for a session.
@@ -187,5 +208,5 @@ def capture_lead(
     This is a public endpoint - no authentication required.
     Used when user provides email after seeing results.
     """
-    session = CalculatorService.capture_lead(db, lead_data.session_token, lead_data)
+    session = await CalculatorService.capture_lead(db, lead_data.session_token, lead_data)
     return SessionResponse.model_validate(session)
@@ -1,11 +1,433 @@
 import math
 from typing import List, Dict, Tuple, Optional
+import numpy as np
 from .models import DealInputs, YearResult, Results, IntentRow
 
 
+YEARS = 5
+
+# YearResult fields produced by yearly_arrays, in model order
+YEAR_FIELDS = (
+    "baseline_minutes", "automated_minutes", "handoff_minutes", "human_minutes",
+    "baseline_cost", "ai_cost", "ops_savings", "revenue_retained",
+    "total_value", "cumulative_value", "discounted_value",
+)
+
+# IntentRow fields used by the kernels (a missing revenue_per_abandon packs as 0)
+INTENT_FIELDS = ("volume_share", "avg_minutes", "containment_m3", "handoff_minutes", "revenue_per_abandon")
+
+# Global variables perturbed by the tornado analysis and their +/- swing
+TORNADO_VARS = (
+    ("agent_cost_per_min", 0.2),
+    ("polyai_cost_per_min", 0.2),
+    ("volume_growth", 0.1),
+    ("discount_rate", 0.1),
+)
+
+PAYBACK_HORIZON_MONTHS = 36
+RAMP_MONTHS = 3
+
+# Relative half-width of the triangular distribution sampled for each driver
+MONTE_CARLO_SPREADS = (
+    ("agent_cost_per_min", 0.1),
+    ("telco_cost_per_min", 0.1),
+    ("polyai_cost_per_min", 0.1),
+    ("volume_growth", 0.1),
+    ("discount_rate", 0.1),
+)
+MONTE_CARLO_CONTAINMENT_SPREAD = 0.2
+
+
+def pack_intents(intents: List[IntentRow]) -> Dict[str, np.ndarray]:
+    """Pack intent rows into column arrays of shape (n_intents,)"""
+    return {
+        name: np.array([getattr(intent, name) or 0.0 for intent in intents], dtype=float)
+        for name in INTENT_FIELDS
+    }
+
+
+def pack_params(inputs: DealInputs) -> Dict[str, float]:
+    """Extract the global deal parameters used by the kernels"""
+    return {
+        "annual_calls": float(inputs.annual_calls),
+        "agent_cost_per_min": inputs.agent_cost_per_min,
+        "telco_cost_per_min": inputs.telco_cost_per_min,
+        "polyai_cost_per_min": inputs.polyai_cost_per_min,
+        "acw_minutes": inputs.acw_minutes,
+        "abandon_delta": inputs.baseline_abandon_rate - inputs.ai_abandon_rate,
+        "inflation": inputs.inflation,
+        "volume_growth": inputs.volume_growth,
+        "discount_rate": inputs.discount_rate,
+        "risk_adjustment": inputs.risk_adjustment,
+    }
+
+
+def _dot(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Sum a * b over the trailing intent axis, broadcasting leading batch axes"""
+    return np.einsum("...i,...i->...", a, b)
+
+
+def intent_terms(cols: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Per-intent contributions to the per-call sums, shape (..., n_intents).
+
+    Summing these over the intent axis gives the inputs of per_call_from_sums;
+    keeping them unreduced lets callers update single intents in place.
+    """
+    share = cols["volume_share"]
+    talk = share * cols["avg_minutes"]
+    handoff = share * cols["handoff_minutes"]
+    m3 = cols["containment_m3"]
+
+    return {
+        "share": share,
+        "talk": talk,
+        "handoff": handoff,
+        "automated": talk * m3,
+        "contained_handoff": handoff * m3,
+        "revenue": share * cols["revenue_per_abandon"],
+    }
+
+
+def per_call_from_sums(sums: Dict[str, np.ndarray], params: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Turn intent sums (see intent_terms) into minutes and revenue per offered call"""
+    acw = np.asarray(params["acw_minutes"], dtype=float)
+    # Risk adjustment scales every intent's containment, so it factors out of the sums
+    kept = 1 - np.asarray(params["risk_adjustment"], dtype=float)
+
+    automated = kept * sums["automated"]
+    contained_handoff = kept * sums["contained_handoff"]
+    talk_total = sums["talk"]
+    acw_total = sums["share"] * acw
+
+    return {
+        "baseline": talk_total + acw_total,
+        "automated": automated,
+        "handoff": sums["handoff"] - contained_handoff,
+        "contained_handoff": contained_handoff,
+        "human": (talk_total - automated) + (sums["handoff"] - contained_handoff) + acw_total,
+        "revenue": np.asarray(params["abandon_delta"], dtype=float) * sums["revenue"],
+    }
+
+
+def per_call_minutes(cols: Dict[str, np.ndarray], params: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Reduce the intent columns to minutes (and revenue) per offered call.
+
+    Every per-intent quantity is linear in call volume, so the intent sum can be
+    taken once and scaled by each period's call count afterwards. Intent columns
+    have shape (..., n_intents) and parameters broadcast against the leading
+    batch shape; results have the batch shape.
+    """
+    share = cols["volume_share"]
+    talk = share * cols["avg_minutes"]
+    handoff = share * cols["handoff_minutes"]
+    m3 = cols["containment_m3"]
+
+    sums = {
+        "share": share.sum(axis=-1),
+        "talk": talk.sum(axis=-1),
+        "handoff": handoff.sum(axis=-1),
+        "automated": _dot(talk, m3),
+        "contained_handoff": _dot(handoff, m3),
+        "revenue": _dot(share, cols["revenue_per_abandon"]),
+    }
+    return per_call_from_sums(sums, params)
+
+
+def yearly_arrays(cols: Dict[str, np.ndarray], params: Dict[str, np.ndarray], years: int = YEARS) -> Dict[str, np.ndarray]:
+    """
+    Compute the year-by-year breakdown as arrays of shape (..., years).
+
+    Accepts either a single deal (scalar parameters, (n_intents,) columns) or a
+    batch of perturbed deals stacked along leading axes.
+    """
+    return yearly_from_per_call(per_call_minutes(cols, params), params, years)
+
+
+def yearly_from_per_call(per_call: Dict[str, np.ndarray], params: Dict[str, np.ndarray],
+                         years: int = YEARS) -> Dict[str, np.ndarray]:
+    """Year-by-year breakdown from already reduced per-call minutes"""
+    year = np.arange(years)
+
+    def per_year(name: str) -> np.ndarray:
+        return np.asarray(params[name], dtype=float)[..., None]
+
+    calls = per_year("annual_calls") * (1 + per_year("volume_growth")) ** year
+    inflation_factor = (1 + per_year("inflation")) ** year
+    agent_cost = per_year("agent_cost_per_min") * inflation_factor
+    telco_cost = per_year("telco_cost_per_min") * inflation_factor
+    polyai_cost = per_year("polyai_cost_per_min") * inflation_factor
+
+    baseline_minutes = calls * per_call["baseline"][..., None]
+    automated_minutes = calls * per_call["automated"][..., None]
+    handoff_minutes = calls * per_call["handoff"][..., None]
+    human_minutes = calls * per_call["human"][..., None]
+    revenue_retained = calls * per_call["revenue"][..., None]
+
+    baseline_cost = baseline_minutes * (agent_cost + telco_cost)
+    ai_cost = (automated_minutes * (polyai_cost + telco_cost) +
+               human_minutes * (agent_cost + telco_cost))
+
+    ops_savings = baseline_cost - ai_cost
+    total_value = ops_savings + revenue_retained
+
+    return {
+        "baseline_minutes": baseline_minutes,
+        "automated_minutes": automated_minutes,
+        "handoff_minutes": handoff_minutes,
+        "human_minutes": human_minutes,
+        "baseline_cost": baseline_cost,
+        "ai_cost": ai_cost,
+        "ops_savings": ops_savings,
+        "revenue_retained": revenue_retained,
+        "total_value": total_value,
+        "cumulative_value": np.cumsum(total_value, axis=-1),
+        "discounted_value": total_value / (1 + per_year("discount_rate")) ** year,
+    }
+
+
+def deal_totals(cols: Dict[str, np.ndarray], params: Dict[str, np.ndarray], years: int = YEARS) -> Dict[str, np.ndarray]:
+    """
+    NPV and total baseline/AI cost over the horizon, without the yearly breakdown.
+
+    Per-call costs are fixed per deal, so the year sums collapse to a few
+    weighted sums of the call/inflation/discount factors. Used where only the
+    headline figures of many deals are needed.
+    """
+    return deal_totals_from_per_call(per_call_minutes(cols, params), params, years)
+
+
+def deal_totals_from_per_call(per_call: Dict[str, np.ndarray], params: Dict[str, np.ndarray],
+                              years: int = YEARS) -> Dict[str, np.ndarray]:
+    """Headline totals (see deal_totals) from already reduced per-call minutes"""
+    agent = np.asarray(params["agent_cost_per_min"], dtype=float)
+    telco = np.asarray(params["telco_cost_per_min"], dtype=float)
+    polyai = np.asarray(params["polyai_cost_per_min"], dtype=float)
+    volume_base = 1 + np.asarray(params["volume_growth"], dtype=float)
+    inflation_base = 1 + np.asarray(params["inflation"], dtype=float)
+    discount_base = 1 + np.asarray(params["discount_rate"], dtype=float)
+
+    # Year sums of calls, inflated calls and their discounted values, over flat per-deal arrays
+    calls = np.asarray(params["annual_calls"], dtype=float)
+    inflation_factor, discount = np.ones_like(inflation_base), np.ones_like(discount_base)
+    inflated_calls_sum = discounted_inflated_calls = discounted_calls = 0.0
+    for year in range(years):
+        if year:
+            calls = calls * volume_base
+            inflation_factor = inflation_factor * inflation_base
+            discount = discount * discount_base
+        inflated_calls = calls * inflation_factor
+        inflated_calls_sum = inflated_calls_sum + inflated_calls
+        discounted_inflated_calls = discounted_inflated_calls + inflated_calls / discount
+        discounted_calls = discounted_calls + calls / discount
+
+    baseline_cost = per_call["baseline"] * (agent + telco)
+    ai_cost = per_call["automated"] * (polyai + telco) + per_call["human"] * (agent + telco)
+
+    return {
+        "npv_5y": (baseline_cost - ai_cost) * discounted_inflated_calls + per_call["revenue"] * discounted_calls,
+        "baseline_cost": baseline_cost * inflated_calls_sum,
+        "ai_cost": ai_cost * inflated_calls_sum,
+    }
+
+
+def payback_months(cols: Dict[str, np.ndarray], params: Dict[str, np.ndarray],
+                   horizon: int = PAYBACK_HORIZON_MONTHS, fractional: bool = False) -> np.ndarray:
+    """
+    Months until cumulative value turns non-negative, NaN if not within horizon.
+
+    Monthly value is linear in the Q1 containment ramp and otherwise only changes
+    at year boundaries, so the horizon splits into a handful of segments of
+    constant monthly value (one per ramp month, then one per year). The crossing
+    is located per segment in closed form instead of accumulating every month.
+
+    By default the result is the whole month in which payback is reached; with
+    fractional=True the crossing is linearly interpolated within that month.
+    """
+    return payback_from_per_call(per_call_minutes(cols, params), params, horizon, fractional)
+
+
+def payback_from_per_call(per_call: Dict[str, np.ndarray], params: Dict[str, np.ndarray],
+                          horizon: int = PAYBACK_HORIZON_MONTHS, fractional: bool = False) -> np.ndarray:
+    """Payback months (see payback_months) from already reduced per-call minutes"""
+    agent = np.asarray(params["agent_cost_per_min"], dtype=float)
+    telco = np.asarray(params["telco_cost_per_min"], dtype=float)
+    polyai = np.asarray(params["polyai_cost_per_min"], dtype=float)
+
+    # value per call = inflation * (ramp * ramped - fixed) + revenue
+    ramped = per_call["automated"] * (agent - polyai) + per_call["contained_handoff"] * (agent + telco)
+    fixed = (per_call["handoff"] + per_call["contained_handoff"]) * (agent + telco)
+
+    bounds = np.unique(np.concatenate([
+        np.arange(min(RAMP_MONTHS, horizon) + 1), np.arange(12, horizon, 12), [horizon]
+    ]))
+    start, length = bounds[:-1], np.diff(bounds)
+    ramp = np.minimum((start + 1) / RAMP_MONTHS, 1.0)
+
+    monthly_calls = np.asarray(params["annual_calls"], dtype=float) / 12
+    volume_base = 1 + np.asarray(params["volume_growth"], dtype=float)
+    inflation_base = 1 + np.asarray(params["inflation"], dtype=float)
+    calls, inflation_factor = monthly_calls, np.ones_like(inflation_base)
+
+    # Segments are walked in order over flat per-deal arrays, carrying the running
+    # total; deals keep the first segment in which they pay back
+    shape = np.broadcast(ramped, fixed, per_call["revenue"], calls).shape
+    payback = np.full(shape, np.nan)
+    before = np.zeros(shape)
+    for segment_start, segment_length, segment_ramp, year in zip(start, length, ramp, start // 12):
+        if year and segment_start == 12 * year:
+            calls = calls * volume_base
+            inflation_factor = inflation_factor * inflation_base
+        value = calls * (inflation_factor * (segment_ramp * ramped - fixed) + per_call["revenue"])
+
+        # First month within the segment where the running total reaches zero
+        with np.errstate(divide="ignore", invalid="ignore"):
+            month = np.where(
+                before + value >= 0, 1.0,
+                np.where(value > 0, np.ceil(-before / value), np.inf)
+            )
+            offset = np.where(before >= 0, 0.0, -before / value) if fractional else month
+        payback = np.where(np.isnan(payback) & (month <= segment_length), segment_start + offset, payback)
+        if not np.isnan(payback).any():
+            break  # Every deal has paid back; later segments can't change the result
+        before = before + value * segment_length
+
+    return payback
+
+
+def pack_batch(deals: List[DealInputs]) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """
+    Stack deals into (n_deals, max_intents) columns and (n_deals,) parameters.
+
+    Deals with fewer intents are padded with zero-share rows, which contribute
+    nothing to any minute, cost or revenue sum.
+    """
+    counts = [len(deal.intents) for deal in deals]
+    intents = [intent for deal in deals for intent in deal.intents]
+    rows = np.repeat(np.arange(len(deals)), counts)
+    positions = np.arange(len(intents)) - np.repeat(np.cumsum(counts) - counts, counts)
+    
+    cols = {}
+    for name in INTENT_FIELDS:
+        cols[name] = np.zeros((len(deals), max(counts)))
+        cols[name][rows, positions] = [getattr(intent, name) or 0.0 for intent in intents]
+    
+    param_rows = [pack_params(deal) for deal in deals]
+    params = {name: np.array([row[name] for row in param_rows]) for name in param_rows[0]}
+    
+    return cols, params
+
+
+def tornado_deltas(cols: Dict[str, np.ndarray], params: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Half the NPV swing of each tornado driver, shape (..., n_intents + len(TORNADO_VARS)).
+
+    Every high/low perturbation becomes one row of a stacked parameter matrix:
+    intents first (containment +/-20%), then the global variables.
+    """
+    m3 = cols["containment_m3"]
+    n_intents = m3.shape[-1]
+    n_rows = 2 * (n_intents + len(TORNADO_VARS))
+    idx = np.arange(n_intents)
+
+    containment = np.repeat(m3[..., None, :], n_rows, axis=-2)
+    containment[..., 2 * idx, idx] = np.minimum(1.0, m3 * 1.2)
+    containment[..., 2 * idx + 1, idx] = np.maximum(0.0, m3 * 0.8)
+
+    row_params = {
+        name: np.repeat(np.asarray(value, dtype=float)[..., None], n_rows, axis=-1)
+        for name, value in params.items()
+    }
+    for offset, (var_name, delta_pct) in enumerate(TORNADO_VARS):
+        row = 2 * (n_intents + offset)
+        row_params[var_name][..., row] = np.asarray(params[var_name]) * (1 + delta_pct)
+        row_params[var_name][..., row + 1] = np.asarray(params[var_name]) * (1 - delta_pct)
+
+    row_cols = {name: col[..., None, :] for name, col in cols.items()}
+    row_cols["containment_m3"] = containment
+
+    npv = yearly_arrays(row_cols, row_params)["discounted_value"].sum(axis=-1)
+    return np.abs(npv[..., 0::2] - npv[..., 1::2]) / 2
+
+
+def scenario_npvs(cols: Dict[str, np.ndarray], params: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    NPV of the base, P10 and P90 3-point scenarios, shape (..., 3).
+
+    P10 (pessimistic): reduce containment by 20%, increase costs by 10%
+    P90 (optimistic): increase containment by 20%, reduce costs by 10%
+    """
+    m3 = cols["containment_m3"]
+    cost_factor = np.array([1.0, 1.1, 0.9])
+
+    row_params = {name: np.asarray(value, dtype=float)[..., None] for name, value in params.items()}
+    row_params["agent_cost_per_min"] = row_params["agent_cost_per_min"] * cost_factor
+    row_params["polyai_cost_per_min"] = row_params["polyai_cost_per_min"] * cost_factor
+
+    row_cols = {name: col[..., None, :] for name, col in cols.items()}
+    row_cols["containment_m3"] = np.stack([m3, m3 * 0.8, np.minimum(1.0, m3 * 1.2)], axis=-2)
+
+    return yearly_arrays(row_cols, row_params)["discounted_value"].sum(axis=-1)
+
+
+def _top_drivers(labels: List[str], deltas: List[float]) -> List[Tuple[str, float]]:
+    sensitivities = list(zip(labels, deltas))
+    
+    # Sort by impact and take top 5
+    sensitivities.sort(key=lambda x: x[1], reverse=True)
+    return sensitivities[:5]
+
+
+def standard_triangular(rng: np.random.Generator, c: np.ndarray, size: Tuple[int, ...],
+                        dtype: type = np.float64) -> np.ndarray:
+    """
+    Sample a triangular distribution on [0, 1] with relative mode c.
+
+    Uses the min/max construction: c * max(U, V) + (1 - c) * min(U, V) is
+    triangular with mode c, avoiding the branch of the inverse CDF. With
+    S = U + V and D = |U - V| that is S / 2 + (c - 1/2) * D, computed in
+    place in the two uniform buffers.
+    """
+    u = rng.random(size, dtype=dtype)
+    v = rng.random(size, dtype=dtype)
+    u += v          # S
+    v *= 2
+    v -= u          # V - U
+    np.abs(v, out=v)
+    u *= 0.5
+    v *= (np.asarray(c) - 0.5).astype(dtype)
+    u += v
+    return u
+
+
+def triangular(rng: np.random.Generator, low: np.ndarray, mode: np.ndarray, high: np.ndarray,
+               size: Tuple[int, ...]) -> np.ndarray:
+    """Sample a triangular distribution (tolerates low == high)"""
+    width = high - low
+    c = np.divide(mode - low, width, out=np.zeros_like(width * 1.0), where=width > 0)
+    sample = standard_triangular(rng, c, size)
+    sample *= width
+    sample += low
+    return sample
+
+
+def _percentiles(values: np.ndarray, method: str = "linear") -> Dict[str, Optional[float]]:
+    p10, p50, p90 = np.percentile(values, [10, 50, 90], method=method).tolist()
+    return {
+        key: (value if math.isfinite(value) else None)
+        for key, value in (("p10", p10), ("p50", p50), ("p90", p90))
+    }
+
+
 class ROICalculator:
-    def __init__(self, inputs: DealInputs):
+    def __init__(self, inputs: DealInputs, draws: int = 0, seed: Optional[int] = None,
+                 payback_horizon: int = PAYBACK_HORIZON_MONTHS, fractional_payback: bool = False):
         self.inputs = inputs
+        self.draws = draws  # Monte Carlo draws; 0 keeps the 3-point scenario estimate
+        self.seed = seed
+        self.payback_horizon = payback_horizon
+        self.fractional_payback = fractional_payback
     
     def calculate(self) -> Results:
         yearly_results = self._calculate_yearly_results()
@@ -14,7 +436,8 @@ class ROICalculator:
         npv_5y = sum(yr.discounted_value for yr in yearly_results)
         ops_vs_revenue = self._calculate_ops_vs_revenue_split(yearly_results)
         tornado = self._calculate_tornado()
-        p10_p50_p90 = self._calculate_scenarios()
+        distribution = self._simulate() if self.draws else None
+        p10_p50_p90 = distribution["npv_5y"] if distribution else self._calculate_scenarios()
         
         return Results(
             payback_months=payback_months,
@@ -23,123 +446,39 @@ class ROICalculator:
             ops_vs_revenue_split=ops_vs_revenue,
             tornado=tornado,
             p10_p50_p90=p10_p50_p90,
+            distribution=distribution,
             yearly=yearly_results
         )
     
+    def _yearly_arrays(self) -> Dict[str, np.ndarray]:
+        return yearly_arrays(pack_intents(self.inputs.intents), pack_params(self.inputs))
+    
+    def _payback_array(self) -> np.ndarray:
+        return payback_months(
+            pack_intents(self.inputs.intents), pack_params(self.inputs),
+            self.payback_horizon, self.fractional_payback
+        )
+    
+    def _tornado_deltas(self) -> np.ndarray:
+        return tornado_deltas(pack_intents(self.inputs.intents), pack_params(self.inputs))
+    
+    def _scenario_npvs(self) -> np.ndarray:
+        return scenario_npvs(pack_intents(self.inputs.intents), pack_params(self.inputs))
+    
     def _calculate_yearly_results(self) -> List[YearResult]:
-        results = []
-        cumulative_value = 0.0
-        
-        for year in range(5):
-            calls_y = self.inputs.annual_calls * ((1 + self.inputs.volume_growth) ** year)
-            
-            baseline_minutes = 0.0
-            automated_minutes = 0.0
-            handoff_minutes = 0.0
-            human_minutes = 0.0
-            revenue_retained = 0.0
-            
-            for intent in self.inputs.intents:
-                # Apply risk adjustment to containment
-                containment = intent.containment_m3 * (1 - self.inputs.risk_adjustment)
-                
-                base_intent_minutes = calls_y * intent.volume_share * (intent.avg_minutes + self.inputs.acw_minutes)
-                auto_min = calls_y * intent.volume_share * intent.avg_minutes * containment
-                handoff_min = calls_y * intent.volume_share * intent.handoff_minutes * (1 - containment)
-                human_min = (calls_y * intent.volume_share * intent.avg_minutes * (1 - containment) + 
-                           handoff_min + calls_y * intent.volume_share * self.inputs.acw_minutes)
-                
-                baseline_minutes += base_intent_minutes
-                automated_minutes += auto_min
-                handoff_minutes += handoff_min
-                human_minutes += human_min
-                
-                # Revenue retained calculation
-                abandon_delta = (self.inputs.baseline_abandon_rate - self.inputs.ai_abandon_rate) * calls_y
-                if intent.revenue_per_abandon:
-                    revenue_retained += (abandon_delta * intent.volume_share) * intent.revenue_per_abandon
-            
-            # Apply inflation to costs
-            inflation_factor = (1 + self.inputs.inflation) ** year
-            agent_cost = self.inputs.agent_cost_per_min * inflation_factor
-            telco_cost = self.inputs.telco_cost_per_min * inflation_factor
-            polyai_cost = self.inputs.polyai_cost_per_min * inflation_factor
-            
-            baseline_cost = baseline_minutes * (agent_cost + telco_cost)
-            ai_cost = (automated_minutes * (polyai_cost + telco_cost) + 
-                      human_minutes * (agent_cost + telco_cost))
-            
-            ops_savings = baseline_cost - ai_cost
-            total_value = ops_savings + revenue_retained
-            cumulative_value += total_value
-            discounted_value = total_value / ((1 + self.inputs.discount_rate) ** year)
-            
-            results.append(YearResult(
-                year=year,
-                baseline_minutes=baseline_minutes,
-                automated_minutes=automated_minutes,
-                handoff_minutes=handoff_minutes,
-                human_minutes=human_minutes,
-                baseline_cost=baseline_cost,
-                ai_cost=ai_cost,
-                ops_savings=ops_savings,
-                revenue_retained=revenue_retained,
-                total_value=total_value,
-                cumulative_value=cumulative_value,
-                discounted_value=discounted_value
-            ))
-        
-        return results
+        arrays = self._yearly_arrays()
+        columns = {field: arrays[field].tolist() for field in YEAR_FIELDS}
+
+        return [
+            YearResult(year=year, **{field: columns[field][year] for field in YEAR_FIELDS})
+            for year in range(YEARS)
+        ]
     
     def _calculate_payback(self) -> Optional[float]:
         """Calculate payback in months with Q1 ramp consideration"""
-        monthly_calls = self.inputs.annual_calls / 12
-        cumulative_value = 0.0
-        
-        for month in range(36):  # Check up to 3 years
-            # Ramp factor for first 3 months
-            if month < 3:
-                ramp_factor = (month + 1) / 3  # Linear ramp from 0 to 1
-            else:
-                ramp_factor = 1.0
-            
-            year = month // 12
-            inflation_factor = (1 + self.inputs.inflation) ** year
-            volume_factor = (1 + self.inputs.volume_growth) ** year
-            
-            monthly_value = 0.0
-            calls_month = monthly_calls * volume_factor
-            
-            for intent in self.inputs.intents:
-                containment = intent.containment_m3 * (1 - self.inputs.risk_adjustment) * ramp_factor
-                
-                baseline_min = calls_month * intent.volume_share * (intent.avg_minutes + self.inputs.acw_minutes)
-                auto_min = calls_month * intent.volume_share * intent.avg_minutes * containment
-                handoff_min = calls_month * intent.volume_share * intent.handoff_minutes * (1 - containment)
-                human_min = (calls_month * intent.volume_share * intent.avg_minutes * (1 - containment) + 
-                           handoff_min + calls_month * intent.volume_share * self.inputs.acw_minutes)
-                
-                agent_cost = self.inputs.agent_cost_per_min * inflation_factor
-                telco_cost = self.inputs.telco_cost_per_min * inflation_factor
-                polyai_cost = self.inputs.polyai_cost_per_min * inflation_factor
-                
-                baseline_cost = baseline_min * (agent_cost + telco_cost)
-                ai_cost = (auto_min * (polyai_cost + telco_cost) + 
-                          human_min * (agent_cost + telco_cost))
-                
-                monthly_value += baseline_cost - ai_cost
-                
-                # Add revenue component
-                if intent.revenue_per_abandon:
-                    abandon_delta = (self.inputs.baseline_abandon_rate - self.inputs.ai_abandon_rate) * calls_month
-                    monthly_value += (abandon_delta * intent.volume_share) * intent.revenue_per_abandon
-            
-            cumulative_value += monthly_value
-            
-            if cumulative_value >= 0:
-                return month + 1
+        payback = self._payback_array().item()
         
-        return None  # No payback within 3 years
+        return None if math.isnan(payback) else payback  # None if no payback within horizon
     
     def _calculate_roi_5y(self, yearly_results: List[YearResult]) -> float:
         # Use cost reduction approach: savings as % of baseline costs
@@ -167,82 +506,237 @@ class ROICalculator:
     
     def _calculate_tornado(self) -> List[Tuple[str, float]]:
         """Calculate sensitivity analysis (tornado chart data)"""
-        base_npv = sum(yr.discounted_value for yr in self._calculate_yearly_results())
+        deltas = self._tornado_deltas()
         
-        sensitivities = []
-        
-        # Test containment sensitivity
-        for intent_idx, intent in enumerate(self.inputs.intents):
-            original_m3 = intent.containment_m3
-            
-            # +20% scenario
-            intent.containment_m3 = min(1.0, original_m3 * 1.2)
-            high_npv = sum(yr.discounted_value for yr in self._calculate_yearly_results())
-            
-            # -20% scenario
-            intent.containment_m3 = max(0.0, original_m3 * 0.8)
-            low_npv = sum(yr.discounted_value for yr in self._calculate_yearly_results())
-            
-            # Restore original
-            intent.containment_m3 = original_m3
-            
-            delta = abs(high_npv - low_npv) / 2
-            sensitivities.append((f"Containment_{intent.name}", delta))
-        
-        # Test other key variables
-        test_vars = [
-            ("agent_cost_per_min", 0.2),
-            ("polyai_cost_per_min", 0.2),
-            ("volume_growth", 0.1),
-            ("discount_rate", 0.1)
-        ]
-        
-        for var_name, delta_pct in test_vars:
-            original_val = getattr(self.inputs, var_name)
-            
-            # High scenario
-            setattr(self.inputs, var_name, original_val * (1 + delta_pct))
-            high_npv = sum(yr.discounted_value for yr in self._calculate_yearly_results())
-            
-            # Low scenario
-            setattr(self.inputs, var_name, original_val * (1 - delta_pct))
-            low_npv = sum(yr.discounted_value for yr in self._calculate_yearly_results())
-            
-            # Restore
-            setattr(self.inputs, var_name, original_val)
-            
-            delta = abs(high_npv - low_npv) / 2
-            sensitivities.append((var_name, delta))
-        
-        # Sort by impact and take top 5
-        sensitivities.sort(key=lambda x: x[1], reverse=True)
-        return sensitivities[:5]
+        labels = [f"Containment_{intent.name}" for intent in self.inputs.intents]
+        labels += [var_name for var_name, _ in TORNADO_VARS]
+        return _top_drivers(labels, deltas.tolist())
     
     def _calculate_scenarios(self) -> Dict[str, float]:
         """Calculate P10/P50/P90 scenarios using triangular distribution approximation"""
-        base_npv = sum(yr.discounted_value for yr in self._calculate_yearly_results())
-        
-        # Simplified 3-point estimation
-        # P10 (pessimistic): reduce containment by 20%, increase costs by 10%
-        p10_inputs = DealInputs(**self.inputs.model_dump())
-        for intent in p10_inputs.intents:
-            intent.containment_m3 *= 0.8
-        p10_inputs.agent_cost_per_min *= 1.1
-        p10_inputs.polyai_cost_per_min *= 1.1
-        p10_calc = ROICalculator(p10_inputs)
-        p10_npv = sum(yr.discounted_value for yr in p10_calc._calculate_yearly_results())
-        
-        # P90 (optimistic): increase containment by 20%, reduce costs by 10%
-        p90_inputs = DealInputs(**self.inputs.model_dump())
-        for intent in p90_inputs.intents:
-            intent.containment_m3 = min(1.0, intent.containment_m3 * 1.2)
-        p90_inputs.agent_cost_per_min *= 0.9
-        p90_inputs.polyai_cost_per_min *= 0.9
-        p90_calc = ROICalculator(p90_inputs)
-        p90_npv = sum(yr.discounted_value for yr in p90_calc._calculate_yearly_results())
+        base_npv, p10_npv, p90_npv = self._scenario_npvs().tolist()
         
         return {
             "p10": p10_npv,
             "p50": base_npv,
             "p90": p90_npv
-        }
\ No newline at end of file
+        }
+    
+    def _simulate(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Monte Carlo P10/P50/P90 of NPV, ROI and payback over triangular draws"""
+        rng = np.random.default_rng(self.seed)
+        cols = pack_intents(self.inputs.intents)
+        params = pack_params(self.inputs)
+        
+        m3 = cols["containment_m3"]
+        spread = MONTE_CARLO_CONTAINMENT_SPREAD
+        low = m3 * (1 - spread)
+        width = np.minimum(1.0, m3 * (1 + spread)) - low
+        relative_mode = np.divide(m3 - low, width, out=np.zeros_like(width), where=width > 0)
+        # Containment = low + width * t. It only enters the per-call sums through
+        # talk . containment and handoff . containment, so those are taken against
+        # the standard draws t directly rather than building the scaled matrix.
+        # t is the only draws x intents array, so it is sampled and reduced in
+        # float32 (half the memory traffic); its row sums are widened afterwards.
+        t = standard_triangular(rng, relative_mode, size=(self.draws, len(m3)), dtype=np.float32)
+        
+        sampled = dict(params)
+        for name, spread in MONTE_CARLO_SPREADS:
+            value = params[name]
+            sampled[name] = triangular(rng, value * (1 - spread), value, value * (1 + spread), size=(self.draws,))
+        
+        terms = intent_terms(cols)
+        sums = {name: terms[name].sum() for name in ("share", "talk", "handoff", "revenue")}
+        weights = np.stack([terms["talk"] * width, terms["handoff"] * width], axis=1).astype(np.float32)
+        reduced = (t @ weights).astype(float)
+        sums["automated"] = terms["talk"] @ low + reduced[:, 0]
+        sums["contained_handoff"] = terms["handoff"] @ low + reduced[:, 1]
+        
+        # The draws share one per-call reduction for the totals and payback
+        per_call = per_call_from_sums(sums, sampled)
+        totals = deal_totals_from_per_call(per_call, sampled)
+        
+        npv = totals["npv_5y"]
+        total_baseline = totals["baseline_cost"]
+        total_ai = totals["ai_cost"]
+        roi = np.divide(
+            (total_baseline - total_ai) * 100, total_baseline,
+            out=np.zeros_like(total_baseline), where=total_baseline != 0
+        )
+        payback = payback_from_per_call(per_call, sampled, self.payback_horizon, self.fractional_payback)
+        # Draws that never pay back sort last
+        payback = np.nan_to_num(payback, nan=np.inf)
+        
+        return {
+            "npv_5y": _percentiles(npv),
+            "roi_5y": _percentiles(roi),
+            "payback_months": _percentiles(payback, method="inverted_cdf"),
+        }
+
+
+class BatchROICalculator:
+    """Deterministic ROI for many deals in one pass over a padded (n_deals, max_intents) batch"""
+
+    def __init__(self, deals: List[DealInputs],
+                 payback_horizon: int = PAYBACK_HORIZON_MONTHS, fractional_payback: bool = False):
+        self.deals = deals
+        self.payback_horizon = payback_horizon
+        self.fractional_payback = fractional_payback
+    
+    def calculate(self) -> List[Results]:
+        if not self.deals:
+            return []
+        
+        cols, params = pack_batch(self.deals)
+        width = cols["containment_m3"].shape[-1]
+        
+        arrays = yearly_arrays(cols, params)
+        columns = {field: arrays[field].tolist() for field in YEAR_FIELDS}
+        payback = payback_months(cols, params, self.payback_horizon, self.fractional_payback).tolist()
+        deltas = tornado_deltas(cols, params).tolist()
+        scenarios = scenario_npvs(cols, params).tolist()
+        
+        total_baseline = arrays["baseline_cost"].sum(axis=-1)
+        total_ai = arrays["ai_cost"].sum(axis=-1)
+        total_ops = arrays["ops_savings"].sum(axis=-1)
+        total_revenue = arrays["revenue_retained"].sum(axis=-1)
+        total = total_ops + total_revenue
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            roi = np.where(total_baseline == 0, 0.0, (total_baseline - total_ai) / total_baseline * 100).tolist()
+            ops_share = np.where(total == 0, 0.0, total_ops / total * 100).tolist()
+            revenue_share = np.where(total == 0, 0.0, total_revenue / total * 100).tolist()
+        npv = arrays["discounted_value"].sum(axis=-1).tolist()
+        
+        results = []
+        for row, deal in enumerate(self.deals):
+            n_intents = len(deal.intents)
+            labels = [f"Containment_{intent.name}" for intent in deal.intents]
+            labels += [var_name for var_name, _ in TORNADO_VARS]
+            base_npv, p10_npv, p90_npv = scenarios[row]
+            
+            results.append(Results(
+                payback_months=None if math.isnan(payback[row]) else payback[row],
+                roi_5y=roi[row],
+                npv_5y=npv[row],
+                ops_vs_revenue_split={"ops_savings": ops_share[row], "revenue_retained": revenue_share[row]},
+                tornado=_top_drivers(labels, deltas[row][:n_intents] + deltas[row][width:]),
+                p10_p50_p90={"p10": p10_npv, "p50": base_npv, "p90": p90_npv},
+                yearly=[
+                    YearResult(year=year, **{field: columns[field][row][year] for field in YEAR_FIELDS})
+                    for year in range(YEARS)
+                ]
+            ))
+        
+        return results
+
+
+class IncrementalROICalculator(ROICalculator):
+    """
+    Deterministic ROI that keeps per-intent partial sums between edits.
+
+    Every figure is a function of a few sums over the intents (see
+    intent_terms), and perturbing one intent's containment only swaps that
+    intent's term in the sums. Keeping the terms unreduced means update()
+    re-packs only the intent rows that changed, a global parameter edit reuses
+    the sums as they are, and every tornado and scenario variant is a row of
+    one stacked pass instead of a full re-evaluation of all intents.
+    """
+
+    def __init__(self, inputs: DealInputs,
+                 payback_horizon: int = PAYBACK_HORIZON_MONTHS, fractional_payback: bool = False):
+        super().__init__(inputs, payback_horizon=payback_horizon, fractional_payback=fractional_payback)
+        self.cols = pack_intents(inputs.intents)
+        self.terms = self._intent_terms(self.cols)
+        self._refresh(intents_changed=True)
+
+    @staticmethod
+    def _intent_terms(cols: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """intent_terms plus the automated terms at the tornado's high/low containment"""
+        terms = intent_terms(cols)
+        m3 = cols["containment_m3"]
+        for suffix, containment in (("high", np.minimum(1.0, m3 * 1.2)), ("low", np.maximum(0.0, m3 * 0.8))):
+            terms[f"automated_{suffix}"] = terms["talk"] * containment
+            terms[f"contained_handoff_{suffix}"] = terms["handoff"] * containment
+        return terms
+
+    def _refresh(self, intents_changed: bool) -> Results:
+        if intents_changed:
+            self.sums = {name: term.sum() for name, term in self.terms.items()}
+        self.params = pack_params(self.inputs)
+        self.arrays, self.per_call = self._evaluate_rows()
+        self.results = self.calculate()
+        return self.results
+
+    def _evaluate_rows(self) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        """
+        Evaluate the deal and all its what-if variants in one stacked pass.
+
+        Rows: base, each intent at high then low containment, each tornado
+        variable high/low, then the P10 and P90 scenarios.
+        """
+        n_intents = len(self.terms["talk"])
+        n_vars = 2 * len(TORNADO_VARS)
+        n_rows = 1 + 2 * n_intents + n_vars + 2
+        intent_rows = slice(1, 1 + 2 * n_intents)
+        var_start = 1 + 2 * n_intents
+
+        sums = {name: np.full(n_rows, value) for name, value in self.sums.items()}
+        for name in ("automated", "contained_handoff"):
+            # Perturbing one intent swaps its term in the sum
+            swapped = np.stack([self.terms[f"{name}_high"], self.terms[f"{name}_low"]], axis=-1)
+            sums[name][intent_rows] += (swapped - self.terms[name][:, None]).ravel()
+            sums[name][-2] *= 0.8
+            sums[name][-1] = self.terms[f"{name}_high"].sum()
+
+        params = {name: np.full(n_rows, value) for name, value in self.params.items()}
+        for offset, (var_name, delta_pct) in enumerate(TORNADO_VARS):
+            params[var_name][var_start + 2 * offset] *= 1 + delta_pct
+            params[var_name][var_start + 2 * offset + 1] *= 1 - delta_pct
+        for var_name in ("agent_cost_per_min", "polyai_cost_per_min"):
+            params[var_name][-2:] *= (1.1, 0.9)
+
+        per_call = per_call_from_sums(sums, params)
+        arrays = yearly_from_per_call(per_call, params)
+        return arrays, {name: value[0] for name, value in per_call.items()}
+
+    def update(self, inputs: DealInputs) -> Results:
+        """Recalculate for edited inputs, re-packing only the intent rows that changed"""
+        if len(inputs.intents) != len(self.inputs.intents):
+            self.cols = pack_intents(inputs.intents)
+            self.terms = self._intent_terms(self.cols)
+            rows = True
+        else:
+            rows = [i for i, (old, new) in enumerate(zip(self.inputs.intents, inputs.intents)) if old != new]
+            if rows:
+                changed = pack_intents([inputs.intents[i] for i in rows])
+                for name, col in changed.items():
+                    self.cols[name][rows] = col
+                for name, term in self._intent_terms(changed).items():
+                    self.terms[name][rows] = term
+
+        self.inputs = inputs
+        return self._refresh(intents_changed=bool(rows))
+
+    def _yearly_arrays(self) -> Dict[str, np.ndarray]:
+        return {name: value[0] for name, value in self.arrays.items()}
+
+    def _payback_array(self) -> np.ndarray:
+        return payback_from_per_call(self.per_call, self.params, self.payback_horizon, self.fractional_payback)
+
+    def _tornado_deltas(self) -> np.ndarray:
+        npv = self.arrays["discounted_value"][1:-2].sum(axis=-1)
+        return np.abs(npv[0::2] - npv[1::2]) / 2
+
+    def _scenario_npvs(self) -> np.ndarray:
+        return self.arrays["discounted_value"][[0, -2, -1]].sum(axis=-1)
+
+
+def calculate(inputs: DealInputs, **options) -> Results:
+    """Module-level entry point so calculations can be shipped to worker processes"""
+    return ROICalculator(inputs, **options).calculate()
+
+
+def calculate_batch_json(deals: List[DealInputs], **options) -> List[str]:
+    """Batch entry point for worker processes; returns serialized Results to keep pickling cheap"""
+    return [result.model_dump_json() for result in BatchROICalculator(deals, **options).calculate()]
@@ -0,0 +1,81 @@
+"""Incremental recalculation sessions for the interactive editors"""
+import uuid
+from functools import lru_cache
+from typing import Any, Optional
+
+from .calc_engine import IncrementalROICalculator
+from .config import get_settings
+from .models import CalculationPatch, DealInputs, IntentRow, Results
+from .utils.cache import LocalCacheBackend
+
+
+class StaleVersion(Exception):
+    """Raised when a patch was made against an older version of the session"""
+
+
+class EditSession:
+    """One editor's deal, recalculated incrementally as edits arrive"""
+
+    def __init__(self, inputs: DealInputs, **options: Any):
+        self.id = uuid.uuid4().hex
+        self.version = 0
+        self.calculator = IncrementalROICalculator(inputs, **options)
+
+    @property
+    def results(self) -> Results:
+        return self.calculator.results
+
+    def apply(self, patch: CalculationPatch) -> Results:
+        """Apply an edit and recalculate; invalid edits leave the session unchanged"""
+        if patch.version is not None and patch.version != self.version:
+            raise StaleVersion(f"Session is at version {self.version}, edit was made against {patch.version}")
+
+        unknown = set(patch.changes) - set(DealInputs.model_fields)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+
+        data = self.calculator.inputs.model_dump()
+        data.update(patch.changes)
+        for index, fields in patch.intents.items():
+            if not 0 <= index < len(data["intents"]):
+                raise ValueError(f"Intent index {index} out of range")
+            unknown = set(fields) - set(IntentRow.model_fields)
+            if unknown:
+                raise ValueError(f"Unknown intent {index} fields: {', '.join(sorted(unknown))}")
+            data["intents"][index].update(fields)
+
+        results = self.calculator.update(DealInputs.model_validate(data))
+        self.version += 1
+        return results
+
+
+class EditSessionStore:
+    """
+    LRU + TTL store of edit sessions.
+
+    Sessions live in the API worker that created them; a PATCH that lands on
+    another worker (or after expiry) gets a 404 and the editor starts a new
+    session with the full inputs.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 1800.0):
+        self._sessions = LocalCacheBackend(max_entries, ttl_seconds)
+
+    def create(self, inputs: DealInputs, **options: Any) -> EditSession:
+        session = EditSession(inputs, **options)
+        self.save(session)
+        return session
+
+    def save(self, session: EditSession) -> None:
+        """Store the session, restarting its TTL"""
+        self._sessions.set(session.id, session)
+
+    def get(self, session_id: str) -> Optional[EditSession]:
+        return self._sessions.get(session_id)
+
+
+@lru_cache()
+def get_session_store() -> EditSessionStore:
+    """Get the process-wide edit session store"""
+    settings = get_settings()
+    return EditSessionStore(settings.CALC_SESSION_MAX_ENTRIES, settings.CALC_SESSION_TTL_SECONDS)
@@ -21,6 +21,15 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
 
+    # bcrypt runs on its own bounded pool; each client IP gets a few concurrent attempts, and
+    # its further attempts wait up to PASSWORD_HASH_CLIENT_WAIT_SECONDS for one to finish. Client
+    # IPs come from X-Forwarded-For behind a proxy (see uvicorn's --forwarded-allow-ips).
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 16
+    PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS: float = 2.0
+    PASSWORD_HASH_MAX_PER_CLIENT: int = 8
+    PASSWORD_HASH_CLIENT_WAIT_SECONDS: float = 5.0
+
     # CORS
     CORS_ORIGINS: list[str] = ["http://localhost:5173", "http://localhost:3000"]
 
@@ -36,6 +45,71 @@ class Settings(BaseSettings):
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 60
 
+    # ROI engine
+    MONTE_CARLO_MAX_DRAWS: int = 200_000
+    PAYBACK_MAX_HORIZON_MONTHS: int = 240
+    BATCH_MAX_DEALS: int = 100_000
+    BATCH_CHUNK_SIZE: int = 500  # Deals computed per vectorized pass in /api/calc/batch
+
+    # Calculation execution backend: inline, thread or process
+    CALC_EXECUTOR: str = "thread"
+    CALC_WORKERS: int = 0  # 0 = one per CPU
+    CALC_MAX_PENDING: int = 32  # Jobs allowed to queue behind busy workers
+    CALC_QUEUE_TIMEOUT_SECONDS: float = 5.0
+
+    # XLSX/PDF exports render on their own process pool; artifacts are kept in EXPORT_DIR
+    # (default: a calcforge-exports folder in the temp dir) for EXPORT_TTL_SECONDS
+    EXPORT_WORKERS: int = 2
+    EXPORT_MAX_PENDING: int = 16
+    EXPORT_DIR: str = ""
+    EXPORT_TTL_SECONDS: float = 3600.0
+    PDF_CACHE_MAX_ENTRIES: int = 64  # Rendered reports cached per process, keyed by inputs and results
+    PDF_CACHE_TTL_SECONDS: float = 3600.0
+
+    # Result cache: in-process LRU unless RESULT_CACHE_URL points at a shared Redis
+    RESULT_CACHE_URL: str = ""
+    RESULT_CACHE_MAX_ENTRIES: int = 1024
+    RESULT_CACHE_TTL_SECONDS: float = 300.0
+
+    # Incremental recalculation sessions (in-process, per API worker)
+    CALC_SESSION_MAX_ENTRIES: int = 1000
+    CALC_SESSION_TTL_SECONDS: float = 1800.0
+
+    # Published calculator cache for the public endpoints
+    PUBLIC_CALCULATOR_CACHE_MAX_ENTRIES: int = 1024
+    PUBLIC_CALCULATOR_CACHE_TTL_SECONDS: float = 60.0
+    CACHE_PUBSUB_URL: str = ""  # Redis URL for cross-worker invalidation; in-process only if empty
+
+    # Verified access tokens and their user/organization, cached per API worker
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0
+
+    # API keys: active keys are indexed in memory per API worker, picking up new keys every
+    # API_KEY_INDEX_REFRESH_SECONDS and reloading fully every API_KEY_INDEX_RELOAD_SECONDS
+    API_KEY_INDEX_REFRESH_SECONDS: float = 30.0
+    API_KEY_INDEX_RELOAD_SECONDS: float = 600.0
+    API_KEY_LAST_USED_FLUSH_SECONDS: float = 60.0  # last_used_at is written behind (0 = write-through)
+
+    # Calculator view/completion counters are buffered and written every N seconds (0 = write-through)
+    COUNTER_FLUSH_INTERVAL_SECONDS: float = 5.0
+
+    # Public calculator sessions are queued and bulk-inserted in the background (0 = write-through)
+    SESSION_INGEST_BATCH_SIZE: int = 500
+    SESSION_INGEST_MAX_QUEUE: int = 10000
+    SESSION_INGEST_FLUSH_INTERVAL_SECONDS: float = 1.0
+    SESSION_INGEST_MAX_RETRIES: int = 3
+
+    # Client-reported session start times further back than this are ignored (the session goes untimed)
+    SESSION_MAX_DURATION_SECONDS: float = 86400.0
+
+    # calculator_sessions monthly partitions: created ahead, and dropped (or moved to
+    # SESSION_ARCHIVE_SCHEMA) once older than the retention period (0 = keep forever).
+    # The API maintains them at startup and then every MAINTENANCE_INTERVAL (0 = startup only)
+    SESSION_PARTITION_MONTHS_AHEAD: int = 3
+    SESSION_RETENTION_MONTHS: int = 24
+    SESSION_ARCHIVE_SCHEMA: str = ""
+    SESSION_PARTITION_MAINTENANCE_INTERVAL_SECONDS: float = 86400.0
+
     # File Upload
     MAX_UPLOAD_SIZE_MB: int = 5
     ALLOWED_IMAGE_TYPES: list[str] = ["image/jpeg", "image/png", "image/svg+xml"]
@@ -1,13 +1,22 @@
 """Database configuration and session management"""
+from functools import lru_cache
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from sqlalchemy.orm import sessionmaker
+from typing import AsyncGenerator
 from .config import get_settings
 
 settings = get_settings()
 
-# Create SQLAlchemy engine
+# Async drivers for the sync URLs in DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+# Sync engine, used by the background writers (counters, session ingestion) and init_db
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
@@ -16,22 +25,53 @@ engine = create_engine(
     echo=settings.DEBUG
 )
 
-# Session factory
+# Sync session factory for code running outside the event loop
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Base class for models
 Base = declarative_base()
 
 
-def get_db() -> Generator[Session, None, None]:
+def async_database_url(url: str) -> str:
+    """Swap the driver in a database URL for its asyncio counterpart"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        return url
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+@lru_cache()
+def get_async_engine() -> AsyncEngine:
+    """
+    Get the async engine used by the API routes.
+
+    Created on first use, so scripts and workers that only need the sync
+    engine don't require the async driver.
+    """
+    url = async_database_url(settings.DATABASE_URL)
+    options = {"echo": settings.DEBUG}
+    if not url.startswith("sqlite"):
+        options.update(pool_pre_ping=True, pool_size=10, max_overflow=20)
+    return create_async_engine(url, **options)
+
+
+@lru_cache()
+def get_async_sessionmaker() -> async_sessionmaker:
+    """Get the async session factory; objects stay loaded after commit, since lazy loads can't run in async code"""
+    return async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False)
+
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """Dependency for getting database session"""
-    db = SessionLocal()
-    try:
+    async with get_async_sessionmaker()() as db:
         yield db
-    finally:
-        db.close()
 
 
 def init_db():
-    """Initialize database (create all tables)"""
+    """Initialize database (create all tables and the upcoming session partitions)"""
+    from .services.session_partitions import maintain_partitions
+
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        maintain_partitions(conn)
@@ -0,0 +1,143 @@
+"""Execution backends for CPU-bound calculation work"""
+import asyncio
+import os
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, Optional
+
+from .config import get_settings
+
+
+class ExecutorBusy(Exception):
+    """Raised when no execution slot frees up within the queue timeout"""
+
+
+class CalculationExecutor:
+    """
+    Runs calculation callables off the event loop.
+
+    Backends:
+    - inline: call directly on the event loop (tests, debugging)
+    - thread: shared thread pool
+    - process: process pool, for true CPU parallelism; callables and their
+      arguments must be picklable (module-level functions, pydantic models)
+
+    At most max_workers + max_pending jobs are admitted at once. Further
+    callers wait up to queue_timeout seconds for a slot and then get
+    ExecutorBusy, so a burst sheds load instead of queueing without bound.
+    name labels the pool's threads and errors.
+
+    start() runs a job alongside the caller rather than awaiting it, for
+    work that hands results back as it goes (streamed exports). Such jobs
+    share memory with the caller, so they always run on threads, but they
+    hold a slot like any other job until they finish.
+    """
+
+    BACKENDS = ("inline", "thread", "process")
+
+    def __init__(self, backend: str = "thread", max_workers: Optional[int] = None,
+                 max_pending: int = 32, queue_timeout: float = 5.0, name: str = "Calculation"):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown executor backend '{backend}', expected one of {self.BACKENDS}")
+
+        self.backend = backend
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self.name = name
+        self._slots = asyncio.Semaphore(self.max_workers + max_pending)
+        self._pool: Optional[Executor] = None
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self.in_flight = 0
+        self.rejected = 0
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.backend == "process":
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                prefix = self.name.lower().replace(" ", "-")
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=prefix)
+        return self._pool
+
+    def _get_threads(self) -> Executor:
+        if self.backend == "thread":
+            return self._get_pool()
+        if self._threads is None:
+            prefix = self.name.lower().replace(" ", "-")
+            self._threads = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{prefix}-stream")
+        return self._threads
+
+    async def _admit(self) -> None:
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise ExecutorBusy(f"{self.name} queue full ({self.in_flight} jobs in flight)")
+        self.in_flight += 1
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._slots.release()
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run fn(*args, **kwargs) on the configured backend and return its result"""
+        if self.backend == "inline":
+            return fn(*args, **kwargs)
+
+        await self._admit()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), partial(fn, *args, **kwargs))
+        finally:
+            self._release()
+
+    async def start(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """Admit fn(*args, **kwargs), start it on a thread and return its future without waiting"""
+        await self._admit()
+        loop = asyncio.get_running_loop()
+
+        def finished(_future: Future) -> None:
+            try:
+                loop.call_soon_threadsafe(self._release)
+            except RuntimeError:
+                pass  # The loop has closed, and its slots with it
+
+        try:
+            future = self._get_threads().submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(finished)
+        return future
+
+    def stats(self) -> Dict[str, Any]:
+        """Occupancy counters; queued is the number of admitted jobs waiting for a worker"""
+        return {
+            "backend": self.backend,
+            "workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queued": max(self.in_flight - self.max_workers, 0),
+            "capacity": self.max_workers + self.max_pending,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        if self._threads is not None:
+            self._threads.shutdown(wait=True, cancel_futures=True)
+            self._threads = None
+
+
+@lru_cache()
+def get_executor() -> CalculationExecutor:
+    """Get the process-wide calculation executor"""
+    settings = get_settings()
+    return CalculationExecutor(
+        backend=settings.CALC_EXECUTOR,
+        max_workers=settings.CALC_WORKERS or None,
+        max_pending=settings.CALC_MAX_PENDING,
+        queue_timeout=settings.CALC_QUEUE_TIMEOUT_SECONDS,
+    )
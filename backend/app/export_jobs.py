@@ -0,0 +1,194 @@
+"""Background XLSX/PDF export jobs, rendered in a process pool and kept on disk until they expire"""
+import asyncio
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+import uuid
+from functools import lru_cache
+from typing import Any, Dict, Optional, Set
+
+from .config import get_settings
+from .executor import CalculationExecutor, ExecutorBusy
+
+logger = logging.getLogger(__name__)
+
+# Format -> (media type, download filename)
+EXPORT_FORMATS = {
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "roi_analysis.xlsx"),
+    "pdf": ("application/pdf", "roi_report.pdf"),
+}
+
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+
+def _status_path(directory: str, job_id: str) -> str:
+    return os.path.join(directory, f"{job_id}.json")
+
+
+def artifact_path(directory: str, job_id: str, export_format: str) -> str:
+    return os.path.join(directory, f"{job_id}.{export_format}")
+
+
+def _write_status(directory: str, job: Dict[str, Any]) -> None:
+    """Replace a job's status file atomically, so pollers never read half a file"""
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".status-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(job, f)
+    os.replace(tmp, _status_path(directory, job["id"]))
+
+
+def render_export(directory: str, job: Dict[str, Any], inputs, results) -> None:
+    """
+    Render an export into its artifact file and record the outcome.
+
+    Runs in a pool worker. The artifact is written under a temporary name
+    and renamed once complete, and the job's status file is updated at
+    each step, so any API worker can serve the job.
+    """
+    _write_status(directory, {**job, "status": RUNNING})
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".export-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if job["format"] == "xlsx":
+                from .exports import ExcelExporter
+                ExcelExporter().write_workbook(f, inputs, results)
+            else:
+                from .exports import PDFExporter
+                f.write(PDFExporter().create_report(inputs, results))
+        path = artifact_path(directory, job["id"], job["format"])
+        os.replace(tmp, path)
+        _write_status(directory, {**job, "status": DONE, "finished_at": time.time(),
+                                  "size": os.path.getsize(path)})
+    except Exception as e:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        _write_status(directory, {**job, "status": FAILED, "finished_at": time.time(), "error": str(e)})
+
+
+class ExportJobs:
+    """
+    Export jobs: submit returns a job at once and the render runs in the background.
+
+    Renders run on their own process pool, so WeasyPrint and openpyxl
+    never hold an API worker. Job status lives in a JSON file next to the
+    artifact in `directory`; a job can be polled from any API worker
+    sharing the directory. Jobs and their artifacts are deleted
+    ttl_seconds after they finish (cleanup runs at most every
+    cleanup_interval seconds, on submit). At most max_workers +
+    max_pending jobs are accepted at once, beyond which submit raises
+    ExecutorBusy.
+    """
+
+    def __init__(self, directory: str, executor: CalculationExecutor, ttl_seconds: float = 3600.0,
+                 cleanup_interval: float = 60.0):
+        self.directory = directory
+        self.executor = executor
+        self.ttl_seconds = ttl_seconds
+        self.cleanup_interval = cleanup_interval
+        self._cleaned_at = 0.0
+        self._tasks: Set[asyncio.Task] = set()
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def capacity(self) -> int:
+        return self.executor.max_workers + self.executor.max_pending
+
+    async def submit(self, export_format: str, inputs, results) -> Dict[str, Any]:
+        """Queue an export render; returns the job's initial status"""
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{export_format}', expected one of {tuple(EXPORT_FORMATS)}")
+        if len(self._tasks) >= self.capacity:
+            self.executor.rejected += 1
+            raise ExecutorBusy(f"Export queue full ({len(self._tasks)} jobs in flight)")
+
+        if time.monotonic() - self._cleaned_at >= self.cleanup_interval:
+            self.cleanup()
+
+        job = {"id": uuid.uuid4().hex, "format": export_format, "status": PENDING, "created_at": time.time()}
+        _write_status(self.directory, job)
+
+        task = asyncio.create_task(self._run(job, inputs, results))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: Dict[str, Any], inputs, results) -> None:
+        try:
+            await self.executor.run(render_export, self.directory, job, inputs, results)
+        except Exception as e:
+            # The pool itself failed (a worker died, or it was shut down), so the worker couldn't record it
+            logger.exception("Export job %s failed", job["id"])
+            _write_status(self.directory, {**job, "status": FAILED, "finished_at": time.time(), "error": str(e)})
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """A job's status, or None if it doesn't exist or has expired"""
+        if not JOB_ID_PATTERN.match(job_id):
+            return None
+        try:
+            with open(_status_path(self.directory, job_id)) as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self._expired(job, time.time()):
+            return None
+        return job
+
+    def artifact(self, job: Dict[str, Any]) -> str:
+        return artifact_path(self.directory, job["id"], job["format"])
+
+    def _expired(self, job: Dict[str, Any], now: float) -> bool:
+        finished_at = job.get("finished_at")
+        return finished_at is not None and now - finished_at >= self.ttl_seconds
+
+    def cleanup(self) -> int:
+        """Delete expired jobs and their artifacts, and temp files left by crashed renders; returns jobs deleted"""
+        self._cleaned_at = time.monotonic()
+        now = time.time()
+        deleted = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if name.startswith("."):
+                    if now - os.path.getmtime(path) >= self.ttl_seconds:
+                        os.remove(path)
+                    continue
+                if not name.endswith(".json"):
+                    continue
+                with open(path) as f:
+                    job = json.load(f)
+                # Jobs that never finished (their pool died with the process) expire from their last update
+                if self._expired(job, now) or (job.get("finished_at") is None
+                                               and now - os.path.getmtime(path) >= self.ttl_seconds):
+                    artifact = self.artifact(job)
+                    if os.path.exists(artifact):
+                        os.remove(artifact)
+                    os.remove(path)
+                    deleted += 1
+            except (OSError, ValueError, KeyError):
+                continue  # Removed by another worker meanwhile, or not one of ours
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.executor.stats(), "jobs_in_flight": len(self._tasks)}
+
+    def shutdown(self) -> None:
+        self.executor.shutdown()
+
+
+@lru_cache()
+def get_export_jobs() -> ExportJobs:
+    """Get the process-wide export job runner"""
+    settings = get_settings()
+    executor = CalculationExecutor(
+        backend="process",
+        max_workers=settings.EXPORT_WORKERS,
+        max_pending=settings.EXPORT_MAX_PENDING,
+        name="Export",
+    )
+    directory = settings.EXPORT_DIR or os.path.join(tempfile.gettempdir(), "calcforge-exports")
+    return ExportJobs(directory, executor, settings.EXPORT_TTL_SECONDS)
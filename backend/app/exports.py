@@ -1,270 +1,242 @@
 import io
 import csv
-from typing import List
+import hashlib
+import queue
+import threading
+from functools import lru_cache
+from itertools import chain, islice
+from html import escape
+from string import Template
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
 from openpyxl.utils import get_column_letter
-from weasyprint import HTML, CSS
+from .config import get_settings
+from .executor import CalculationExecutor
 from .models import DealInputs, Results
+from .utils.cache import LocalCacheBackend
+
+# Column widths are measured over this many leading rows of a sheet
+WIDTH_SAMPLE_ROWS = 100
+
+NOTES = [
+    "ROI Calculator - Assumptions and Disclaimers",
+    "",
+    "This analysis is illustrative and based on assumptions that may vary by deployment.",
+    "",
+    "Key Assumptions:",
+    "- Containment rates improve linearly from M0 to M3 over 3 months",
+    "- Costs include agent time, ACW, telephony, and PolyAI usage",
+    "- Revenue impact calculated from abandon rate reduction",
+    "- All values in GBP unless specified",
+    "",
+    "Disclaimers:",
+    "- Not official PolyAI pricing",
+    "- Results depend on actual deployment characteristics",
+    "- Sensitivity analysis shows impact of ±20% parameter changes",
+    "- P10/P50/P90 scenarios use triangular distribution approximation"
+]
+
+
+class _ChunkWriter:
+    """Write-only file object handing chunks to a queue; raises once the reader has gone away"""
+
+    def __init__(self, chunks: queue.Queue, chunk_size: int, cancelled: threading.Event):
+        self.chunks = chunks
+        self.chunk_size = chunk_size
+        self.cancelled = cancelled
+        self.buffer = bytearray()
+        self.abandoned = False
+
+    def write(self, data) -> int:
+        if self.abandoned:
+            return len(data)  # Writes made while the failed save unwinds
+        self.buffer += data
+        if len(self.buffer) >= self.chunk_size:
+            self._put(bytes(self.buffer))
+            self.buffer.clear()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close_buffer(self):
+        if self.buffer:
+            self._put(bytes(self.buffer))
+            self.buffer.clear()
+
+    def _put(self, item):
+        while True:
+            if self.cancelled.is_set():
+                self.abandoned = True
+                raise IOError("Export stream closed by the reader")
+            try:
+                self.chunks.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
 
 
 class ExcelExporter:
+    """
+    Builds the ROI workbook with openpyxl's write-only workbook.
+
+    Rows are written straight to the sheet files instead of being held as
+    cells. Write-only sheets need column widths before their first row, so
+    widths are measured from a sample of leading rows rather than the whole
+    sheet. stream_workbook yields the file while it is being written.
+    """
+
+    header_font = Font(bold=True)
+    header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
+
     def create_workbook(self, inputs: DealInputs, results: Results) -> bytes:
-        wb = Workbook()
-        
-        # Remove default sheet
-        wb.remove(wb.active)
-        
-        # Create sheets
-        self._create_inputs_sheet(wb, inputs)
-        self._create_intents_sheet(wb, inputs)
-        self._create_calcs_sheet(wb, inputs, results)
-        self._create_sensitivity_sheet(wb, results)
-        self._create_scenarios_sheet(wb, results)
-        self._create_notes_sheet(wb)
-        
-        # Save to bytes
         buffer = io.BytesIO()
-        wb.save(buffer)
+        self.write_workbook(buffer, inputs, results)
         return buffer.getvalue()
-    
-    def _create_inputs_sheet(self, wb: Workbook, inputs: DealInputs):
-        ws = wb.create_sheet("Inputs")
-        
-        # Headers
-        ws['A1'] = "Parameter"
-        ws['B1'] = "Value"
-        ws['C1'] = "Description"
-        
-        # Data
-        data = [
-            ("Annual Calls", inputs.annual_calls, "Total annual call volume"),
-            ("Agent Cost/Min (£)", inputs.agent_cost_per_min, "Agent cost per minute"),
-            ("Telco Cost/Min (£)", inputs.telco_cost_per_min, "Telephony cost per minute"),
-            ("PolyAI Cost/Min (£)", inputs.polyai_cost_per_min, "PolyAI cost per minute"),
-            ("ACW Minutes", inputs.acw_minutes, "After-call work minutes"),
-            ("Baseline Abandon Rate", inputs.baseline_abandon_rate, "Current abandon rate"),
-            ("AI Abandon Rate", inputs.ai_abandon_rate, "Post-AI abandon rate"),
-            ("Business Hours Only", inputs.business_hours_only, "Business hours vs 24/7"),
-            ("Night Fraction", inputs.night_fraction, "Fraction of calls outside business hours"),
-            ("Inflation Rate", inputs.inflation, "Annual inflation rate"),
-            ("Volume Growth", inputs.volume_growth, "Annual volume growth rate"),
-            ("Discount Rate", inputs.discount_rate, "Discount rate for NPV"),
-            ("Risk Adjustment", inputs.risk_adjustment, "Containment risk adjustment")
-        ]
-        
-        for i, (param, value, desc) in enumerate(data, 2):
-            ws[f'A{i}'] = param
-            ws[f'B{i}'] = value
-            ws[f'C{i}'] = desc
-        
-        # Style headers
-        header_font = Font(bold=True)
-        header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        for cell in ws[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-        
-        # Auto-size columns
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-    
-    def _create_intents_sheet(self, wb: Workbook, inputs: DealInputs):
-        ws = wb.create_sheet("Intents")
-        
-        # Headers
-        headers = ["Intent Name", "Volume Share", "Avg Minutes", "Containment M0", 
-                  "Containment M3", "Handoff Minutes", "Revenue/Abandon"]
-        for i, header in enumerate(headers, 1):
-            ws.cell(row=1, column=i, value=header)
-        
-        # Data
-        for i, intent in enumerate(inputs.intents, 2):
-            ws.cell(row=i, column=1, value=intent.name)
-            ws.cell(row=i, column=2, value=intent.volume_share)
-            ws.cell(row=i, column=3, value=intent.avg_minutes)
-            ws.cell(row=i, column=4, value=intent.containment_m0)
-            ws.cell(row=i, column=5, value=intent.containment_m3)
-            ws.cell(row=i, column=6, value=intent.handoff_minutes)
-            ws.cell(row=i, column=7, value=intent.revenue_per_abandon or "")
-        
-        # Style headers
-        header_font = Font(bold=True)
-        header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        for cell in ws[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-        
-        # Auto-size columns
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            for cell in column:
+
+    async def stream_workbook(self, inputs: DealInputs, results: Results, executor: CalculationExecutor,
+                              chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """
+        Start writing the workbook on the executor and return an iterator of
+        its chunks, for a StreamingResponse.
+
+        The writer holds an executor slot until the file is written or the
+        iterator is closed; ExecutorBusy is raised here, before any byte is sent.
+        """
+        chunks: queue.Queue = queue.Queue(maxsize=8)
+        cancelled = threading.Event()
+        done = object()
+
+        def produce():
+            writer = _ChunkWriter(chunks, chunk_size, cancelled)
+            try:
                 try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 20)
-            ws.column_dimensions[column_letter].width = adjusted_width
-    
-    def _create_calcs_sheet(self, wb: Workbook, inputs: DealInputs, results: Results):
-        ws = wb.create_sheet("Calcs_5Y")
-        
-        # Headers
-        headers = ["Year", "Baseline Minutes", "Automated Minutes", "Handoff Minutes", 
-                  "Human Minutes", "Baseline Cost (£)", "AI Cost (£)", "Ops Savings (£)",
-                  "Revenue Retained (£)", "Total Value (£)", "Cumulative Value (£)", 
-                  "Discounted Value (£)"]
-        
-        for i, header in enumerate(headers, 1):
-            ws.cell(row=1, column=i, value=header)
-        
-        # Data
-        for i, year_result in enumerate(results.yearly, 2):
-            ws.cell(row=i, column=1, value=year_result.year)
-            ws.cell(row=i, column=2, value=year_result.baseline_minutes)
-            ws.cell(row=i, column=3, value=year_result.automated_minutes)
-            ws.cell(row=i, column=4, value=year_result.handoff_minutes)
-            ws.cell(row=i, column=5, value=year_result.human_minutes)
-            ws.cell(row=i, column=6, value=year_result.baseline_cost)
-            ws.cell(row=i, column=7, value=year_result.ai_cost)
-            ws.cell(row=i, column=8, value=year_result.ops_savings)
-            ws.cell(row=i, column=9, value=year_result.revenue_retained)
-            ws.cell(row=i, column=10, value=year_result.total_value)
-            ws.cell(row=i, column=11, value=year_result.cumulative_value)
-            ws.cell(row=i, column=12, value=year_result.discounted_value)
-        
+                    self.write_workbook(writer, inputs, results)
+                    writer.close_buffer()
+                    writer._put(done)
+                except Exception as e:
+                    writer._put(e)
+            except IOError:
+                pass  # The reader stopped early
+
+        await executor.start(produce)
+
+        def consume() -> Iterator[bytes]:
+            try:
+                while True:
+                    item = chunks.get()
+                    if item is done:
+                        return
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+            finally:
+                cancelled.set()
+
+        return consume()
+
+    def write_workbook(self, fileobj: BinaryIO, inputs: DealInputs, results: Results) -> None:
+        wb = Workbook(write_only=True)
+
+        self._write_sheet(wb, "Inputs", self._inputs_rows(inputs), max_width=50)
+        self._write_sheet(wb, "Intents", self._intents_rows(inputs), max_width=20)
+        self._write_sheet(wb, "Calcs_5Y", self._calcs_rows(results), max_width=15)
+        self._write_sheet(wb, "Sensitivity", self._sensitivity_rows(results))
+        self._write_sheet(wb, "Scenarios", self._scenarios_rows(results))
+        self._write_sheet(wb, "Notes", ([note] for note in NOTES), header=False, widths={"A": 80})
+
+        wb.save(fileobj)
+
+    def _write_sheet(self, wb: Workbook, title: str, rows: Iterable[Sequence[Any]], header: bool = True,
+                     max_width: Optional[int] = None, widths: Optional[Dict[str, float]] = None):
+        ws = wb.create_sheet(title)
+
+        # Widths are measured from the leading rows only, so a sheet is never held in memory
+        rows = iter(rows)
+        sample = list(islice(rows, WIDTH_SAMPLE_ROWS))
+        lengths: List[int] = []
+        if max_width is not None:
+            for row in sample:
+                for i, value in enumerate(row):
+                    length = len(str(value))
+                    if i == len(lengths):
+                        lengths.append(length)
+                    elif length > lengths[i]:
+                        lengths[i] = length
+
+        for i, length in enumerate(lengths, 1):
+            ws.column_dimensions[get_column_letter(i)].width = min(length + 2, max_width)
+        for letter, width in (widths or {}).items():
+            ws.column_dimensions[letter].width = width
+
+        for index, row in enumerate(chain(sample, rows)):
+            if header and index == 0:
+                ws.append([self._header_cell(ws, value) for value in row])
+            else:
+                ws.append(row)
+
+    def _header_cell(self, ws, value) -> WriteOnlyCell:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = self.header_font
+        cell.fill = self.header_fill
+        return cell
+
+    def _inputs_rows(self, inputs: DealInputs) -> Iterator[Sequence[Any]]:
+        yield ("Parameter", "Value", "Description")
+        yield ("Annual Calls", inputs.annual_calls, "Total annual call volume")
+        yield ("Agent Cost/Min (£)", inputs.agent_cost_per_min, "Agent cost per minute")
+        yield ("Telco Cost/Min (£)", inputs.telco_cost_per_min, "Telephony cost per minute")
+        yield ("PolyAI Cost/Min (£)", inputs.polyai_cost_per_min, "PolyAI cost per minute")
+        yield ("ACW Minutes", inputs.acw_minutes, "After-call work minutes")
+        yield ("Baseline Abandon Rate", inputs.baseline_abandon_rate, "Current abandon rate")
+        yield ("AI Abandon Rate", inputs.ai_abandon_rate, "Post-AI abandon rate")
+        yield ("Business Hours Only", inputs.business_hours_only, "Business hours vs 24/7")
+        yield ("Night Fraction", inputs.night_fraction, "Fraction of calls outside business hours")
+        yield ("Inflation Rate", inputs.inflation, "Annual inflation rate")
+        yield ("Volume Growth", inputs.volume_growth, "Annual volume growth rate")
+        yield ("Discount Rate", inputs.discount_rate, "Discount rate for NPV")
+        yield ("Risk Adjustment", inputs.risk_adjustment, "Containment risk adjustment")
+
+    def _intents_rows(self, inputs: DealInputs) -> Iterator[Sequence[Any]]:
+        yield ("Intent Name", "Volume Share", "Avg Minutes", "Containment M0",
+               "Containment M3", "Handoff Minutes", "Revenue/Abandon")
+        for intent in inputs.intents:
+            yield (intent.name, intent.volume_share, intent.avg_minutes, intent.containment_m0,
+                   intent.containment_m3, intent.handoff_minutes, intent.revenue_per_abandon or "")
+
+    def _calcs_rows(self, results: Results) -> Iterator[Sequence[Any]]:
+        yield ("Year", "Baseline Minutes", "Automated Minutes", "Handoff Minutes",
+               "Human Minutes", "Baseline Cost (£)", "AI Cost (£)", "Ops Savings (£)",
+               "Revenue Retained (£)", "Total Value (£)", "Cumulative Value (£)",
+               "Discounted Value (£)")
+        for yr in results.yearly:
+            yield (yr.year, yr.baseline_minutes, yr.automated_minutes, yr.handoff_minutes,
+                   yr.human_minutes, yr.baseline_cost, yr.ai_cost, yr.ops_savings,
+                   yr.revenue_retained, yr.total_value, yr.cumulative_value, yr.discounted_value)
+
         # Summary metrics
-        summary_row = len(results.yearly) + 3
-        ws.cell(row=summary_row, column=1, value="Summary Metrics")
-        ws.cell(row=summary_row + 1, column=1, value="5Y ROI (%)")
-        ws.cell(row=summary_row + 1, column=2, value=results.roi_5y)
-        ws.cell(row=summary_row + 2, column=1, value="5Y NPV (£)")
-        ws.cell(row=summary_row + 2, column=2, value=results.npv_5y)
-        ws.cell(row=summary_row + 3, column=1, value="Payback (months)")
-        ws.cell(row=summary_row + 3, column=2, value=results.payback_months or "No payback")
-        
-        # Style
-        header_font = Font(bold=True)
-        header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        for cell in ws[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-        
-        # Auto-size columns
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 15)
-            ws.column_dimensions[column_letter].width = adjusted_width
-    
-    def _create_sensitivity_sheet(self, wb: Workbook, results: Results):
-        ws = wb.create_sheet("Sensitivity")
-        
-        ws['A1'] = "Driver"
-        ws['B1'] = "Impact on NPV (£)"
-        
-        for i, (driver, impact) in enumerate(results.tornado, 2):
-            ws[f'A{i}'] = driver
-            ws[f'B{i}'] = impact
-        
-        # Style headers
-        header_font = Font(bold=True)
-        header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        ws['A1'].font = header_font
-        ws['A1'].fill = header_fill
-        ws['B1'].font = header_font
-        ws['B1'].fill = header_fill
-    
-    def _create_scenarios_sheet(self, wb: Workbook, results: Results):
-        ws = wb.create_sheet("Scenarios")
-        
-        ws['A1'] = "Scenario"
-        ws['B1'] = "NPV (£)"
-        
-        ws['A2'] = "P10 (Pessimistic)"
-        ws['B2'] = results.p10_p50_p90["p10"]
-        
-        ws['A3'] = "P50 (Base Case)"
-        ws['B3'] = results.p10_p50_p90["p50"]
-        
-        ws['A4'] = "P90 (Optimistic)"
-        ws['B4'] = results.p10_p50_p90["p90"]
-        
-        # Style headers
-        header_font = Font(bold=True)
-        header_fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-        ws['A1'].font = header_font
-        ws['A1'].fill = header_fill
-        ws['B1'].font = header_font
-        ws['B1'].fill = header_fill
-    
-    def _create_notes_sheet(self, wb: Workbook):
-        ws = wb.create_sheet("Notes")
-        
-        notes = [
-            "ROI Calculator - Assumptions and Disclaimers",
-            "",
-            "This analysis is illustrative and based on assumptions that may vary by deployment.",
-            "",
-            "Key Assumptions:",
-            "- Containment rates improve linearly from M0 to M3 over 3 months",
-            "- Costs include agent time, ACW, telephony, and PolyAI usage",
-            "- Revenue impact calculated from abandon rate reduction",
-            "- All values in GBP unless specified",
-            "",
-            "Disclaimers:",
-            "- Not official PolyAI pricing",
-            "- Results depend on actual deployment characteristics",
-            "- Sensitivity analysis shows impact of ±20% parameter changes",
-            "- P10/P50/P90 scenarios use triangular distribution approximation"
-        ]
-        
-        for i, note in enumerate(notes, 1):
-            ws[f'A{i}'] = note
-        
-        # Auto-size column
-        ws.column_dimensions['A'].width = 80
+        yield ()
+        yield ("Summary Metrics",)
+        yield ("5Y ROI (%)", results.roi_5y)
+        yield ("5Y NPV (£)", results.npv_5y)
+        yield ("Payback (months)", results.payback_months or "No payback")
 
+    def _sensitivity_rows(self, results: Results) -> Iterator[Sequence[Any]]:
+        yield ("Driver", "Impact on NPV (£)")
+        for driver, impact in results.tornado:
+            yield (driver, impact)
 
-class PDFExporter:
-    def create_report(self, inputs: DealInputs, results: Results) -> bytes:
-        html_content = self._generate_html(inputs, results)
-        css_content = self._generate_css()
-        
-        html_doc = HTML(string=html_content)
-        css_doc = CSS(string=css_content)
-        
-        pdf_buffer = io.BytesIO()
-        html_doc.write_pdf(pdf_buffer, stylesheets=[css_doc])
-        
-        return pdf_buffer.getvalue()
-    
-    def _generate_html(self, inputs: DealInputs, results: Results) -> str:
-        # Summary KPIs
-        payback_str = f"{results.payback_months:.1f} months" if results.payback_months else "No payback"
-        
-        # Ops vs Revenue split
-        ops_pct = results.ops_vs_revenue_split.get("ops_savings", 0)
-        revenue_pct = results.ops_vs_revenue_split.get("revenue_retained", 0)
-        
-        html = f"""
+    def _scenarios_rows(self, results: Results) -> Iterator[Sequence[Any]]:
+        yield ("Scenario", "NPV (£)")
+        yield ("P10 (Pessimistic)", results.p10_p50_p90["p10"])
+        yield ("P50 (Base Case)", results.p10_p50_p90["p50"])
+        yield ("P90 (Optimistic)", results.p10_p50_p90["p90"])
+
+
+# The report's markup. Templates are built once at import; values are formatted and escaped in _generate_html.
+REPORT_TEMPLATE = Template("""
         <!DOCTYPE html>
         <html>
         <head>
@@ -279,29 +251,29 @@ class PDFExporter:
                 <div class="kpi-grid">
                     <div class="kpi-card">
                         <h3>5-Year Total Value</h3>
-                        <div class="kpi-value">£{sum(yr.total_value for yr in results.yearly):,.0f}</div>
+                        <div class="kpi-value">£$total_value</div>
                     </div>
                     <div class="kpi-card">
                         <h3>Payback Period</h3>
-                        <div class="kpi-value">{payback_str}</div>
+                        <div class="kpi-value">$payback</div>
                     </div>
                     <div class="kpi-card">
                         <h3>5-Year NPV</h3>
-                        <div class="kpi-value">£{results.npv_5y:,.0f}</div>
+                        <div class="kpi-value">£$npv</div>
                     </div>
                     <div class="kpi-card">
                         <h3>5-Year ROI</h3>
-                        <div class="kpi-value">{results.roi_5y:.1f}%</div>
+                        <div class="kpi-value">$roi%</div>
                     </div>
                 </div>
                 
                 <h2>Value Driver Breakdown</h2>
                 <div class="split-chart">
                     <div class="split-item">
-                        <span>Operational Savings: {ops_pct:.1f}%</span>
+                        <span>Operational Savings: $ops_pct%</span>
                     </div>
                     <div class="split-item">
-                        <span>Revenue Retained: {revenue_pct:.1f}%</span>
+                        <span>Revenue Retained: $revenue_pct%</span>
                     </div>
                 </div>
                 
@@ -318,21 +290,7 @@ class PDFExporter:
                         </tr>
                     </thead>
                     <tbody>
-        """
-        
-        for yr in results.yearly:
-            html += f"""
-                        <tr>
-                            <td>Year {yr.year}</td>
-                            <td>£{yr.baseline_cost:,.0f}</td>
-                            <td>£{yr.ai_cost:,.0f}</td>
-                            <td>£{yr.ops_savings:,.0f}</td>
-                            <td>£{yr.revenue_retained:,.0f}</td>
-                            <td>£{yr.total_value:,.0f}</td>
-                        </tr>
-            """
-        
-        html += """
+$year_rows
                     </tbody>
                 </table>
             </div>
@@ -343,20 +301,7 @@ class PDFExporter:
                 
                 <h2>Tornado Chart - Top Value Drivers</h2>
                 <div class="tornado-chart">
-        """
-        
-        for driver, impact in results.tornado:
-            html += f"""
-                    <div class="tornado-bar">
-                        <span class="driver-name">{driver}</span>
-                        <div class="bar-container">
-                            <div class="bar" style="width: {min(100, abs(impact)/10000):.1f}%"></div>
-                        </div>
-                        <span class="impact-value">±£{abs(impact):,.0f}</span>
-                    </div>
-            """
-        
-        html += f"""
+$tornado_rows
                 </div>
                 
                 <h2>Scenario Analysis</h2>
@@ -371,18 +316,18 @@ class PDFExporter:
                     <tbody>
                         <tr>
                             <td>P10 (Pessimistic)</td>
-                            <td>£{results.p10_p50_p90['p10']:,.0f}</td>
-                            <td>{((results.p10_p50_p90['p10'] / results.p10_p50_p90['p50'] - 1) * 100):+.1f}%</td>
+                            <td>£$p10</td>
+                            <td>$p10_vs_base%</td>
                         </tr>
                         <tr class="base-case">
                             <td>P50 (Base Case)</td>
-                            <td>£{results.p10_p50_p90['p50']:,.0f}</td>
+                            <td>£$p50</td>
                             <td>Base</td>
                         </tr>
                         <tr>
                             <td>P90 (Optimistic)</td>
-                            <td>£{results.p10_p50_p90['p90']:,.0f}</td>
-                            <td>{((results.p10_p50_p90['p90'] / results.p10_p50_p90['p50'] - 1) * 100):+.1f}%</td>
+                            <td>£$p90</td>
+                            <td>$p90_vs_base%</td>
                         </tr>
                     </tbody>
                 </table>
@@ -395,13 +340,13 @@ class PDFExporter:
                 <h2>Business Parameters</h2>
                 <table class="data-table">
                     <tbody>
-                        <tr><td>Annual Call Volume</td><td>{inputs.annual_calls:,}</td></tr>
-                        <tr><td>Agent Cost per Minute</td><td>£{inputs.agent_cost_per_min:.2f}</td></tr>
-                        <tr><td>PolyAI Cost per Minute</td><td>£{inputs.polyai_cost_per_min:.2f}</td></tr>
-                        <tr><td>Baseline Abandon Rate</td><td>{inputs.baseline_abandon_rate:.1%}</td></tr>
-                        <tr><td>AI Abandon Rate</td><td>{inputs.ai_abandon_rate:.1%}</td></tr>
-                        <tr><td>Volume Growth (Annual)</td><td>{inputs.volume_growth:.1%}</td></tr>
-                        <tr><td>Discount Rate</td><td>{inputs.discount_rate:.1%}</td></tr>
+                        <tr><td>Annual Call Volume</td><td>$annual_calls</td></tr>
+                        <tr><td>Agent Cost per Minute</td><td>£$agent_cost</td></tr>
+                        <tr><td>PolyAI Cost per Minute</td><td>£$polyai_cost</td></tr>
+                        <tr><td>Baseline Abandon Rate</td><td>$baseline_abandon</td></tr>
+                        <tr><td>AI Abandon Rate</td><td>$ai_abandon</td></tr>
+                        <tr><td>Volume Growth (Annual)</td><td>$volume_growth</td></tr>
+                        <tr><td>Discount Rate</td><td>$discount_rate</td></tr>
                     </tbody>
                 </table>
                 
@@ -416,19 +361,7 @@ class PDFExporter:
                         </tr>
                     </thead>
                     <tbody>
-        """
-        
-        for intent in inputs.intents:
-            html += f"""
-                        <tr>
-                            <td>{intent.name}</td>
-                            <td>{intent.volume_share:.1%}</td>
-                            <td>{intent.avg_minutes:.1f}</td>
-                            <td>{intent.containment_m3:.1%}</td>
-                        </tr>
-            """
-        
-        html += """
+$intent_rows
                     </tbody>
                 </table>
                 
@@ -445,155 +378,294 @@ class PDFExporter:
             </div>
         </body>
         </html>
-        """
-        
-        return html
-    
+""")
+
+YEAR_ROW = Template("""
+                        <tr>
+                            <td>Year $year</td>
+                            <td>£$baseline_cost</td>
+                            <td>£$ai_cost</td>
+                            <td>£$ops_savings</td>
+                            <td>£$revenue_retained</td>
+                            <td>£$total_value</td>
+                        </tr>""")
+
+TORNADO_ROW = Template("""
+                    <div class="tornado-bar">
+                        <span class="driver-name">$driver</span>
+                        <div class="bar-container">
+                            <div class="bar" style="width: $width%"></div>
+                        </div>
+                        <span class="impact-value">±£$impact</span>
+                    </div>""")
+
+INTENT_ROW = Template("""
+                        <tr>
+                            <td>$name</td>
+                            <td>$volume_share</td>
+                            <td>$avg_minutes</td>
+                            <td>$containment_m3</td>
+                        </tr>""")
+
+REPORT_CSS = """
+@page {
+    size: A4;
+    margin: 2cm;
+}
+
+body {
+    font-family: Arial, sans-serif;
+    font-size: 11pt;
+    line-height: 1.4;
+    color: #333;
+}
+
+.page {
+    page-break-after: always;
+}
+
+.page:last-child {
+    page-break-after: avoid;
+}
+
+h1 {
+    color: #2c3e50;
+    border-bottom: 2px solid #3498db;
+    padding-bottom: 10px;
+    margin-bottom: 20px;
+}
+
+h2 {
+    color: #34495e;
+    margin-top: 25px;
+    margin-bottom: 15px;
+}
+
+.kpi-grid {
+    display: grid;
+    grid-template-columns: 1fr 1fr;
+    gap: 15px;
+    margin-bottom: 25px;
+}
+
+.kpi-card {
+    border: 1px solid #ddd;
+    padding: 15px;
+    text-align: center;
+    background-color: #f8f9fa;
+}
+
+.kpi-card h3 {
+    margin: 0 0 10px 0;
+    font-size: 12pt;
+    color: #5a6c7d;
+}
+
+.kpi-value {
+    font-size: 18pt;
+    font-weight: bold;
+    color: #2c3e50;
+}
+
+.data-table {
+    width: 100%;
+    border-collapse: collapse;
+    margin-bottom: 20px;
+}
+
+.data-table th,
+.data-table td {
+    padding: 8px;
+    text-align: left;
+    border: 1px solid #ddd;
+}
+
+.data-table th {
+    background-color: #f8f9fa;
+    font-weight: bold;
+}
+
+.data-table .base-case {
+    background-color: #e8f5e8;
+}
+
+.tornado-chart {
+    margin: 20px 0;
+}
+
+.tornado-bar {
+    display: flex;
+    align-items: center;
+    margin-bottom: 10px;
+    font-size: 10pt;
+}
+
+.driver-name {
+    width: 150px;
+    flex-shrink: 0;
+}
+
+.bar-container {
+    flex-grow: 1;
+    height: 20px;
+    background-color: #f0f0f0;
+    margin: 0 10px;
+    position: relative;
+}
+
+.bar {
+    height: 100%;
+    background-color: #3498db;
+}
+
+.impact-value {
+    width: 80px;
+    text-align: right;
+    flex-shrink: 0;
+}
+
+.split-chart {
+    margin: 15px 0;
+}
+
+.split-item {
+    padding: 10px;
+    margin: 5px 0;
+    background-color: #f8f9fa;
+    border-left: 4px solid #3498db;
+}
+
+.disclaimer {
+    margin-top: 30px;
+    padding: 15px;
+    background-color: #f8f9fa;
+    border: 1px solid #ddd;
+}
+
+.disclaimer h3 {
+    margin-top: 0;
+    color: #e74c3c;
+}
+
+.disclaimer ul {
+    margin-bottom: 0;
+}
+"""
+
+
+@lru_cache()
+def _pdf_resources():
+    """WeasyPrint font configuration and parsed report stylesheet, built once per process"""
+    from weasyprint import CSS
+    try:
+        from weasyprint.text.fonts import FontConfiguration
+    except ImportError:  # WeasyPrint < 53
+        from weasyprint.fonts import FontConfiguration
+
+    font_config = FontConfiguration()
+    return font_config, CSS(string=REPORT_CSS, font_config=font_config)
+
+
+@lru_cache()
+def get_report_cache() -> LocalCacheBackend:
+    """Get the process-wide cache of rendered PDF reports"""
+    settings = get_settings()
+    return LocalCacheBackend(settings.PDF_CACHE_MAX_ENTRIES, settings.PDF_CACHE_TTL_SECONDS)
+
+
+def report_key(inputs: DealInputs, results: Results) -> str:
+    """Cache key for a report: a hash of everything it renders"""
+    digest = hashlib.sha256(inputs.model_dump_json().encode())
+    digest.update(results.model_dump_json().encode())
+    return digest.hexdigest()
+
+
+class PDFExporter:
+    """
+    Renders the ROI report with WeasyPrint.
+
+    The stylesheet and fonts are set up once per process and the markup
+    comes from module-level templates, so a render only lays out the
+    document. Rendered reports are cached by a hash of their inputs and
+    results; repeat exports of the same deal return the cached bytes.
+    """
+
+    def __init__(self, cache: Optional[LocalCacheBackend] = None):
+        self.cache = cache if cache is not None else get_report_cache()
+
+    def create_report(self, inputs: DealInputs, results: Results) -> bytes:
+        key = report_key(inputs, results)
+        pdf = self.cache.get(key)
+        if pdf is not None:
+            return pdf
+
+        from weasyprint import HTML
+
+        font_config, stylesheet = _pdf_resources()
+        pdf = HTML(string=self._generate_html(inputs, results)).write_pdf(
+            stylesheets=[stylesheet], font_config=font_config
+        )
+        self.cache.set(key, pdf)
+        return pdf
+
+    def _generate_html(self, inputs: DealInputs, results: Results) -> str:
+        # Summary KPIs
+        payback_str = f"{results.payback_months:.1f} months" if results.payback_months else "No payback"
+
+        # Ops vs Revenue split
+        ops_pct = results.ops_vs_revenue_split.get("ops_savings", 0)
+        revenue_pct = results.ops_vs_revenue_split.get("revenue_retained", 0)
+
+        scenarios = results.p10_p50_p90
+
+        year_rows = "".join(YEAR_ROW.substitute(
+            year=yr.year,
+            baseline_cost=f"{yr.baseline_cost:,.0f}",
+            ai_cost=f"{yr.ai_cost:,.0f}",
+            ops_savings=f"{yr.ops_savings:,.0f}",
+            revenue_retained=f"{yr.revenue_retained:,.0f}",
+            total_value=f"{yr.total_value:,.0f}",
+        ) for yr in results.yearly)
+
+        tornado_rows = "".join(TORNADO_ROW.substitute(
+            driver=escape(driver),
+            width=f"{min(100, abs(impact)/10000):.1f}",
+            impact=f"{abs(impact):,.0f}",
+        ) for driver, impact in results.tornado)
+
+        intent_rows = "".join(INTENT_ROW.substitute(
+            name=escape(intent.name),
+            volume_share=f"{intent.volume_share:.1%}",
+            avg_minutes=f"{intent.avg_minutes:.1f}",
+            containment_m3=f"{intent.containment_m3:.1%}",
+        ) for intent in inputs.intents)
+
+        return REPORT_TEMPLATE.substitute(
+            total_value=f"{sum(yr.total_value for yr in results.yearly):,.0f}",
+            payback=payback_str,
+            npv=f"{results.npv_5y:,.0f}",
+            roi=f"{results.roi_5y:.1f}",
+            ops_pct=f"{ops_pct:.1f}",
+            revenue_pct=f"{revenue_pct:.1f}",
+            year_rows=year_rows,
+            tornado_rows=tornado_rows,
+            p10=f"{scenarios['p10']:,.0f}",
+            p50=f"{scenarios['p50']:,.0f}",
+            p90=f"{scenarios['p90']:,.0f}",
+            p10_vs_base=f"{((scenarios['p10'] / scenarios['p50'] - 1) * 100):+.1f}",
+            p90_vs_base=f"{((scenarios['p90'] / scenarios['p50'] - 1) * 100):+.1f}",
+            annual_calls=f"{inputs.annual_calls:,}",
+            agent_cost=f"{inputs.agent_cost_per_min:.2f}",
+            polyai_cost=f"{inputs.polyai_cost_per_min:.2f}",
+            baseline_abandon=f"{inputs.baseline_abandon_rate:.1%}",
+            ai_abandon=f"{inputs.ai_abandon_rate:.1%}",
+            volume_growth=f"{inputs.volume_growth:.1%}",
+            discount_rate=f"{inputs.discount_rate:.1%}",
+            intent_rows=intent_rows,
+        )
+
     def _generate_css(self) -> str:
-        return """
-        @page {
-            size: A4;
-            margin: 2cm;
-        }
-        
-        body {
-            font-family: Arial, sans-serif;
-            font-size: 11pt;
-            line-height: 1.4;
-            color: #333;
-        }
-        
-        .page {
-            page-break-after: always;
-        }
-        
-        .page:last-child {
-            page-break-after: avoid;
-        }
-        
-        h1 {
-            color: #2c3e50;
-            border-bottom: 2px solid #3498db;
-            padding-bottom: 10px;
-            margin-bottom: 20px;
-        }
-        
-        h2 {
-            color: #34495e;
-            margin-top: 25px;
-            margin-bottom: 15px;
-        }
-        
-        .kpi-grid {
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            gap: 15px;
-            margin-bottom: 25px;
-        }
-        
-        .kpi-card {
-            border: 1px solid #ddd;
-            padding: 15px;
-            text-align: center;
-            background-color: #f8f9fa;
-        }
-        
-        .kpi-card h3 {
-            margin: 0 0 10px 0;
-            font-size: 12pt;
-            color: #5a6c7d;
-        }
-        
-        .kpi-value {
-            font-size: 18pt;
-            font-weight: bold;
-            color: #2c3e50;
-        }
-        
-        .data-table {
-            width: 100%;
-            border-collapse: collapse;
-            margin-bottom: 20px;
-        }
-        
-        .data-table th,
-        .data-table td {
-            padding: 8px;
-            text-align: left;
-            border: 1px solid #ddd;
-        }
-        
-        .data-table th {
-            background-color: #f8f9fa;
-            font-weight: bold;
-        }
-        
-        .data-table .base-case {
-            background-color: #e8f5e8;
-        }
-        
-        .tornado-chart {
-            margin: 20px 0;
-        }
-        
-        .tornado-bar {
-            display: flex;
-            align-items: center;
-            margin-bottom: 10px;
-            font-size: 10pt;
-        }
-        
-        .driver-name {
-            width: 150px;
-            flex-shrink: 0;
-        }
-        
-        .bar-container {
-            flex-grow: 1;
-            height: 20px;
-            background-color: #f0f0f0;
-            margin: 0 10px;
-            position: relative;
-        }
-        
-        .bar {
-            height: 100%;
-            background-color: #3498db;
-        }
-        
-        .impact-value {
-            width: 80px;
-            text-align: right;
-            flex-shrink: 0;
-        }
-        
-        .split-chart {
-            margin: 15px 0;
-        }
-        
-        .split-item {
-            padding: 10px;
-            margin: 5px 0;
-            background-color: #f8f9fa;
-            border-left: 4px solid #3498db;
-        }
-        
-        .disclaimer {
-            margin-top: 30px;
-            padding: 15px;
-            background-color: #f8f9fa;
-            border: 1px solid #ddd;
-        }
-        
-        .disclaimer h3 {
-            margin-top: 0;
-            color: #e74c3c;
-        }
-        
-        .disclaimer ul {
-            margin-bottom: 0;
-        }
-        """
+        return REPORT_CSS
 
 
 class CSVExporter:
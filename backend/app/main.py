@@ -1,25 +1,43 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from pydantic import ValidationError
 from .config import get_settings
+from .executor import ExecutorBusy, get_executor
+from .export_jobs import DONE as EXPORT_DONE, EXPORT_FORMATS, FAILED as EXPORT_FAILED, get_export_jobs
+from .result_cache import canonical_key, get_result_cache
+from .calc_sessions import StaleVersion, get_session_store
+from .services.api_keys import get_key_usage_recorder
+from .services.counters import get_counter_aggregator
+from .services.session_ingest import get_session_ingest_queue
+from .services.session_partitions import get_partition_maintainer
 
 # Import legacy models (backward compatibility)
 try:
-    from .models import DealInputs, Results, VerticalTemplate
-    from .calc_engine import ROICalculator
+    from .models import CalculationPatch, CalculationSession, DealInputs, Results, VerticalTemplate
+    from .calc_engine import ROICalculator, calculate, calculate_batch_json
     from .templates import get_template
 except ImportError:
     # Legacy imports not available yet
     pass
 
+try:
+    from .exports import ExcelExporter
+except ImportError:
+    # openpyxl not installed
+    pass
+
 # Import new API routers
 from .api.auth import router as auth_router
 from .api.calculators import router as calculator_router
 from .api.templates import router as template_router
+from .middleware.auth import require_admin
 
 from functools import lru_cache
+from typing import Any, AsyncIterator, List, Optional, Tuple
 import csv
 import io
+import json
 
 settings = get_settings()
 
@@ -44,6 +62,61 @@ app.include_router(calculator_router)
 app.include_router(template_router)
 
 
+@app.on_event("startup")
+def start_counter_flusher():
+    get_counter_aggregator().start()
+
+
+@app.on_event("startup")
+def start_session_ingest():
+    get_session_ingest_queue().start()
+
+
+@app.on_event("startup")
+def start_key_usage_flusher():
+    get_key_usage_recorder().start()
+
+
+@app.on_event("startup")
+def clean_export_jobs():
+    get_export_jobs().cleanup()
+
+
+@app.on_event("startup")
+def start_partition_maintenance():
+    get_partition_maintainer().start()
+
+
+@app.on_event("shutdown")
+def shutdown_executor():
+    get_executor().shutdown()
+
+
+@app.on_event("shutdown")
+def shutdown_export_jobs():
+    get_export_jobs().shutdown()
+
+
+@app.on_event("shutdown")
+def flush_session_ingest():
+    get_session_ingest_queue().stop()
+
+
+@app.on_event("shutdown")
+def flush_counters():
+    get_counter_aggregator().stop()
+
+
+@app.on_event("shutdown")
+def flush_key_usage():
+    get_key_usage_recorder().stop()
+
+
+@app.on_event("shutdown")
+def stop_partition_maintenance():
+    get_partition_maintainer().stop()
+
+
 @app.get("/")
 async def root():
     return {"message": "PolyAI ROI Calculator API"}
@@ -54,17 +127,205 @@ async def health_check():
     return {"status": "healthy"}
 
 
+async def cached_calculate(inputs: DealInputs, **options: Any) -> Tuple[Results, bool]:
+    """Calculate through the result cache, returning (results, cache_hit)"""
+    # Unseeded Monte Carlo runs are meant to differ, so they are never cached
+    cacheable = not (options.get("draws") and options.get("seed") is None)
+    cache = get_result_cache()
+    key = canonical_key(inputs, **options)
+
+    if cacheable:
+        results = cache.get(key)
+        if results is not None:
+            return results, True
+
+    results = await get_executor().run(calculate, inputs, **options)
+    if cacheable:
+        cache.set(key, results)
+    return results, False
+
+
+@app.get("/api/calc/cache", dependencies=[Depends(require_admin)])
+async def calculation_cache_stats():
+    """Result cache hit/miss counters (admins only)"""
+    return get_result_cache().stats()
+
+
 @app.post("/api/calc", response_model=Results)
-async def calculate_roi(inputs: DealInputs):
+async def calculate_roi(
+    inputs: DealInputs,
+    response: Response,
+    draws: int = Query(0, ge=0, le=settings.MONTE_CARLO_MAX_DRAWS, description="Monte Carlo draws, 0 for the 3-point estimate"),
+    seed: Optional[int] = Query(None, description="Seed for reproducible Monte Carlo draws"),
+    payback_horizon: int = Query(36, ge=1, le=settings.PAYBACK_MAX_HORIZON_MONTHS, description="Months searched for payback"),
+    fractional_payback: bool = Query(False, description="Interpolate payback within the crossing month")
+):
     """Calculate ROI based on provided inputs"""
     try:
-        calculator = ROICalculator(inputs)
-        results = calculator.calculate()
+        results, hit = await cached_calculate(
+            inputs, draws=draws, seed=seed,
+            payback_horizon=payback_horizon, fractional_payback=fractional_payback
+        )
+        response.headers["X-Cache"] = "HIT" if hit else "MISS"
         return results
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+# Edit sessions recalculate in well under a millisecond, so they run inline on
+# the event loop; this also serializes concurrent edits to the same session.
+@app.post("/api/calc/sessions", response_model=CalculationSession, status_code=201)
+async def create_calculation_session(
+    inputs: DealInputs,
+    payback_horizon: int = Query(36, ge=1, le=settings.PAYBACK_MAX_HORIZON_MONTHS, description="Months searched for payback"),
+    fractional_payback: bool = Query(False, description="Interpolate payback within the crossing month")
+):
+    """Start an incremental calculation session for an editor"""
+    session = get_session_store().create(
+        inputs, payback_horizon=payback_horizon, fractional_payback=fractional_payback
+    )
+    return CalculationSession(id=session.id, version=session.version, results=session.results)
+
+
+@app.patch("/api/calc/sessions/{session_id}", response_model=CalculationSession)
+async def patch_calculation_session(session_id: str, patch: CalculationPatch):
+    """Apply an edit to a calculation session, recomputing only what changed"""
+    store = get_session_store()
+    session = store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Calculation session not found or expired")
+
+    try:
+        results = session.apply(patch)
+    except StaleVersion as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=json.loads(e.json(include_url=False, include_input=False)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    store.save(session)
+    return CalculationSession(id=session.id, version=session.version, results=results)
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    Streaming response for endpoints that keep reading the request body while responding.
+
+    StreamingResponse listens for client disconnects on receive(), which would
+    swallow the request body chunks that the generator is still consuming.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def _ndjson_items(request: Request) -> AsyncIterator[bytes]:
+    """Yield non-empty lines of an NDJSON request body as they arrive"""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+async def _list_items(items: List[Any]) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+
+async def _stream_batch(items: AsyncIterator[Any], payback_horizon: int,
+                        fractional_payback: bool) -> AsyncIterator[str]:
+    """Validate deals and compute them chunk by chunk, emitting one NDJSON line per deal"""
+    chunk: List[Tuple[int, DealInputs]] = []
+    errors: List[Tuple[int, str]] = []
+
+    async def flush() -> List[str]:
+        results = []
+        while chunk and not results:
+            try:
+                results = await get_executor().run(
+                    calculate_batch_json, [deal for _, deal in chunk],
+                    payback_horizon=payback_horizon, fractional_payback=fractional_payback
+                )
+            except ExecutorBusy:
+                # Batches are long-running; keep waiting for a slot rather than failing mid-stream
+                continue
+        lines = errors + [
+            (index, f'{{"index": {index}, "results": {result}}}\n')
+            for (index, _), result in zip(chunk, results)
+        ]
+        chunk.clear()
+        errors.clear()
+        return [line for _, line in sorted(lines)]
+
+    index = -1
+    async for item in items:
+        index += 1
+        if index >= settings.BATCH_MAX_DEALS:
+            errors.append((index, json.dumps({"index": index, "error": f"Batch limited to {settings.BATCH_MAX_DEALS} deals"}) + "\n"))
+            break
+        try:
+            if isinstance(item, bytes):
+                deal = DealInputs.model_validate_json(item)
+            else:
+                deal = DealInputs.model_validate(item)
+        except ValidationError as e:
+            errors.append((index, f'{{"index": {index}, "error": {e.json(include_url=False, include_input=False)}}}\n'))
+            continue
+
+        chunk.append((index, deal))
+        if len(chunk) >= settings.BATCH_CHUNK_SIZE:
+            for line in await flush():
+                yield line
+
+    for line in await flush():
+        yield line
+
+
+@app.post("/api/calc/batch")
+async def calculate_roi_batch(
+    request: Request,
+    payback_horizon: int = Query(36, ge=1, le=settings.PAYBACK_MAX_HORIZON_MONTHS, description="Months searched for payback"),
+    fractional_payback: bool = Query(False, description="Interpolate payback within the crossing month")
+):
+    """
+    Calculate ROI for many deals, streaming results back as NDJSON.
+
+    Accepts a JSON array of DealInputs, or an NDJSON stream when sent with
+    Content-Type application/x-ndjson. Each output line is either
+    {"index": i, "results": {...}} or {"index": i, "error": [...]}; invalid
+    deals are reported without failing the rest of the batch.
+    """
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        return DuplexStreamingResponse(
+            _stream_batch(_ndjson_items(request), payback_horizon, fractional_payback),
+            media_type="application/x-ndjson"
+        )
+
+    try:
+        body = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array of deals")
+    if not isinstance(body, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array of deals")
+    if len(body) > settings.BATCH_MAX_DEALS:
+        raise HTTPException(status_code=413, detail=f"Batch limited to {settings.BATCH_MAX_DEALS} deals")
+
+    return StreamingResponse(
+        _stream_batch(_list_items(body), payback_horizon, fractional_payback),
+        media_type="application/x-ndjson"
+    )
+
+
 @app.get("/api/templates")
 async def get_templates():
     """Get available vertical templates based on real PolyAI case studies"""
@@ -105,51 +366,90 @@ async def get_template_data(vertical: VerticalTemplate):
         raise HTTPException(status_code=400, detail=str(e))
 
 
-# @app.post("/api/export/xlsx")
-# async def export_xlsx(inputs: DealInputs):
-#     """Export results as Excel file with formulas"""
-#     try:
-#         calculator = ROICalculator(inputs)
-#         results = calculator.calculate()
-#         
-#         exporter = ExcelExporter()
-#         excel_bytes = exporter.create_workbook(inputs, results)
-#         
-#         return Response(
-#             content=excel_bytes,
-#             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-#             headers={"Content-Disposition": "attachment; filename=roi_analysis.xlsx"}
-#         )
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=str(e))
-
-
-# @app.post("/api/export/pdf")
-# async def export_pdf(inputs: DealInputs):
-#     """Export results as PDF report"""
-#     try:
-#         calculator = ROICalculator(inputs)
-#         results = calculator.calculate()
-#         
-#         exporter = PDFExporter()
-#         pdf_bytes = exporter.create_report(inputs, results)
-#         
-#         return Response(
-#             content=pdf_bytes,
-#             media_type="application/pdf",
-#             headers={"Content-Disposition": "attachment; filename=roi_report.pdf"}
-#         )
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=str(e))
+@app.post("/api/export/xlsx")
+async def export_xlsx(inputs: DealInputs):
+    """Export results as an Excel workbook, streamed while it is written"""
+    try:
+        # Same options as a default /api/calc call, so export after calculate is a cache hit
+        results, _ = await cached_calculate(
+            inputs, draws=0, seed=None, payback_horizon=36, fractional_payback=False
+        )
+        # The writer takes a slot on the shared executor, so concurrent exports are bounded too
+        stream = await ExcelExporter().stream_workbook(inputs, results, get_executor())
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(
+        stream,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": "attachment; filename=roi_analysis.xlsx"}
+    )
+
+
+async def submit_export(export_format: str, inputs: DealInputs) -> JSONResponse:
+    try:
+        # Same options as a default /api/calc call, so export after calculate is a cache hit
+        results, _ = await cached_calculate(
+            inputs, draws=0, seed=None, payback_horizon=36, fractional_payback=False
+        )
+        job = await get_export_jobs().submit(export_format, inputs, results)
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return JSONResponse(
+        {**job, "status_url": f"/api/exports/{job['id']}"},
+        status_code=202,
+        headers={"Location": f"/api/exports/{job['id']}"}
+    )
+
+
+@app.post("/api/export/pdf", status_code=202)
+async def export_pdf(inputs: DealInputs):
+    """Start a PDF report export; poll the returned status_url for the file"""
+    return await submit_export("pdf", inputs)
+
+
+@app.post("/api/exports/{export_format}", status_code=202)
+async def export_in_background(export_format: str, inputs: DealInputs):
+    """Start an XLSX or PDF export; poll the returned status_url for the file"""
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=404, detail=f"Unknown export format '{export_format}'")
+    return await submit_export(export_format, inputs)
+
+
+@app.get("/api/exports/{job_id}")
+async def get_export(job_id: str):
+    """Export job status (202 while rendering), or the file once it is done"""
+    jobs = get_export_jobs()
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export not found or expired")
+
+    if job["status"] == EXPORT_DONE:
+        media_type, filename = EXPORT_FORMATS[job["format"]]
+        return FileResponse(jobs.artifact(job), media_type=media_type, filename=filename)
+
+    return JSONResponse(job, status_code=200 if job["status"] == EXPORT_FAILED else 202)
 
 
 @app.post("/api/export/csv")
 async def export_csv(inputs: DealInputs):
     """Export results as CSV file"""
     try:
-        calculator = ROICalculator(inputs)
-        results = calculator.calculate()
-        
+        # Same options as a default /api/calc call, so export after calculate is a cache hit
+        results, _ = await cached_calculate(
+            inputs, draws=0, seed=None, payback_horizon=36, fractional_payback=False
+        )
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    try:
         # Create CSV content
         output = io.StringIO()
         writer = csv.writer(output)
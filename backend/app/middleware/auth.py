@@ -1,24 +1,48 @@
 """Authentication middleware and dependencies"""
 from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from fastapi.security import APIKeyHeader, HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from uuid import UUID
 from ..database import get_db
 from ..models.user import User
 from ..models.organization import Organization
+from ..services.api_keys import APIKeyPrincipal, get_api_key_index, get_key_usage_recorder
+from ..services.auth_service import AuthService, Principal
+from ..services.principal_cache import get_principal_cache
 from ..utils.security import verify_token
 
 security = HTTPBearer()
+api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 
-def get_current_user(
+async def get_current_principal(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user from JWT token"""
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    """
+    Get the authenticated user and their organization from the JWT token.
+
+    Cached principals need no query; otherwise the user and organization
+    are loaded together in one joined query. FastAPI resolves this once per
+    request, however many dependencies build on it.
+    """
 
     token = credentials.credentials
+    cache = get_principal_cache()
+
+    # Recently verified tokens skip the decode and the user query
+    cached = cache.get_user(token)
+    if cached is not None:
+        user = cached[1]
+        organization = cache.get_organization(user.organization_id)
+        if organization is None:
+            generation = cache.generation
+            organization = await db.scalar(select(Organization).where(Organization.id == user.organization_id))
+            if organization is not None:
+                cache.set_organization(organization, generation)
+        return Principal(user, organization)
 
     # Verify token
     payload = verify_token(token, token_type="access")
@@ -29,46 +53,112 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user_id = payload.get("sub")
-    if not user_id:
+    try:
+        user_id = UUID(payload.get("sub") or "")
+    except ValueError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token payload",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # Get user from database
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    # Get user and organization from database
+    generation = cache.generation
+    principal = await AuthService.get_principal(db, User.id == user_id)
+    if not principal:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    if not user.is_active:
+    if not principal.user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Inactive user"
         )
 
-    return user
+    cache.set_user(token, payload, principal.user, generation)
+    if principal.organization is not None:
+        cache.set_organization(principal.organization, generation)
+    return principal
+
+
+async def get_current_user(principal: Principal = Depends(get_current_principal)) -> User:
+    """Get current authenticated user from JWT token"""
+    return principal.user
 
 
-def get_current_organization(
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-) -> Organization:
+async def get_current_organization(principal: Principal = Depends(get_current_principal)) -> Organization:
     """Get current user's organization"""
 
-    organization = db.query(Organization).filter(Organization.id == user.organization_id).first()
-    if not organization:
+    if principal.organization is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Organization not found"
         )
 
-    return organization
+    return principal.organization
+
+
+async def get_api_key_principal(
+    api_key: Optional[str] = Depends(api_key_header),
+    db: AsyncSession = Depends(get_db)
+) -> APIKeyPrincipal:
+    """
+    Authenticate an X-API-Key header and attach the key's organization.
+
+    Keys resolve from the in-memory key index and organizations from the
+    principal cache, so a warm request needs no query; last_used_at is
+    written behind.
+    """
+
+    if not api_key:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="API key required",
+            headers={"WWW-Authenticate": "APIKey"},
+        )
+
+    entry = await get_api_key_index().lookup(db, api_key)
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired API key",
+            headers={"WWW-Authenticate": "APIKey"},
+        )
+
+    cache = get_principal_cache()
+    organization = cache.get_organization(entry.organization_id)
+    if organization is None:
+        generation = cache.generation
+        organization = await db.scalar(select(Organization).where(Organization.id == entry.organization_id))
+        if organization is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired API key",
+                headers={"WWW-Authenticate": "APIKey"},
+            )
+        cache.set_organization(organization, generation)
+
+    get_key_usage_recorder().record(entry.id)
+    return APIKeyPrincipal(entry.id, organization)
+
+
+async def get_optional_api_key_principal(
+    api_key: Optional[str] = Depends(api_key_header),
+    db: AsyncSession = Depends(get_db)
+) -> Optional[APIKeyPrincipal]:
+    """
+    Authenticate an X-API-Key header if one is sent, otherwise return None (for public endpoints).
+
+    Unlike get_optional_user, a key that is sent must be valid: a revoked
+    or expired key gets a 401 rather than falling back to anonymous access.
+    """
+
+    if not api_key:
+        return None
+    return await get_api_key_principal(api_key, db)
 
 
 def require_role(required_role: str):
@@ -92,9 +182,13 @@ def require_role(required_role: str):
     return role_checker
 
 
-def get_optional_user(
+# Operational endpoints (pool and cache statistics) are for admins only
+require_admin = require_role("admin")
+
+
+async def get_optional_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Optional[User]:
     """Get current user if token is provided, otherwise return None (for public endpoints)"""
 
@@ -103,15 +197,21 @@ def get_optional_user(
 
     try:
         token = credentials.credentials
+        cache = get_principal_cache()
+        cached = cache.get_user(token)
+        if cached is not None:
+            return cached[1]
+
         payload = verify_token(token, token_type="access")
         if not payload:
             return None
 
-        user_id = payload.get("sub")
-        if not user_id:
-            return None
+        user_id = UUID(payload.get("sub") or "")
 
-        user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
+        generation = cache.generation
+        user = await db.scalar(select(User).where(User.id == user_id, User.is_active == True))
+        if user is not None:
+            cache.set_user(token, payload, user, generation)
         return user
     except Exception:
         return None
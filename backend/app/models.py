@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional, Dict, Tuple
+from typing import Any, List, Optional, Dict, Tuple
 from enum import Enum
 
 
@@ -60,9 +60,22 @@ class Results(BaseModel):
     ops_vs_revenue_split: Dict[str, float] = Field(..., description="Split between ops savings and revenue")
     tornado: List[Tuple[str, float]] = Field(..., description="Top sensitivity drivers")
     p10_p50_p90: Dict[str, float] = Field(..., description="Scenario analysis")
+    distribution: Optional[Dict[str, Dict[str, Optional[float]]]] = Field(None, description="Monte Carlo P10/P50/P90 of NPV, ROI and payback")
     yearly: List[YearResult] = Field(..., description="Year-by-year breakdown")
 
 
+class CalculationPatch(BaseModel):
+    version: Optional[int] = Field(None, description="Session version the edit was made against; rejected if stale")
+    changes: Dict[str, Any] = Field(default_factory=dict, description="Changed DealInputs fields")
+    intents: Dict[int, Dict[str, Any]] = Field(default_factory=dict, description="Changed IntentRow fields by row index")
+
+
+class CalculationSession(BaseModel):
+    id: str
+    version: int = Field(..., description="Incremented on every applied edit")
+    results: Results
+
+
 class VerticalTemplate(str, Enum):
     UTILITIES = "utilities"
     RESTAURANTS = "restaurants"
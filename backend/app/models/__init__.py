@@ -5,6 +5,7 @@ from .calculator import Calculator
 from .session import CalculatorSession
 from .api_key import APIKey
 from .audit_log import AuditLog
+from .analytics import CalculatorDailyStats, CalculatorResultBucket
 
 __all__ = [
     "Organization",
@@ -13,4 +14,6 @@ __all__ = [
     "CalculatorSession",
     "APIKey",
     "AuditLog",
+    "CalculatorDailyStats",
+    "CalculatorResultBucket",
 ]
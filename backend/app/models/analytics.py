@@ -0,0 +1,42 @@
+"""Pre-aggregated calculator analytics models"""
+from sqlalchemy import Column, String, Integer, Float, Date, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID
+from ..database import Base
+
+
+class CalculatorDailyStats(Base):
+    """Per-calculator, per-day session counts, maintained as sessions are ingested"""
+    __tablename__ = "calculator_daily_stats"
+
+    calculator_id = Column(UUID(as_uuid=True), ForeignKey("calculators.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+
+    # Counts
+    views = Column(Integer, nullable=False, default=0)
+    completions = Column(Integer, nullable=False, default=0)
+    leads = Column(Integer, nullable=False, default=0)
+
+    # Completed sessions with a client-reported start time, and the sum of their
+    # completed_at - created_at, for the average time to complete
+    timed_completions = Column(Integer, nullable=False, default=0)
+    completion_seconds = Column(Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<CalculatorDailyStats {self.calculator_id} {self.day}>"
+
+
+class CalculatorResultBucket(Base):
+    """Histogram of one result metric per calculator and day, on a log scale"""
+    __tablename__ = "calculator_result_buckets"
+
+    calculator_id = Column(UUID(as_uuid=True), ForeignKey("calculators.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    metric = Column(String(255), primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+
+    # Sessions whose result fell in the bucket, and the sum of those results
+    count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<CalculatorResultBucket {self.calculator_id} {self.day} {self.metric}[{self.bucket}]>"
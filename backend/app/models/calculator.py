@@ -45,7 +45,8 @@ class Calculator(Base):
     # Relationships
     organization = relationship("Organization", back_populates="calculators")
     creator = relationship("User", foreign_keys=[created_by], back_populates="created_calculators")
-    sessions = relationship("CalculatorSession", back_populates="calculator", cascade="all, delete-orphan")
+    sessions = relationship("CalculatorSession", back_populates="calculator", cascade="all, delete-orphan",
+                            passive_deletes=True)  # The database cascades, without loading every session
 
     def __repr__(self):
         return f"<Calculator {self.name} ({self.slug})>"
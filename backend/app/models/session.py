@@ -1,6 +1,6 @@
 """Calculator Session model"""
 import uuid
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, JSON, Text
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Index, JSON, Text
 from sqlalchemy.dialects.postgresql import UUID, INET
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -8,7 +8,14 @@ from ..database import Base
 
 
 class CalculatorSession(Base):
-    """Calculator session (analytics) model"""
+    """
+    Calculator session (analytics) model.
+
+    The table is range-partitioned by month on created_at (see
+    services/session_partitions.py), so the primary key includes created_at
+    and session_token can't carry a unique constraint; tokens are 256-bit
+    random values.
+    """
     __tablename__ = "calculator_sessions"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -17,7 +24,7 @@ class CalculatorSession(Base):
     calculator_id = Column(UUID(as_uuid=True), ForeignKey("calculators.id", ondelete="CASCADE"), nullable=False)
 
     # Session tracking
-    session_token = Column(String(255), unique=True, nullable=False, index=True)
+    session_token = Column(String(255), nullable=False, index=True)
 
     # Data
     inputs = Column(JSON, nullable=True)  # User inputs
@@ -38,11 +45,18 @@ class CalculatorSession(Base):
     exported = Column(Boolean, default=False)
 
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
 
     # Relationships
     calculator = relationship("Calculator", back_populates="sessions")
 
+    __table_args__ = (
+        Index("ix_calculator_sessions_calculator_created", "calculator_id", "created_at"),
+        Index("ix_calculator_sessions_leads", "calculator_id", "created_at",
+              postgresql_where=lead_email.isnot(None)),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
     def __repr__(self):
         return f"<CalculatorSession {self.id} for Calculator {self.calculator_id}>"
@@ -0,0 +1,121 @@
+"""Content-addressed cache for ROI calculation results"""
+import hashlib
+import json
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from .config import get_settings
+from .models import DealInputs, Results
+from .utils.cache import LocalCacheBackend
+
+# Bump when a calc_engine change alters results, so stale entries in a shared backend are ignored
+CACHE_VERSION = "1"
+
+FLOAT_DIGITS = 12
+
+
+def _normalize(value: Any) -> Any:
+    """Round floats to FLOAT_DIGITS significant digits so 0.1 + 0.2 and 0.3 hash alike"""
+    if isinstance(value, float):
+        return float(f"{value:.{FLOAT_DIGITS}g}") + 0.0  # + 0.0 folds -0.0 into 0.0
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def canonical_key(inputs: DealInputs, **options: Any) -> str:
+    """
+    Stable hash of the deal inputs and calculation options.
+
+    Intents are sorted, since their order only changes floating-point
+    summation order and not the results.
+    """
+    data = _normalize(inputs.model_dump())
+    data["intents"] = sorted(data["intents"], key=lambda intent: json.dumps(intent, sort_keys=True))
+    payload = json.dumps(
+        {"v": CACHE_VERSION, "inputs": data, "options": _normalize(options)},
+        sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class RedisCacheBackend:
+    """Shared cache across API workers; Redis handles TTL and eviction (maxmemory-policy allkeys-lru)"""
+
+    def __init__(self, url: str, ttl_seconds: float = 300.0, prefix: str = "calc:"):
+        import redis  # Optional dependency, only needed when RESULT_CACHE_URL is set
+
+        self._client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes) -> None:
+        self._client.set(self.prefix + key, value, px=int(self.ttl_seconds * 1000))
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(match=self.prefix + "*"):
+            self._client.delete(key)
+
+
+class ResultCache:
+    """
+    Caches serialized Results by canonical_key.
+
+    Backend errors are counted and treated as misses, so an unavailable
+    shared cache degrades to recomputation rather than failing requests.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, key: str) -> Optional[Results]:
+        try:
+            value = self.backend.get(key)
+        except Exception:
+            self.errors += 1
+            value = None
+
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return Results.model_validate_json(value)
+
+    def set(self, key: str, results: Results) -> None:
+        try:
+            self.backend.set(key, results.model_dump_json().encode())
+        except Exception:
+            self.errors += 1
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+@lru_cache()
+def get_result_cache() -> ResultCache:
+    """Get the process-wide result cache"""
+    settings = get_settings()
+    if settings.RESULT_CACHE_URL:
+        backend = RedisCacheBackend(settings.RESULT_CACHE_URL, ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS)
+    else:
+        backend = LocalCacheBackend(settings.RESULT_CACHE_MAX_ENTRIES, settings.RESULT_CACHE_TTL_SECONDS)
+    return ResultCache(backend)
@@ -0,0 +1,203 @@
+"""Daily analytics rollups, maintained incrementally as sessions are ingested"""
+import argparse
+import math
+from collections import defaultdict
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..models.analytics import CalculatorDailyStats, CalculatorResultBucket
+from ..models.calculator import Calculator
+from ..models.session import CalculatorSession
+
+# Result histograms use log-scale buckets: 20 per decade (~12% wide) from 1e-6 up, mirrored for
+# negative values. Each bucket also keeps the sum of its values, so its mean is exact.
+BUCKETS_PER_DECADE = 20
+MIN_MAGNITUDE = 1e-6
+
+DailyKey = Tuple[Any, date]
+BucketKey = Tuple[Any, date, str, int]
+
+
+def result_bucket(value: float) -> int:
+    """Histogram bucket for a result value; 0 holds values within MIN_MAGNITUDE of zero"""
+    magnitude = abs(value)
+    if magnitude < MIN_MAGNITUDE:
+        return 0
+    index = int(math.floor(math.log10(magnitude / MIN_MAGNITUDE) * BUCKETS_PER_DECADE)) + 1
+    return index if value > 0 else -index
+
+
+def bucket_percentiles(buckets: Dict[int, Tuple[int, float]], fractions: Dict[str, float]) -> Dict[str, float]:
+    """
+    Estimate percentiles from histogram buckets of (count, total).
+
+    A percentile is the mean of the bucket holding its rank, so estimates
+    are within one bucket width of percentile_cont over the raw values.
+    """
+    ordered = sorted(buckets.items())
+    count = sum(bucket_count for _, (bucket_count, _) in ordered)
+    estimates = {}
+    for name, fraction in fractions.items():
+        rank = fraction * (count - 1)
+        seen = 0
+        for _, (bucket_count, total) in ordered:
+            seen += bucket_count
+            if rank < seen:
+                estimates[name] = total / bucket_count
+                break
+    return estimates
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def session_deltas(rows: Iterable[Dict[str, Any]]) -> Tuple[Dict[DailyKey, Dict[str, float]], Dict[BucketKey, List[float]]]:
+    """Sum session rows into daily counts and result histogram increments"""
+    daily: Dict[DailyKey, Dict[str, float]] = defaultdict(
+        lambda: {"views": 0, "completions": 0, "leads": 0, "timed_completions": 0, "completion_seconds": 0.0}
+    )
+    buckets: Dict[BucketKey, List[float]] = defaultdict(lambda: [0, 0.0])
+
+    for row in rows:
+        day = row["created_at"].date()
+        counts = daily[(row["calculator_id"], day)]
+        counts["views"] += 1
+        if row.get("lead_email"):
+            counts["leads"] += 1
+        if row.get("completed_at") is not None:
+            counts["completions"] += 1
+            # Sessions without a client start time start and complete at once; they aren't timed
+            if row["completed_at"] > row["created_at"]:
+                counts["timed_completions"] += 1
+                counts["completion_seconds"] += (row["completed_at"] - row["created_at"]).total_seconds()
+
+        for metric, value in (row.get("results") or {}).items():
+            if _is_number(value):
+                bucket = buckets[(row["calculator_id"], day, metric, result_bucket(value))]
+                bucket[0] += 1
+                bucket[1] += value
+
+    return daily, buckets
+
+
+def daily_stats_upsert(daily: Dict[DailyKey, Dict[str, float]]):
+    """INSERT ... ON CONFLICT statement and parameters adding daily increments"""
+    table = CalculatorDailyStats.__table__
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.calculator_id, table.c.day],
+        set_={name: table.c[name] + statement.excluded[name]
+              for name in ("views", "completions", "leads", "timed_completions", "completion_seconds")}
+    )
+    # Sorted so concurrent writers lock rows in the same order
+    rows = [{"calculator_id": calculator_id, "day": day, **counts}
+            for (calculator_id, day), counts in sorted(daily.items(), key=lambda item: (str(item[0][0]), item[0][1]))]
+    return statement, rows
+
+
+def result_buckets_upsert(buckets: Dict[BucketKey, List[float]]):
+    """INSERT ... ON CONFLICT statement and parameters adding histogram increments"""
+    table = CalculatorResultBucket.__table__
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.calculator_id, table.c.day, table.c.metric, table.c.bucket],
+        set_={"count": table.c.count + statement.excluded.count,
+              "total": table.c.total + statement.excluded.total}
+    )
+    rows = [{"calculator_id": calculator_id, "day": day, "metric": metric, "bucket": bucket,
+             "count": count, "total": total}
+            for (calculator_id, day, metric, bucket), (count, total)
+            in sorted(buckets.items(), key=lambda item: (str(item[0][0]),) + item[0][1:])]
+    return statement, rows
+
+
+def apply_daily_rollups(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """Add newly ingested session rows to the rollups, in the caller's transaction"""
+    daily, buckets = session_deltas(rows)
+    if daily:
+        db.execute(*daily_stats_upsert(daily))
+    if buckets:
+        db.execute(*result_buckets_upsert(buckets))
+
+
+def lead_upsert(calculator_id: UUID, created_at: datetime):
+    """Rollup update for a lead captured on an existing session"""
+    return daily_stats_upsert({
+        (calculator_id, created_at.date()): {"views": 0, "completions": 0, "leads": 1, "timed_completions": 0,
+                                              "completion_seconds": 0.0}
+    })
+
+
+def backfill_daily_rollups(db: Session, calculator_id: Optional[UUID] = None,
+                           until: Optional[date] = None, chunk_size: int = 5000) -> int:
+    """
+    Rebuild rollups from calculator_sessions for days before `until` (default today).
+
+    Each calculator is rebuilt in its own transaction, streaming its
+    sessions in chunks. Days from `until` on are left to live ingestion,
+    so the job can run while the API is serving. Returns the number of
+    sessions processed.
+    """
+    until = until or datetime.utcnow().date()
+    cutoff = datetime.combine(until, time.min)
+    columns = [CalculatorSession.calculator_id, CalculatorSession.created_at, CalculatorSession.completed_at,
+               CalculatorSession.lead_email, CalculatorSession.results]
+
+    if calculator_id is not None:
+        calculator_ids = [calculator_id]
+    else:
+        calculator_ids = db.scalars(select(Calculator.id)).all()
+
+    processed = 0
+    for current_id in calculator_ids:
+        for model in (CalculatorDailyStats, CalculatorResultBucket):
+            db.execute(delete(model).where(model.calculator_id == current_id, model.day < until))
+
+        daily: Dict[DailyKey, Dict[str, float]] = {}
+        buckets: Dict[BucketKey, List[float]] = {}
+        result = db.execute(
+            select(*columns)
+            .where(CalculatorSession.calculator_id == current_id, CalculatorSession.created_at < cutoff)
+            .execution_options(yield_per=chunk_size)
+        )
+        for chunk in result.mappings().partitions():
+            chunk_daily, chunk_buckets = session_deltas(chunk)
+            for key, counts in chunk_daily.items():
+                totals = daily.setdefault(key, dict.fromkeys(counts, 0))
+                for name, value in counts.items():
+                    totals[name] += value
+            for key, (count, total) in chunk_buckets.items():
+                bucket = buckets.setdefault(key, [0, 0.0])
+                bucket[0] += count
+                bucket[1] += total
+            processed += len(chunk)
+
+        if daily:
+            db.execute(*daily_stats_upsert(daily))
+        if buckets:
+            db.execute(*result_buckets_upsert(buckets))
+        db.commit()
+
+    return processed
+
+
+if __name__ == "__main__":
+    from ..database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Rebuild calculator analytics rollups from sessions")
+    parser.add_argument("--calculator", type=UUID, help="Only rebuild this calculator")
+    parser.add_argument("--until", type=date.fromisoformat, help="Rebuild days before this date (default today)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        count = backfill_daily_rollups(db, args.calculator, args.until)
+    finally:
+        db.close()
+    print(f"Rolled up {count} sessions")
@@ -0,0 +1,291 @@
+"""API key resolution: in-memory index of active keys and write-behind last_used_at"""
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from sqlalchemy import bindparam, event, inspect, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from ..config import get_settings
+from ..models.api_key import APIKey
+from ..models.organization import Organization
+from ..utils.cache import LocalCacheBackend
+from ..utils.security import hash_api_key
+from .calculator_cache import LocalInvalidationBus, RedisInvalidationBus
+
+logger = logging.getLogger(__name__)
+
+# Unknown keys are remembered for a while, so repeated bad keys don't each cost a query
+MAX_MISSES = 10000
+
+
+class APIKeyEntry(NamedTuple):
+    id: Any
+    organization_id: Any
+    expires_at: Optional[datetime]
+
+    def expired(self, now: datetime) -> bool:
+        if self.expires_at is None:
+            return False
+        expires_at = self.expires_at
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return expires_at <= now
+
+
+class APIKeyPrincipal(NamedTuple):
+    api_key_id: Any
+    organization: Organization
+
+
+INDEX_COLUMNS = (APIKey.id, APIKey.key_hash, APIKey.organization_id, APIKey.expires_at, APIKey.created_at)
+
+
+class APIKeyIndex:
+    """
+    Active API keys by hash, so authenticating a key costs no query.
+
+    The index is loaded on first use. Every refresh_interval seconds keys
+    created since the newest one seen are added, and every reload_interval
+    seconds the index is rebuilt, which picks up deactivations made outside
+    the app. Keys created, changed or deleted through the ORM are
+    invalidated once committed (see the session hooks below), here and in
+    other workers through the bus. A hash that isn't indexed is looked up
+    directly, which covers keys committed after a refresh read past them;
+    unknown hashes are then remembered until the next refresh.
+    """
+
+    def __init__(self, refresh_interval: float = 30.0, reload_interval: float = 600.0, bus=None):
+        self.refresh_interval = refresh_interval
+        self.reload_interval = reload_interval
+        self._entries: Dict[str, APIKeyEntry] = {}
+        self._misses = LocalCacheBackend(MAX_MISSES, refresh_interval)
+        self._watermark: Optional[datetime] = None  # Newest created_at indexed
+        self._refreshed_at: Optional[float] = None
+        self._reloaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self.generation = 0  # Bumped by every invalidation
+        self.bus = bus or LocalInvalidationBus()
+        self.bus.subscribe(self._evict)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def lookup(self, db: AsyncSession, key: str) -> Optional[APIKeyEntry]:
+        """The active, unexpired key matching `key`, or None"""
+        await self._maybe_refresh(db)
+
+        key_hash = hash_api_key(key)
+        entry = self._entries.get(key_hash)
+        if entry is None:
+            if self._misses.get(key_hash) is not None:
+                return None
+            generation = self.generation
+            row = (await db.execute(
+                select(*INDEX_COLUMNS).where(APIKey.key_hash == key_hash, APIKey.is_active == True)
+            )).first()
+            if row is None:
+                self._misses.set(key_hash, True)
+                return None
+            entry = self._add(row, generation)
+
+        if entry.expired(datetime.now(timezone.utc)):
+            return None
+        return entry
+
+    async def _maybe_refresh(self, db: AsyncSession) -> None:
+        now = time.monotonic()
+        reload = self._reloaded_at is None or now - self._reloaded_at >= self.reload_interval
+        if not reload and now - self._refreshed_at < self.refresh_interval:
+            return
+
+        # Claimed before the query, so concurrent requests keep using the current index meanwhile
+        previous = self._refreshed_at, self._reloaded_at
+        self._refreshed_at = now
+        if reload:
+            self._reloaded_at = now
+
+        generation = self.generation
+        statement = select(*INDEX_COLUMNS).where(APIKey.is_active == True)
+        if not reload and self._watermark is not None:
+            statement = statement.where(APIKey.created_at >= self._watermark)
+        try:
+            rows = (await db.execute(statement)).all()
+        except Exception:
+            self._refreshed_at, self._reloaded_at = previous
+            logger.exception("API key index refresh failed; serving the current index")
+            return
+
+        if reload:
+            with self._lock:
+                self._entries, self._watermark = {}, None
+        for row in rows:
+            self._add(row, generation)
+        self._misses.clear()
+
+    def _add(self, row, generation: int) -> Optional[APIKeyEntry]:
+        """Index a key row, unless an invalidation happened since `generation` was read"""
+        entry = APIKeyEntry(row.id, row.organization_id, row.expires_at)
+        with self._lock:
+            if generation == self.generation:
+                self._entries[row.key_hash] = entry
+                if row.created_at is not None and (self._watermark is None or row.created_at > self._watermark):
+                    self._watermark = row.created_at
+        return entry
+
+    def invalidate(self, key_hash: str) -> None:
+        """Forget a key (and any miss recorded for it), so its next use reads the database"""
+        self._evict(key_hash)
+        try:
+            self.bus.publish(key_hash)
+        except Exception:
+            # Other workers still converge at their next reload
+            pass
+
+    def _evict(self, key_hash: str) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key_hash, None)
+            self._misses.delete(key_hash)
+
+
+class KeyUsageRecorder:
+    """
+    Buffers API key use and writes last_used_at in batches.
+
+    Recording use per request would update the key row on every call; the
+    latest use per key is kept in memory instead and flushed every
+    flush_interval seconds as one executemany, which never moves
+    last_used_at backwards. Failed flushes are retried, and the buffer is
+    flushed on shutdown (and at interpreter exit as a fallback).
+    """
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None, flush_interval: float = 60.0):
+        self._session_factory = session_factory
+        self.flush_interval = flush_interval  # 0 writes every use through immediately
+        self._pending: Dict[Any, datetime] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _new_session(self) -> Session:
+        if self._session_factory is None:
+            from ..database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def record(self, key_id, used_at: Optional[datetime] = None) -> None:
+        used_at = used_at or datetime.now(timezone.utc)
+        with self._lock:
+            self._merge(key_id, used_at)
+
+        if self.flush_interval <= 0:
+            self.flush()
+
+    def _merge(self, key_id, used_at: datetime) -> None:
+        current = self._pending.get(key_id)
+        if current is None or used_at > current:
+            self._pending[key_id] = used_at
+
+    def flush(self) -> int:
+        """Write buffered uses; returns the number of keys updated"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            rows = [{"key_id": key_id, "used_at": used_at} for key_id, used_at in batch.items()]
+            table = APIKey.__table__
+            statement = (
+                update(table)
+                .where(table.c.id == bindparam("key_id"),
+                       or_(table.c.last_used_at.is_(None), table.c.last_used_at < bindparam("used_at")))
+                .values(last_used_at=bindparam("used_at"))
+            )
+
+            db = self._new_session()
+            try:
+                db.execute(statement, rows)
+                db.commit()
+            except Exception:
+                db.rollback()
+                logger.exception("API key usage flush failed; keeping %d keys for retry", len(rows))
+                with self._lock:
+                    for key_id, used_at in batch.items():
+                        self._merge(key_id, used_at)
+                return 0
+            finally:
+                db.close()
+
+            return len(rows)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def start(self) -> None:
+        """Start the background flusher thread"""
+        if self.flush_interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="api-key-usage-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flusher and write everything still buffered"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+@lru_cache()
+def get_api_key_index() -> APIKeyIndex:
+    """Get the process-wide API key index"""
+    settings = get_settings()
+    bus = None
+    if settings.CACHE_PUBSUB_URL:
+        bus = RedisInvalidationBus(settings.CACHE_PUBSUB_URL, channel="calcforge:api-key-invalidations")
+    return APIKeyIndex(settings.API_KEY_INDEX_REFRESH_SECONDS, settings.API_KEY_INDEX_RELOAD_SECONDS, bus)
+
+
+@lru_cache()
+def get_key_usage_recorder() -> KeyUsageRecorder:
+    """Get the process-wide API key usage recorder"""
+    recorder = KeyUsageRecorder(flush_interval=get_settings().API_KEY_LAST_USED_FLUSH_SECONDS)
+    atexit.register(recorder.flush)
+    return recorder
+
+
+@event.listens_for(APIKey, "after_insert")
+@event.listens_for(APIKey, "after_update")
+@event.listens_for(APIKey, "after_delete")
+def _api_key_changed(mapper, connection, api_key: APIKey) -> None:
+    # Invalidated after commit, so a concurrent request can't re-index the key as it was
+    session = object_session(api_key)
+    if session is not None:
+        hashes = session.info.setdefault("api_key_invalidations", set())
+        hashes.add(api_key.key_hash)
+        hashes.update(inspect(api_key).attrs.key_hash.history.deleted or ())  # A rotated key's old hash
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_invalidations(session: Session) -> None:
+    invalidations = session.info.pop("api_key_invalidations", None)
+    if invalidations:
+        index = get_api_key_index()
+        for key_hash in invalidations:
+            index.invalidate(key_hash)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session: Session) -> None:
+    session.info.pop("api_key_invalidations", None)
@@ -1,36 +1,58 @@
 """Authentication service"""
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 from datetime import datetime, timedelta
 from ..models.user import User
 from ..models.organization import Organization
-from ..utils.security import hash_password, verify_password, create_access_token, create_refresh_token, generate_slug
+from ..utils.security import create_access_token, create_refresh_token, generate_slug
 from ..schemas.auth import UserSignup, UserLogin, TokenResponse, AuthResponse, UserResponse, OrganizationResponse
-from uuid import uuid4
+from typing import NamedTuple, Optional
+from uuid import UUID, uuid4
+from .passwords import get_password_hasher, password_errors
+
+
+class Principal(NamedTuple):
+    """An authenticated user with their organization"""
+    user: User
+    organization: Optional[Organization]
 
 
 class AuthService:
     """Authentication service for user management"""
 
     @staticmethod
-    def signup(db: Session, signup_data: UserSignup) -> AuthResponse:
+    async def get_principal(db: AsyncSession, *conditions) -> Optional[Principal]:
+        """Load a user matching conditions together with their organization, in one query"""
+        row = (await db.execute(
+            select(User, Organization)
+            .outerjoin(Organization, Organization.id == User.organization_id)
+            .where(*conditions)
+        )).first()
+        return Principal(*row) if row else None
+
+    @staticmethod
+    async def signup(db: AsyncSession, signup_data: UserSignup, client_ip: Optional[str] = None) -> AuthResponse:
         """Register a new user and organization"""
 
         # Check if user already exists
-        existing_user = db.query(User).filter(User.email == signup_data.email).first()
+        existing_user = await db.scalar(select(User.id).where(User.email == signup_data.email))
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Email already registered"
             )
 
+        with password_errors():
+            password_hash = await get_password_hasher().hash(signup_data.password, client_ip)
+
         # Create organization
         org_slug = generate_slug(signup_data.organization_name)
 
         # Ensure unique slug
         base_slug = org_slug
         counter = 1
-        while db.query(Organization).filter(Organization.slug == org_slug).first():
+        while await db.scalar(select(Organization.id).where(Organization.slug == org_slug)):
             org_slug = f"{base_slug}-{counter}"
             counter += 1
 
@@ -42,12 +64,12 @@ class AuthService:
             trial_ends_at=datetime.utcnow() + timedelta(days=14)  # 14-day trial
         )
         db.add(organization)
-        db.flush()
+        await db.flush()
 
         # Create user
         user = User(
             email=signup_data.email,
-            password_hash=hash_password(signup_data.password),
+            password_hash=password_hash,
             full_name=signup_data.full_name,
             organization_id=organization.id,
             role="admin",
@@ -55,9 +77,9 @@ class AuthService:
             email_verified=False
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
-        db.refresh(organization)
+        await db.commit()
+        await db.refresh(user)
+        await db.refresh(organization)
 
         # Create tokens
         access_token = create_access_token({"sub": str(user.id), "org_id": str(organization.id)})
@@ -73,19 +95,23 @@ class AuthService:
         )
 
     @staticmethod
-    def login(db: Session, login_data: UserLogin) -> AuthResponse:
+    async def login(db: AsyncSession, login_data: UserLogin, client_ip: Optional[str] = None) -> AuthResponse:
         """Authenticate user and return tokens"""
 
-        # Find user
-        user = db.query(User).filter(User.email == login_data.email).first()
-        if not user:
+        # Find user, with their organization
+        principal = await AuthService.get_principal(db, User.email == login_data.email)
+        if not principal:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password"
             )
 
-        # Verify password
-        if not verify_password(login_data.password, user.password_hash):
+        user, organization = principal
+
+        # Verify password (bcrypt is slow by design, so it runs on the bounded password pool)
+        with password_errors():
+            valid = await get_password_hasher().verify(login_data.password, user.password_hash, client_ip)
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password"
@@ -100,10 +126,7 @@ class AuthService:
 
         # Update last login
         user.last_login_at = datetime.utcnow()
-        db.commit()
-
-        # Get organization
-        organization = db.query(Organization).filter(Organization.id == user.organization_id).first()
+        await db.commit()
 
         # Create tokens
         access_token = create_access_token({"sub": str(user.id), "org_id": str(organization.id)})
@@ -119,7 +142,7 @@ class AuthService:
         )
 
     @staticmethod
-    def refresh_token(db: Session, refresh_token: str) -> TokenResponse:
+    async def refresh_token(db: AsyncSession, refresh_token: str) -> TokenResponse:
         """Refresh access token using refresh token"""
         from ..utils.security import verify_token
 
@@ -131,8 +154,14 @@ class AuthService:
                 detail="Invalid or expired refresh token"
             )
 
-        user_id = payload.get("sub")
-        user = db.query(User).filter(User.id == user_id).first()
+        try:
+            user_id = UUID(payload.get("sub") or "")
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired refresh token"
+            )
+        user = await db.scalar(select(User).where(User.id == user_id))
 
         if not user or not user.is_active:
             raise HTTPException(
@@ -0,0 +1,122 @@
+"""In-process cache of published calculators for the public endpoints"""
+import threading
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from ..config import get_settings
+from ..utils.cache import LocalCacheBackend
+from ..schemas.calculator import CalculatorResponse
+
+
+class LocalInvalidationBus:
+    """
+    In-process stand-in for a pub/sub channel.
+
+    Delivers invalidations to subscribers in this worker only; other workers
+    pick up changes when their cache entries expire.
+    """
+
+    def __init__(self):
+        self._subscribers: List[Callable[[str], None]] = []
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        self._subscribers.append(callback)
+
+    def publish(self, message: str) -> None:
+        for callback in self._subscribers:
+            callback(message)
+
+
+class RedisInvalidationBus:
+    """Fans invalidations out to every API worker through a Redis pub/sub channel"""
+
+    def __init__(self, url: str, channel: str = "calcforge:calculator-invalidations"):
+        import redis  # Optional dependency, only needed when CACHE_PUBSUB_URL is set
+
+        self._client = redis.Redis.from_url(url)
+        self.channel = channel
+        self._subscribers: List[Callable[[str], None]] = []
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{channel: self._dispatch})
+        self._thread = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def _dispatch(self, message: dict) -> None:
+        data = message["data"]
+        for callback in self._subscribers:
+            callback(data.decode() if isinstance(data, bytes) else data)
+
+    def subscribe(self, callback: Callable[[str], None]) -> None:
+        self._subscribers.append(callback)
+
+    def publish(self, message: str) -> None:
+        self._client.publish(self.channel, message)
+
+
+class PublishedCalculatorCache:
+    """
+    LRU + TTL cache of published calculators by (org slug, calc slug).
+
+    Entries are CalculatorResponse snapshots, so a hit needs no database
+    query; compiled formulas are cached separately per (id, updated_at) by
+    CalculatorService.get_formula_plan. Editing, publishing or deleting a
+    calculator invalidates its entry here and, through the bus, in the other
+    workers. The TTL bounds staleness when no shared bus is configured; the
+    view and completion counters in a snapshot may lag by up to the TTL.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0, bus=None):
+        self._entries = LocalCacheBackend(max_entries, ttl_seconds)
+        self._keys: Dict[str, Tuple[str, str]] = {}  # calculator id -> cache key
+        self._lock = threading.Lock()
+        self._generation = 0  # Bumped by every invalidation
+        self.bus = bus or LocalInvalidationBus()
+        self.bus.subscribe(self._evict)
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, org_slug: str, calc_slug: str,
+                  load: Callable[[], Awaitable[CalculatorResponse]]) -> CalculatorResponse:
+        """Get a cached calculator, awaiting load() to fetch it on a miss"""
+        key = (org_slug, calc_slug)
+        calculator = self._entries.get(key)
+        if calculator is not None:
+            self.hits += 1
+            return calculator
+
+        self.misses += 1
+        generation = self._generation
+        calculator = await load()
+        with self._lock:
+            # Don't cache a snapshot that an invalidation may have overtaken while loading
+            if generation == self._generation:
+                self._keys[str(calculator.id)] = key
+                self._entries.set(key, calculator)
+        return calculator
+
+    def invalidate(self, calculator_id) -> None:
+        """Drop a calculator from this worker's cache and tell the other workers to do the same"""
+        self._evict(str(calculator_id))
+        try:
+            self.bus.publish(str(calculator_id))
+        except Exception:
+            # Other workers still converge once their entries expire
+            pass
+
+    def _evict(self, calculator_id: str) -> None:
+        with self._lock:
+            self._generation += 1
+            key = self._keys.pop(calculator_id, None)
+            if key is not None:
+                self._entries.delete(key)
+
+
+@lru_cache()
+def get_published_calculator_cache() -> PublishedCalculatorCache:
+    """Get the process-wide published calculator cache"""
+    settings = get_settings()
+    bus = RedisInvalidationBus(settings.CACHE_PUBSUB_URL) if settings.CACHE_PUBSUB_URL else None
+    return PublishedCalculatorCache(
+        settings.PUBLIC_CALCULATOR_CACHE_MAX_ENTRIES,
+        settings.PUBLIC_CALCULATOR_CACHE_TTL_SECONDS,
+        bus
+    )
@@ -1,14 +1,19 @@
 """Calculator service for business logic"""
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, desc, select
 from fastapi import HTTPException, status
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional, Dict, Any, Union
+from collections import OrderedDict
+from datetime import datetime, timezone
 from uuid import UUID, uuid4
 import secrets
+import threading
 
+from ..config import get_settings
 from ..models.calculator import Calculator
 from ..models.session import CalculatorSession
+from ..models.analytics import CalculatorDailyStats, CalculatorResultBucket
 from ..models.organization import Organization
 from ..models.user import User
 from ..schemas.calculator import (
@@ -17,15 +22,27 @@ from ..schemas.calculator import (
     LeadCaptureRequest, AnalyticsResponse
 )
 from ..utils.security import generate_slug
-from .formula_engine import FormulaEngine
+from .formula_engine import FormulaEngine, FormulaPlan
+from .calculator_cache import get_published_calculator_cache
+from .counters import get_counter_aggregator
+from .session_ingest import get_session_ingest_queue
+from .analytics_rollup import bucket_percentiles, lead_upsert
+
+# Formula plans per calculator version (id, updated_at), most recently used last
+FORMULA_PLANS_MAX_ENTRIES = 1024
+_formula_plans: "OrderedDict[tuple, FormulaPlan]" = OrderedDict()
+_formula_plans_lock = threading.Lock()
+
+# Percentiles of each result metric reported in analytics top_results
+RESULT_PERCENTILES = {"p10": 0.1, "median": 0.5, "p90": 0.9}
 
 
 class CalculatorService:
     """Service for calculator operations"""
 
     @staticmethod
-    def create_calculator(
-        db: Session,
+    async def create_calculator(
+        db: AsyncSession,
         user: User,
         calculator_data: CalculatorCreate
     ) -> Calculator:
@@ -36,10 +53,10 @@ class CalculatorService:
         slug = base_slug
         counter = 1
 
-        while db.query(Calculator).filter(
+        while await db.scalar(select(Calculator.id).where(
             Calculator.organization_id == user.organization_id,
             Calculator.slug == slug
-        ).first():
+        ).limit(1)):
             slug = f"{base_slug}-{counter}"
             counter += 1
 
@@ -55,23 +72,23 @@ class CalculatorService:
         )
 
         db.add(calculator)
-        db.commit()
-        db.refresh(calculator)
+        await db.commit()
+        await db.refresh(calculator)
 
         return calculator
 
     @staticmethod
-    def get_calculator(
-        db: Session,
+    async def get_calculator(
+        db: AsyncSession,
         calculator_id: UUID,
         organization_id: UUID
     ) -> Calculator:
         """Get calculator by ID"""
 
-        calculator = db.query(Calculator).filter(
+        calculator = await db.scalar(select(Calculator).where(
             Calculator.id == calculator_id,
             Calculator.organization_id == organization_id
-        ).first()
+        ))
 
         if not calculator:
             raise HTTPException(
@@ -82,18 +99,18 @@ class CalculatorService:
         return calculator
 
     @staticmethod
-    def get_calculator_by_slug(
-        db: Session,
+    async def get_calculator_by_slug(
+        db: AsyncSession,
         org_slug: str,
         calc_slug: str
     ) -> Calculator:
         """Get calculator by organization slug and calculator slug (for public access)"""
 
-        calculator = db.query(Calculator).join(Organization).filter(
+        calculator = await db.scalar(select(Calculator).join(Organization).where(
             Organization.slug == org_slug,
             Calculator.slug == calc_slug,
             Calculator.status == "published"
-        ).first()
+        ))
 
         if not calculator:
             raise HTTPException(
@@ -104,8 +121,22 @@ class CalculatorService:
         return calculator
 
     @staticmethod
-    def list_calculators(
-        db: Session,
+    async def get_published_calculator(
+        db: AsyncSession,
+        org_slug: str,
+        calc_slug: str
+    ) -> CalculatorResponse:
+        """Get a published calculator for the public endpoints, served from cache when possible"""
+
+        async def load() -> CalculatorResponse:
+            calculator = await CalculatorService.get_calculator_by_slug(db, org_slug, calc_slug)
+            return CalculatorResponse.model_validate(calculator)
+
+        return await get_published_calculator_cache().get(org_slug, calc_slug, load)
+
+    @staticmethod
+    async def list_calculators(
+        db: AsyncSession,
         organization_id: UUID,
         page: int = 1,
         page_size: int = 20,
@@ -113,20 +144,20 @@ class CalculatorService:
     ) -> CalculatorListResponse:
         """List calculators for an organization"""
 
-        query = db.query(Calculator).filter(
+        query = select(Calculator).where(
             Calculator.organization_id == organization_id
         )
 
         if status_filter:
-            query = query.filter(Calculator.status == status_filter)
+            query = query.where(Calculator.status == status_filter)
 
         # Count total
-        total = query.count()
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
 
         # Paginate
-        calculators = query.order_by(desc(Calculator.updated_at)).offset(
+        calculators = (await db.scalars(query.order_by(desc(Calculator.updated_at)).offset(
             (page - 1) * page_size
-        ).limit(page_size).all()
+        ).limit(page_size))).all()
 
         return CalculatorListResponse(
             items=[CalculatorResponse.model_validate(c) for c in calculators],
@@ -137,15 +168,15 @@ class CalculatorService:
         )
 
     @staticmethod
-    def update_calculator(
-        db: Session,
+    async def update_calculator(
+        db: AsyncSession,
         calculator_id: UUID,
         organization_id: UUID,
         update_data: CalculatorUpdate
     ) -> Calculator:
         """Update calculator"""
 
-        calculator = CalculatorService.get_calculator(db, calculator_id, organization_id)
+        calculator = await CalculatorService.get_calculator(db, calculator_id, organization_id)
 
         # Update fields
         if update_data.name is not None:
@@ -161,106 +192,185 @@ class CalculatorService:
 
         calculator.updated_at = datetime.utcnow()
 
-        db.commit()
-        db.refresh(calculator)
+        if calculator.status == "published":
+            CalculatorService.validate_formulas(calculator)
+
+        await db.commit()
+        await db.refresh(calculator)
+
+        get_published_calculator_cache().invalidate(calculator.id)
 
         return calculator
 
     @staticmethod
-    def delete_calculator(
-        db: Session,
+    async def delete_calculator(
+        db: AsyncSession,
         calculator_id: UUID,
         organization_id: UUID
     ) -> None:
         """Delete calculator"""
 
-        calculator = CalculatorService.get_calculator(db, calculator_id, organization_id)
-        db.delete(calculator)
-        db.commit()
+        calculator = await CalculatorService.get_calculator(db, calculator_id, organization_id)
+        await db.delete(calculator)
+        await db.commit()
+
+        get_published_calculator_cache().invalidate(calculator_id)
 
     @staticmethod
-    def publish_calculator(
-        db: Session,
+    async def publish_calculator(
+        db: AsyncSession,
         calculator_id: UUID,
         organization_id: UUID
     ) -> Calculator:
         """Publish calculator"""
 
-        calculator = CalculatorService.get_calculator(db, calculator_id, organization_id)
+        calculator = await CalculatorService.get_calculator(db, calculator_id, organization_id)
         calculator.status = "published"
         calculator.published_at = datetime.utcnow()
         calculator.updated_at = datetime.utcnow()
 
-        db.commit()
-        db.refresh(calculator)
+        CalculatorService.validate_formulas(calculator)
+
+        await db.commit()
+        await db.refresh(calculator)
+
+        get_published_calculator_cache().invalidate(calculator.id)
 
         return calculator
 
     @staticmethod
-    def create_session(
-        db: Session,
-        calculator: Calculator,
+    def get_formula_plan(calculator: Union[Calculator, CalculatorResponse]) -> FormulaPlan:
+        """
+        Get the calculator's compiled, dependency-ordered formulas.
+
+        Plans are built once per calculator version: edits bump updated_at, so
+        a changed calculator gets a new cache entry and the stale one ages out
+        of the LRU.
+
+        Raises:
+            ValueError: If a formula is invalid or formulas form a cycle
+        """
+        key = (calculator.id, calculator.updated_at)
+        with _formula_plans_lock:
+            plan = _formula_plans.get(key)
+            if plan is not None:
+                _formula_plans.move_to_end(key)
+                return plan
+
+        plan = FormulaEngine.plan(CalculatorService.get_formulas(calculator))
+
+        with _formula_plans_lock:
+            _formula_plans[key] = plan
+            while len(_formula_plans) > FORMULA_PLANS_MAX_ENTRIES:
+                _formula_plans.popitem(last=False)
+
+        return plan
+
+    @staticmethod
+    def get_formulas(calculator: Union[Calculator, CalculatorResponse]) -> Dict[str, str]:
+        """Get the calculator's formula definitions keyed by result name"""
+        formulas = (calculator.config or {}).get("calculations", {}).get("formulas", {})
+
+        # Convert formula list to dict if needed
+        if isinstance(formulas, list):
+            formulas = {f["id"]: f["formula"] for f in formulas}
+
+        return formulas
+
+    @staticmethod
+    def validate_formulas(calculator: Calculator) -> None:
+        """Check formulas compile and are acyclic, so publishing surfaces formula errors"""
+        try:
+            FormulaEngine.plan(CalculatorService.get_formulas(calculator))
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid formulas: {str(e)}"
+            )
+
+    @staticmethod
+    async def create_session(
+        db: AsyncSession,
+        calculator: Union[Calculator, CalculatorResponse],
         inputs: Dict[str, Any],
         ip_address: Optional[str] = None,
         user_agent: Optional[str] = None,
-        referrer: Optional[str] = None
+        referrer: Optional[str] = None,
+        started_at: Optional[datetime] = None
     ) -> CalculatorSession:
-        """Create a calculator session and calculate results"""
+        """
+        Create a calculator session and calculate results.
 
-        # Increment views
-        calculator.views_count += 1
+        started_at is when the visitor opened the calculator, as reported
+        by the client; it becomes the session's created_at, so the session
+        counts toward the average time to complete. Without it (or if it's
+        in the future or implausibly old) the session starts and completes
+        now, and goes untimed.
+        """
 
         # Generate session token
         session_token = secrets.token_urlsafe(32)
 
         # Calculate results using formula engine
         try:
-            formulas = calculator.config.get("calculations", {}).get("formulas", {})
-
-            # Convert formula list to dict if needed
-            if isinstance(formulas, list):
-                formulas = {f["id"]: f["formula"] for f in formulas}
-
-            results = FormulaEngine.calculate_roi_metrics(inputs, formulas)
+            plan = CalculatorService.get_formula_plan(calculator)
+            results = FormulaEngine.calculate_roi_metrics(inputs, plan)
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Calculation error: {str(e)}"
             )
 
-        # Create session
-        session = CalculatorSession(
-            calculator_id=calculator.id,
-            session_token=session_token,
-            inputs=inputs,
-            results=results,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            referrer=referrer,
-            completed=True,
-            completed_at=datetime.utcnow()
-        )
-
-        # Increment completions
-        calculator.completions_count += 1
-
-        db.add(session)
-        db.commit()
-        db.refresh(session)
+        # Create session; id and timestamps are set here since the row is written later
+        now = datetime.utcnow()
+        created_at = now
+        if started_at is not None:
+            if started_at.tzinfo is not None:
+                started_at = started_at.astimezone(timezone.utc).replace(tzinfo=None)
+            if 0 < (now - started_at).total_seconds() <= get_settings().SESSION_MAX_DURATION_SECONDS:
+                created_at = started_at
+        row = {
+            "id": uuid4(),
+            "calculator_id": calculator.id,
+            "session_token": session_token,
+            "inputs": inputs,
+            "results": results,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "referrer": referrer,
+            "completed": True,
+            "exported": False,
+            "created_at": created_at,
+            "completed_at": now
+        }
+        session = CalculatorSession(**row)
+
+        # Bulk-inserted in the background; if the queue is full, write it ourselves (off the event loop)
+        ingest_queue = get_session_ingest_queue()
+        if not ingest_queue.submit(row):
+            await run_in_threadpool(ingest_queue.write, [row])
+
+        # Buffered and flushed in batches, so hot calculators don't serialize on their row lock
+        get_counter_aggregator().increment(calculator.id, views=1, completions=1)
 
         return session
 
     @staticmethod
-    def capture_lead(
-        db: Session,
+    async def capture_lead(
+        db: AsyncSession,
         session_token: str,
         lead_data: LeadCaptureRequest
     ) -> CalculatorSession:
         """Capture lead information for a session"""
 
-        session = db.query(CalculatorSession).filter(
+        # The session may still be waiting in the ingestion queue; flushing it blocks, so run it off the loop
+        ingest_queue = get_session_ingest_queue()
+        if ingest_queue.is_pending(session_token):
+            await run_in_threadpool(ingest_queue.ensure_written, session_token)
+
+        session = await db.scalar(select(CalculatorSession).where(
             CalculatorSession.session_token == session_token
-        ).first()
+        ))
 
         if not session:
             raise HTTPException(
@@ -268,53 +378,53 @@ class CalculatorService:
                 detail="Session not found"
             )
 
+        # Count the lead in the daily rollup the first time one is captured for the session
+        if not session.lead_email:
+            await db.execute(*lead_upsert(session.calculator_id, session.created_at))
+
         # Update lead information
         session.lead_email = lead_data.email
         session.lead_name = lead_data.name
         session.lead_company = lead_data.company
 
-        db.commit()
-        db.refresh(session)
+        await db.commit()
 
         return session
 
     @staticmethod
-    def get_analytics(
-        db: Session,
+    async def get_analytics(
+        db: AsyncSession,
         calculator_id: UUID,
         organization_id: UUID
     ) -> AnalyticsResponse:
         """Get analytics for a calculator"""
 
-        calculator = CalculatorService.get_calculator(db, calculator_id, organization_id)
-
-        # Get sessions
-        sessions = db.query(CalculatorSession).filter(
-            CalculatorSession.calculator_id == calculator_id
-        ).all()
+        calculator = await CalculatorService.get_calculator(db, calculator_id, organization_id)
 
-        total_views = calculator.views_count
-        total_completions = calculator.completions_count
+        # Include increments still buffered in this worker
+        pending = get_counter_aggregator().pending(calculator.id)
+        total_views = (calculator.views_count or 0) + pending["views_count"]
+        total_completions = (calculator.completions_count or 0) + pending["completions_count"]
         conversion_rate = (total_completions / total_views * 100) if total_views > 0 else 0
-        leads_captured = sum(1 for s in sessions if s.lead_email)
-
-        # Sessions by day
-        sessions_by_day = db.query(
-            func.date(CalculatorSession.created_at).label('date'),
-            func.count(CalculatorSession.id).label('count')
-        ).filter(
-            CalculatorSession.calculator_id == calculator_id
-        ).group_by(
-            func.date(CalculatorSession.created_at)
-        ).all()
+
+        # Daily rollups: one row per day with sessions, however many sessions there were
+        daily = (await db.scalars(select(CalculatorDailyStats).where(
+            CalculatorDailyStats.calculator_id == calculator_id
+        ).order_by(CalculatorDailyStats.day))).all()
 
         sessions_by_day_data = [
-            {"date": str(day.date), "count": day.count}
-            for day in sessions_by_day
+            {"date": str(row.day), "count": row.views, "leads": row.leads}
+            for row in daily
         ]
+        leads_captured = sum(row.leads for row in daily)
+        # Only sessions with a client-reported start time have a duration
+        timed = sum(row.timed_completions for row in daily)
+        avg_time_to_complete = (
+            sum(row.completion_seconds for row in daily) / timed
+            if timed else None
+        )
 
-        # Top results (most common ROI ranges)
-        top_results = []  # TODO: Implement based on results data
+        top_results = await CalculatorService.get_result_percentiles(db, calculator_id)
 
         return AnalyticsResponse(
             calculator_id=calculator_id,
@@ -322,7 +432,43 @@ class CalculatorService:
             total_completions=total_completions,
             conversion_rate=conversion_rate,
             leads_captured=leads_captured,
-            avg_time_to_complete=None,  # TODO: Calculate
+            avg_time_to_complete=avg_time_to_complete,
             sessions_by_day=sessions_by_day_data,
             top_results=top_results
         )
+
+    @staticmethod
+    async def get_result_percentiles(
+        db: AsyncSession,
+        calculator_id: UUID
+    ) -> List[Dict[str, Any]]:
+        """
+        Distribution of each numeric result metric across the calculator's sessions.
+
+        Read from the rollup histograms summed over all days; percentiles are
+        estimated to within one bucket (see analytics_rollup.bucket_percentiles).
+        """
+        rows = (await db.execute(select(
+            CalculatorResultBucket.metric,
+            CalculatorResultBucket.bucket,
+            func.sum(CalculatorResultBucket.count).label('count'),
+            func.sum(CalculatorResultBucket.total).label('total')
+        ).where(
+            CalculatorResultBucket.calculator_id == calculator_id
+        ).group_by(
+            CalculatorResultBucket.metric, CalculatorResultBucket.bucket
+        ))).all()
+
+        histograms: Dict[str, Dict[int, tuple]] = {}
+        for row in rows:
+            histograms.setdefault(row.metric, {})[row.bucket] = (row.count, row.total)
+
+        top_results = []
+        for metric, buckets in sorted(histograms.items()):
+            count = sum(bucket_count for bucket_count, _ in buckets.values())
+            summary = {"metric": metric, "count": count,
+                       "avg": sum(total for _, total in buckets.values()) / count}
+            summary.update(bucket_percentiles(buckets, RESULT_PERCENTILES))
+            top_results.append(summary)
+
+        return top_results
@@ -0,0 +1,122 @@
+"""Write-behind aggregation of calculator view/completion counters"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models.calculator import Calculator
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("views_count", "completions_count")
+
+
+class CounterAggregator:
+    """
+    Buffers counter increments per calculator and writes them in batches.
+
+    Every public calculation used to update the calculator row in its own
+    transaction, so concurrent embeds of a popular calculator queued on that
+    row's lock. Increments are summed in memory instead and flushed every
+    flush_interval seconds as one executemany of
+    ``UPDATE calculators SET views_count = views_count + :views_count, ...``.
+    A failed flush puts its increments back for the next attempt, and the
+    buffer is flushed on shutdown (and at interpreter exit as a fallback).
+    """
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None, flush_interval: float = 5.0):
+        self._session_factory = session_factory
+        self.flush_interval = flush_interval  # 0 writes every increment through immediately
+        self._pending: Dict[Any, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _new_session(self) -> Session:
+        if self._session_factory is None:
+            from ..database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def increment(self, calculator_id, views: int = 0, completions: int = 0) -> None:
+        with self._lock:
+            counts = self._pending[calculator_id]
+            counts["views_count"] += views
+            counts["completions_count"] += completions
+
+        if self.flush_interval <= 0:
+            self.flush()
+
+    def pending(self, calculator_id) -> Dict[str, int]:
+        """Increments not yet written for a calculator"""
+        with self._lock:
+            counts = self._pending.get(calculator_id)
+            return dict(counts) if counts else dict.fromkeys(COUNTERS, 0)
+
+    def flush(self) -> int:
+        """Write buffered increments; returns the number of calculators updated"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+            if not batch:
+                return 0
+
+            rows: List[Dict] = [{"calculator_id": calculator_id, **counts} for calculator_id, counts in batch.items()]
+            table = Calculator.__table__
+            statement = (
+                update(table)
+                .where(table.c.id == bindparam("calculator_id"))
+                .values({name: table.c[name] + bindparam(name) for name in COUNTERS})
+            )
+
+            db = self._new_session()
+            try:
+                db.execute(statement, rows)
+                db.commit()
+            except Exception:
+                db.rollback()
+                logger.exception("Counter flush failed; keeping %d calculators for retry", len(rows))
+                with self._lock:
+                    for calculator_id, counts in batch.items():
+                        for name, value in counts.items():
+                            self._pending[calculator_id][name] += value
+                return 0
+            finally:
+                db.close()
+
+            return len(rows)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def start(self) -> None:
+        """Start the background flusher thread"""
+        if self.flush_interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="counter-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flusher and write everything still buffered"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+@lru_cache()
+def get_counter_aggregator() -> CounterAggregator:
+    """Get the process-wide counter aggregator"""
+    aggregator = CounterAggregator(flush_interval=get_settings().COUNTER_FLUSH_INTERVAL_SECONDS)
+    atexit.register(aggregator.flush)
+    return aggregator
@@ -1,7 +1,278 @@
 """Formula engine for safe expression evaluation"""
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Callable, List, Optional, Set, Tuple
+from functools import lru_cache, reduce
+import ast
+import heapq
 import math
-from simpleeval import simple_eval, NameNotDefined, InvalidExpression
+import operator
+import numpy as np
+from simpleeval import (
+    DEFAULT_OPERATORS, DISALLOW_METHODS, DISALLOW_PREFIXES, MAX_POWER, MAX_STRING_LENGTH, SimpleEval,
+    AttributeDoesNotExist, FeatureNotAvailable, FunctionNotDefined, IterableTooLong, NameNotDefined,
+    NumberTooHigh, InvalidExpression, OperatorNotDefined
+)
+
+
+Evaluator = Callable[[Dict[str, Any]], Any]
+
+
+def _vector_power(a: Any, b: Any) -> np.ndarray:
+    if np.any(np.abs(a) > MAX_POWER) or np.any(np.abs(b) > MAX_POWER):
+        raise NumberTooHigh(f"Sorry! I don't want to evaluate {a} ** {b}")
+    # Float base, so negative integer exponents behave like Python's int ** int
+    return np.power(np.asarray(a, dtype=float), b)
+
+
+def _vector_floordiv(a: Any, b: Any) -> np.ndarray:
+    # Float operands, so a zero divisor gives inf or nan as with /, not 0 as integer columns would
+    return np.floor_divide(np.asarray(a, dtype=float), b)
+
+
+def _vector_mod(a: Any, b: Any) -> np.ndarray:
+    return np.mod(np.asarray(a, dtype=float), b)
+
+
+# Element-wise operators for columnar evaluation. String/list size limits do not
+# apply to numeric columns; identity and membership tests have no row-wise meaning.
+VECTOR_OPERATORS = {
+    **{key: value for key, value in DEFAULT_OPERATORS.items()
+       if key not in (ast.In, ast.NotIn, ast.Is, ast.IsNot)},
+    ast.Add: operator.add,
+    ast.Mult: operator.mul,
+    ast.FloorDiv: _vector_floordiv,
+    ast.Mod: _vector_mod,
+    ast.Pow: _vector_power,
+    ast.Not: np.logical_not,
+}
+
+
+def _vector_extreme(ufunc: np.ufunc) -> Callable:
+    def extreme(*args):
+        # One argument is a list column (rows, items); several are compared row by row
+        if len(args) == 1:
+            return ufunc.reduce(np.asarray(args[0]), axis=-1)
+        return reduce(ufunc, args)
+    return extreme
+
+
+def _vector_npv(rate: Any, cashflows: Any) -> np.ndarray:
+    cashflows = np.asarray(cashflows, dtype=float)
+    periods = np.arange(cashflows.shape[-1])
+    return (cashflows / (1 + np.asarray(rate, dtype=float)[..., None]) ** periods).sum(axis=-1)
+
+
+def _vector_avg(values: Any) -> np.ndarray:
+    values = np.asarray(values, dtype=float)
+    return values.mean(axis=-1) if values.shape[-1] else np.zeros(values.shape[:-1])
+
+
+class CompiledFormula:
+    """
+    A formula parsed and validated once, then evaluated as a tree of closures.
+
+    Supports the same expressions, operators (including simpleeval's size
+    limits on **, * and +) and error types as simple_eval, so evaluating a
+    compiled formula behaves like simple_eval without re-parsing the string.
+    Function names and forbidden attributes are checked at compile time;
+    variables, attributes and methods are looked up at evaluation time.
+    """
+
+    def __init__(self, source: str, functions: Dict[str, Callable], vectorized: bool = False):
+        self.source = source
+        self.functions = functions
+        self.vectorized = vectorized  # Evaluate element-wise over NumPy columns
+        self.operators = VECTOR_OPERATORS if vectorized else DEFAULT_OPERATORS
+        self.variables: Set[str] = set()  # Names read from the evaluation variables
+
+        node = SimpleEval.parse(source)
+        if isinstance(node, (ast.Expr, ast.Assign, ast.AugAssign)):
+            node = node.value
+        self._evaluate = self._compile(node)
+
+    def __call__(self, variables: Dict[str, Any]) -> Any:
+        return self._evaluate(variables)
+
+    def _operator(self, op: ast.AST) -> Callable:
+        try:
+            return self.operators[type(op)]
+        except KeyError:
+            raise OperatorNotDefined(op, self.source)
+
+    def _compile(self, node: ast.AST) -> Evaluator:
+        if isinstance(node, ast.Constant):
+            value = node.value
+            if hasattr(value, "__len__") and len(value) > MAX_STRING_LENGTH:
+                raise IterableTooLong(f"Literal in statement is too long! ({len(value)}, when {MAX_STRING_LENGTH} is max)")
+            return lambda names: value
+
+        if isinstance(node, ast.Name):
+            return self._compile_name(node.id)
+
+        if isinstance(node, ast.BinOp):
+            op = self._operator(node.op)
+            left, right = self._compile(node.left), self._compile(node.right)
+            return lambda names: op(left(names), right(names))
+
+        if isinstance(node, ast.UnaryOp):
+            op = self._operator(node.op)
+            operand = self._compile(node.operand)
+            return lambda names: op(operand(names))
+
+        if isinstance(node, ast.BoolOp):
+            values = [self._compile(value) for value in node.values]
+            stop_on = not isinstance(node.op, ast.And)  # and stops on falsy, or on truthy
+
+            if self.vectorized:
+                def vector_boolop(names):
+                    # Per row: the first value that stops evaluation, else the last value
+                    result = values[-1](names)
+                    for value in reversed(values[:-1]):
+                        current = value(names)
+                        stops = np.asarray(current, dtype=bool) == stop_on
+                        result = np.where(stops, current, result)
+                    return result
+                return vector_boolop
+
+            def boolop(names):
+                result = False
+                for value in values:
+                    result = value(names)
+                    if bool(result) is stop_on:
+                        break
+                return result
+            return boolop
+
+        if isinstance(node, ast.Compare):
+            first = self._compile(node.left)
+            comparisons = [(self._operator(op), self._compile(comp)) for op, comp in zip(node.ops, node.comparators)]
+
+            if self.vectorized:
+                def vector_compare(names):
+                    right = first(names)
+                    result = True
+                    for op, comparator in comparisons:
+                        left, right = right, comparator(names)
+                        result = np.logical_and(result, op(left, right))
+                    return result
+                return vector_compare
+
+            def compare(names):
+                right = first(names)
+                result = True
+                for op, comparator in comparisons:
+                    if not result:
+                        break
+                    left, right = right, comparator(names)
+                    result = op(left, right)
+                return result
+            return compare
+
+        if isinstance(node, ast.IfExp):
+            test, body, orelse = self._compile(node.test), self._compile(node.body), self._compile(node.orelse)
+            if self.vectorized:
+                return lambda names: np.where(test(names), body(names), orelse(names))
+            return lambda names: body(names) if test(names) else orelse(names)
+
+        if isinstance(node, ast.Call):
+            return self._compile_call(node)
+
+        if isinstance(node, ast.Subscript):
+            container, key = self._compile(node.value), self._compile(node.slice)
+            if self.vectorized:
+                # List variables are (rows, items) columns; index the items of every row
+                return lambda names: np.asarray(container(names))[..., key(names)]
+            return lambda names: container(names)[key(names)]
+
+        if isinstance(node, ast.Slice):
+            parts = [self._compile(part) if part is not None else None for part in (node.lower, node.upper, node.step)]
+            return lambda names: slice(*(part(names) if part else None for part in parts))
+
+        if isinstance(node, ast.Attribute):
+            return self._compile_attribute(node)
+
+        if isinstance(node, ast.JoinedStr):
+            if self.vectorized:
+                raise FeatureNotAvailable("Sorry, f-strings are not available in columnar evaluation")
+            parts = [self._compile(value) for value in node.values]
+
+            def joined(names):
+                pieces, length = [], 0
+                for part in parts:
+                    piece = str(part(names))
+                    length += len(piece)
+                    if length > MAX_STRING_LENGTH:
+                        raise IterableTooLong("Sorry, I will not evaluate something this long.")
+                    pieces.append(piece)
+                return "".join(pieces)
+            return joined
+
+        if isinstance(node, ast.FormattedValue):
+            # Like simple_eval, conversions (!r, !s) are ignored
+            value = self._compile(node.value)
+            if node.format_spec is None:
+                return value
+            spec = self._compile(node.format_spec)
+            return lambda names: ("{:" + spec(names) + "}").format(value(names))
+
+        raise FeatureNotAvailable(f"Sorry, {type(node).__name__} is not available in this evaluator")
+
+    def _compile_name(self, name: str) -> Evaluator:
+        self.variables.add(name)
+        functions, source = self.functions, self.source
+
+        def lookup(names):
+            try:
+                return names[name]
+            except KeyError:
+                if name in functions:
+                    return functions[name]
+                raise NameNotDefined(name, source)
+        return lookup
+
+    def _compile_attribute(self, node: ast.Attribute) -> Evaluator:
+        attr, source = node.attr, self.source
+        if self.vectorized:
+            # Columns are NumPy arrays, whose methods include file writers such as tofile and dump
+            raise FeatureNotAvailable(f"Sorry, attribute access is not available in columnar evaluation ({attr})")
+        if any(attr.startswith(prefix) for prefix in DISALLOW_PREFIXES):
+            raise FeatureNotAvailable(f"Sorry, access to __attributes or func_ attributes is not available. ({attr})")
+        if attr in DISALLOW_METHODS:
+            raise FeatureNotAvailable(f"Sorry, this method is not available. ({attr})")
+        value = self._compile(node.value)
+
+        def attribute(names):
+            obj = value(names)
+            try:
+                return getattr(obj, attr)
+            except (AttributeError, TypeError):
+                pass
+            # As in simple_eval, d.key reads d["key"] when d has no such attribute
+            try:
+                return obj[attr]
+            except (KeyError, TypeError):
+                raise AttributeDoesNotExist(attr, source)
+        return attribute
+
+    def _compile_call(self, node: ast.Call) -> Evaluator:
+        args = [self._compile(arg) for arg in node.args]
+        keywords = [(keyword.arg, self._compile(keyword.value)) for keyword in node.keywords]
+
+        if isinstance(node.func, ast.Attribute):
+            # Methods, e.g. name.upper(), are looked up on the value at evaluation time
+            method = self._compile_attribute(node.func)
+            return lambda names: method(names)(*[arg(names) for arg in args],
+                                               **{key: value(names) for key, value in keywords})
+
+        if not isinstance(node.func, ast.Name):
+            raise FeatureNotAvailable("Only calls to the formula functions and methods are available")
+        try:
+            func = self.functions[node.func.id]
+        except KeyError:
+            raise FunctionNotDefined(node.func.id, self.source)
+
+        if not keywords:
+            return lambda names: func(*[arg(names) for arg in args])
+        return lambda names: func(*[arg(names) for arg in args], **{key: value(names) for key, value in keywords})
 
 
 class FormulaEngine:
@@ -30,13 +301,54 @@ class FormulaEngine:
         'range': range,
     }
 
+    # Element-wise counterparts used for columnar evaluation (see calculate_columns)
+    VECTOR_FUNCTIONS = {
+        'abs': np.abs,
+        'round': np.round,
+        'min': _vector_extreme(np.minimum),
+        'max': _vector_extreme(np.maximum),
+        'sum': lambda values: np.sum(values, axis=-1),
+        'len': lambda values: np.shape(values)[-1],
+        'pow': _vector_power,
+        'sqrt': np.sqrt,
+        'ceil': np.ceil,
+        'floor': np.floor,
+        'npv': _vector_npv,
+        'pmt': lambda rate, nper, pv: pv * (rate * (1 + rate) ** nper) / ((1 + rate) ** nper - 1),
+        'avg': _vector_avg,
+    }
+
+    @classmethod
+    def compile(cls, formula: str, vectorized: bool = False) -> CompiledFormula:
+        """
+        Parse and validate a formula once for repeated evaluation.
+
+        Compiled formulas are cached by their source text, so a calculator's
+        formulas are only parsed again when the calculator is edited. With
+        vectorized=True the formula evaluates element-wise over NumPy columns.
+
+        Raises:
+            ValueError: If formula is invalid
+        """
+        try:
+            return _compile_formula(formula, cls, vectorized)
+        except InvalidExpression as e:
+            raise ValueError(f"Invalid formula: {e}")
+        except Exception as e:
+            raise ValueError(f"Formula evaluation error: {str(e)}")
+
     @classmethod
-    def evaluate(cls, formula: str, variables: Dict[str, Any]) -> Any:
+    def compile_formulas(cls, formulas: Dict[str, str]) -> Dict[str, CompiledFormula]:
+        """Compile a calculator's formulas, keyed by result name"""
+        return {name: cls.compile(formula) for name, formula in formulas.items()}
+
+    @classmethod
+    def evaluate(cls, formula: Any, variables: Dict[str, Any]) -> Any:
         """
         Safely evaluate a formula with given variables.
 
         Args:
-            formula: The formula string (e.g., "annual_cost * 12")
+            formula: The formula string (e.g., "annual_cost * 12") or a CompiledFormula
             variables: Dictionary of variable values (e.g., {"annual_cost": 1000})
 
         Returns:
@@ -45,12 +357,11 @@ class FormulaEngine:
         Raises:
             ValueError: If formula is invalid or variables are missing
         """
+        if not isinstance(formula, CompiledFormula):
+            formula = cls.compile(formula)
+
         try:
-            result = simple_eval(
-                formula,
-                names=variables,
-                functions=cls.SAFE_FUNCTIONS
-            )
+            result = formula(variables)
             return result
         except NameNotDefined as e:
             raise ValueError(f"Variable not defined: {e}")
@@ -87,9 +398,15 @@ class FormulaEngine:
         """
         Extract variable names used in a formula.
 
-        This is a simple implementation that looks for word characters.
-        More sophisticated parsing could be added later.
+        Uses the parsed formula, so names inside string literals or attribute
+        names are not reported; unparseable formulas fall back to a scan for
+        word characters.
         """
+        try:
+            return sorted(cls.compile(formula).variables - set(cls.SAFE_FUNCTIONS))
+        except ValueError:
+            pass
+
         import re
         # Find all word sequences that aren't function names
         words = re.findall(r'\b[a-zA-Z_][a-zA-Z0-9_]*\b', formula)
@@ -100,56 +417,171 @@ class FormulaEngine:
         return list(set(variables))
 
     @classmethod
-    def calculate_roi_metrics(cls, inputs: Dict[str, Any], formulas: Dict[str, str]) -> Dict[str, Any]:
+    def plan(cls, formulas: Dict[str, Any]) -> "FormulaPlan":
+        """
+        Compile formulas and order them by their dependencies.
+
+        Build this once per calculator version (see
+        CalculatorService.get_formula_plan) and reuse it for every calculation.
+
+        Raises:
+            ValueError: If a formula is invalid or formulas depend on each other in a cycle
+        """
+        compiled = {}
+        for name, formula in formulas.items():
+            try:
+                compiled[name] = formula if isinstance(formula, CompiledFormula) else cls.compile(formula)
+            except ValueError as e:
+                raise ValueError(f"Formula '{name}': {e}")
+
+        dependencies = {name: formula.variables & compiled.keys() for name, formula in compiled.items()}
+        dependents: Dict[str, List[str]] = {name: [] for name in compiled}
+        for name, needs in dependencies.items():
+            for dependency in needs:
+                dependents[dependency].append(name)
+
+        # Kahn's algorithm; ties keep the definition order, so independent formulas stay in place
+        position = {name: index for index, name in enumerate(compiled)}
+        waiting = {name: len(needs) for name, needs in dependencies.items()}
+        ready = [position[name] for name, count in waiting.items() if count == 0]
+        heapq.heapify(ready)
+        names = list(compiled)
+        order = []
+        while ready:
+            name = names[heapq.heappop(ready)]
+            order.append(name)
+            for dependent in dependents[name]:
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    heapq.heappush(ready, position[dependent])
+
+        if len(order) < len(compiled):
+            cycle = _find_cycle(dependencies, [name for name, count in waiting.items() if count])
+            raise ValueError(f"Circular dependency between formulas: {' -> '.join(cycle)}")
+
+        external = set().union(*(formula.variables for formula in compiled.values())) - compiled.keys()
+        return FormulaPlan(compiled, order, external - set(cls.SAFE_FUNCTIONS), cls)
+
+    @classmethod
+    def calculate_roi_metrics(cls, inputs: Dict[str, Any], formulas: Any) -> Dict[str, Any]:
         """
         Calculate all metrics based on inputs and formulas.
 
         Args:
             inputs: User input values
-            formulas: Dictionary of formula definitions
+            formulas: Dictionary of formula definitions (strings or compiled), or a FormulaPlan
 
         Returns:
             Dictionary of calculated results
         """
+        if not isinstance(formulas, FormulaPlan):
+            formulas = cls.plan(formulas)
+        return formulas.run(inputs)
+
+    @classmethod
+    def calculate_columns(cls, inputs: Dict[str, Any], formulas: Any) -> Dict[str, np.ndarray]:
+        """
+        Calculate all metrics for many input rows at once.
+
+        Args:
+            inputs: Input columns, each a 1-D array with one value per row (or a
+                scalar shared by all rows); list variables are (rows, items) arrays
+            formulas: Dictionary of formula definitions, or a FormulaPlan
+
+        Returns:
+            Dictionary of result columns, one value per row
+        """
+        if not isinstance(formulas, FormulaPlan):
+            formulas = cls.plan(formulas)
+        return formulas.run_columns(inputs)
+
+
+class FormulaPlan:
+    """A calculator's compiled formulas in dependency order"""
+
+    def __init__(self, formulas: Dict[str, CompiledFormula], order: List[str], inputs: Set[str],
+                 engine: type = FormulaEngine):
+        self.formulas = formulas
+        self.order = order
+        self.inputs = inputs  # Variables the formulas read that no formula defines
+        self.engine = engine
+        self._vector_formulas: Optional[Dict[str, CompiledFormula]] = None
+
+    def _diagnose(self, name: str, error: ValueError, variables: Dict[str, Any]) -> ValueError:
+        missing = sorted((self.formulas[name].variables & self.inputs) - variables.keys())
+        if missing:
+            return ValueError(f"Formula '{name}' is missing input variables: {', '.join(missing)}")
+        return ValueError(f"Formula '{name}': {error}")
+
+    def run(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Evaluate every formula once, in dependency order"""
         results = {}
         variables = inputs.copy()
 
-        # Evaluate formulas in order (some may depend on previous results)
-        # Simple dependency resolution: try multiple passes
-        max_passes = 10
-        remaining_formulas = formulas.copy()
+        for name in self.order:
+            try:
+                result = self.engine.evaluate(self.formulas[name], variables)
+            except ValueError as e:
+                raise self._diagnose(name, e, variables)
+            results[name] = result
+            variables[name] = result
+
+        return results
+
+    def run_columns(self, inputs: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """
+        Evaluate every formula once over whole input columns.
 
-        for _ in range(max_passes):
-            if not remaining_formulas:
-                break
+        Rows that would raise in scalar evaluation, such as a division by zero,
+        come out as inf or nan instead of failing the batch.
+        """
+        if self._vector_formulas is None:
+            vector_formulas = {}
+            for name, formula in self.formulas.items():
+                try:
+                    vector_formulas[name] = self.engine.compile(formula.source, vectorized=True)
+                except ValueError as e:
+                    raise ValueError(f"Formula '{name}' cannot be evaluated by column: {e}")
+            self._vector_formulas = vector_formulas
 
-            evaluated_this_pass = []
+        variables = {name: np.asarray(value) for name, value in inputs.items()}
+        rows = max((len(value) for value in variables.values() if value.ndim), default=1)
 
-            for formula_name, formula_expr in list(remaining_formulas.items()):
+        results = {}
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            for name in self.order:
                 try:
-                    result = cls.evaluate(formula_expr, variables)
-                    results[formula_name] = result
-                    variables[formula_name] = result
-                    evaluated_this_pass.append(formula_name)
-                except ValueError:
-                    # Can't evaluate yet, might depend on other formulas
-                    continue
-
-            # Remove evaluated formulas
-            for name in evaluated_this_pass:
-                remaining_formulas.pop(name)
-
-            # If we didn't make progress, we have circular dependencies or errors
-            if not evaluated_this_pass:
-                break
-
-        # If there are still remaining formulas, they have errors or circular deps
-        if remaining_formulas:
-            raise ValueError(f"Could not evaluate formulas: {list(remaining_formulas.keys())}")
+                    result = self.engine.evaluate(self._vector_formulas[name], variables)
+                except ValueError as e:
+                    raise self._diagnose(name, e, variables)
+                result = np.asarray(result)
+                if not result.ndim:
+                    result = np.full(rows, result)
+                results[name] = result
+                variables[name] = result
 
         return results
 
 
+def _find_cycle(dependencies: Dict[str, Set[str]], unresolved: List[str]) -> List[str]:
+    """Follow unresolved dependencies from any unresolved formula until one repeats"""
+    unresolved_set = set(unresolved)
+    path = [unresolved[0]]
+    seen = {unresolved[0]: 0}
+    while True:
+        following = min(dependencies[path[-1]] & unresolved_set)
+        if following in seen:
+            return path[seen[following]:] + [following]
+        seen[following] = len(path)
+        path.append(following)
+
+
+@lru_cache(maxsize=4096)
+def _compile_formula(formula: str, engine: type, vectorized: bool) -> CompiledFormula:
+    functions = engine.VECTOR_FUNCTIONS if vectorized else engine.SAFE_FUNCTIONS
+    return CompiledFormula(formula, functions, vectorized)
+
+
 # Example usage and tests
 if __name__ == "__main__":
     # Test basic formula
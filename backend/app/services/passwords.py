@@ -0,0 +1,120 @@
+"""Password hashing on a dedicated, bounded worker pool"""
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+
+from ..config import get_settings
+from ..executor import CalculationExecutor, ExecutorBusy
+from ..utils.security import hash_password, verify_password
+
+
+class TooManyAttempts(Exception):
+    """Raised when a client's password operation waited too long behind its others in flight"""
+
+
+class _ClientSlots:
+    """A client's admission semaphore, and how many operations hold or wait for it"""
+
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.users = 0
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification on their own small thread pool.
+
+    bcrypt takes ~250 ms of CPU per call, so a login storm on the shared
+    thread pool used to starve every other request. Here at most
+    max_workers hashes run at once with max_pending queued behind them;
+    callers beyond that wait up to queue_timeout and then fail with
+    ExecutorBusy. Each client IP may have at most max_per_client operations
+    in flight, so one client can't occupy the whole pool; its further
+    operations wait for one of those to finish, up to client_timeout, and
+    then fail with TooManyAttempts. Many users behind one NAT or proxy
+    address are slowed down rather than turned away.
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 16, queue_timeout: float = 2.0,
+                 max_per_client: int = 8, client_timeout: float = 5.0):
+        self.executor = CalculationExecutor(
+            "thread", max_workers=max_workers, max_pending=max_pending,
+            queue_timeout=queue_timeout, name="Password hashing"
+        )
+        self.max_per_client = max_per_client
+        self.client_timeout = client_timeout
+        self._per_client: Dict[str, _ClientSlots] = {}
+        self.client_waiting = 0
+        self.throttled = 0
+
+    @asynccontextmanager
+    async def _admit(self, client_ip: Optional[str]):
+        # Runs on the event loop only, so the slots need no lock
+        if client_ip is None:
+            yield
+            return
+        slots = self._per_client.get(client_ip)
+        if slots is None:
+            slots = self._per_client[client_ip] = _ClientSlots(self.max_per_client)
+        slots.users += 1
+        try:
+            if slots.semaphore.locked():
+                self.client_waiting += 1
+                try:
+                    await asyncio.wait_for(slots.semaphore.acquire(), self.client_timeout)
+                except asyncio.TimeoutError:
+                    self.throttled += 1
+                    raise TooManyAttempts(f"Too many concurrent password attempts from {client_ip}")
+                finally:
+                    self.client_waiting -= 1
+            else:
+                await slots.semaphore.acquire()
+            try:
+                yield
+            finally:
+                slots.semaphore.release()
+        finally:
+            slots.users -= 1
+            if not slots.users:
+                del self._per_client[client_ip]
+
+    async def hash(self, password: str, client_ip: Optional[str] = None) -> str:
+        async with self._admit(client_ip):
+            return await self.executor.run(hash_password, password)
+
+    async def verify(self, password: str, hashed_password: str, client_ip: Optional[str] = None) -> bool:
+        async with self._admit(client_ip):
+            return await self.executor.run(verify_password, password, hashed_password)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.executor.stats(), "clients": len(self._per_client), "client_waiting": self.client_waiting,
+                "throttled": self.throttled}
+
+
+@contextmanager
+def password_errors():
+    """Map pool and admission errors to 503 and 429 responses"""
+    try:
+        yield
+    except TooManyAttempts as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e),
+                            headers={"Retry-After": "1"})
+    except ExecutorBusy:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Authentication is busy, please retry", headers={"Retry-After": "1"})
+
+
+@lru_cache()
+def get_password_hasher() -> PasswordHasher:
+    """Get the process-wide password hasher"""
+    settings = get_settings()
+    return PasswordHasher(
+        max_workers=settings.PASSWORD_HASH_WORKERS,
+        max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+        queue_timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS,
+        max_per_client=settings.PASSWORD_HASH_MAX_PER_CLIENT,
+        client_timeout=settings.PASSWORD_HASH_CLIENT_WAIT_SECONDS
+    )
@@ -0,0 +1,175 @@
+"""Short-lived cache of authenticated principals (token claims, user and organization)"""
+import hashlib
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple, Type
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+
+from ..config import get_settings
+from ..models.organization import Organization
+from ..models.user import User
+from ..utils.cache import LocalCacheBackend
+from .calculator_cache import LocalInvalidationBus, RedisInvalidationBus
+
+# User columns whose change must take effect immediately rather than after the TTL
+USER_AUTH_FIELDS = ("is_active", "role", "organization_id", "email")
+
+
+def _snapshot(instance) -> Dict[str, Any]:
+    return {attr.key: getattr(instance, attr.key) for attr in inspect(type(instance)).column_attrs}
+
+
+def _restore(model: Type, data: Dict[str, Any]):
+    """Detached instance built from a snapshot, so requests never share ORM objects"""
+    instance = model(**data)
+    make_transient_to_detached(instance)
+    return instance
+
+
+class PrincipalCache:
+    """
+    LRU + TTL cache of verified access tokens and organizations.
+
+    A hit skips the JWT decode and the users/organizations queries.
+    Tokens are keyed by their SHA-256, and entries hold the decoded claims
+    and a column snapshot of the (active) user; a hit past the token's exp
+    is a miss. Organizations are cached by id. Changes to a user's status,
+    role, organization or email, and any change to an organization,
+    invalidate the entries once committed (see the session hooks below),
+    here and in other workers through the bus; the TTL bounds staleness for
+    everything else.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 30.0, bus=None):
+        self._tokens = LocalCacheBackend(max_entries, ttl_seconds)
+        self._organizations = LocalCacheBackend(max_entries, ttl_seconds)
+        self._user_tokens: Dict[str, set] = {}  # user id -> token keys
+        self._lock = threading.Lock()
+        self.generation = 0  # Bumped by every invalidation
+        self.bus = bus or LocalInvalidationBus()
+        self.bus.subscribe(self._evict)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get_user(self, token: str) -> Optional[Tuple[dict, User]]:
+        """Cached (claims, user) for a token, or None"""
+        entry = self._tokens.get(self._token_key(token))
+        if entry is None or entry[0].get("exp", 0) <= time.time():
+            self.misses += 1
+            return None
+        self.hits += 1
+        claims, user = entry
+        return claims, _restore(User, user)
+
+    def set_user(self, token: str, claims: dict, user: User, generation: int) -> None:
+        """Cache a verified token, unless an invalidation happened since `generation` was read"""
+        key = self._token_key(token)
+        user_id = str(user.id)
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._tokens.set(key, (claims, _snapshot(user)))
+            self._user_tokens.setdefault(user_id, set()).add(key)
+            if len(self._user_tokens) > 2 * self._tokens.max_entries:
+                self._prune_user_tokens()
+
+    def _prune_user_tokens(self) -> None:
+        """Forget token keys the LRU has already evicted or expired"""
+        for user_id, keys in list(self._user_tokens.items()):
+            keys = {key for key in keys if self._tokens.get(key) is not None}
+            if keys:
+                self._user_tokens[user_id] = keys
+            else:
+                del self._user_tokens[user_id]
+
+    def get_organization(self, organization_id) -> Optional[Organization]:
+        data = self._organizations.get(str(organization_id))
+        return _restore(Organization, data) if data is not None else None
+
+    def set_organization(self, organization: Organization, generation: int) -> None:
+        with self._lock:
+            if generation == self.generation:
+                self._organizations.set(str(organization.id), _snapshot(organization))
+
+    def invalidate_user(self, user_id) -> None:
+        self._publish(f"user:{user_id}")
+
+    def invalidate_organization(self, organization_id) -> None:
+        self._publish(f"org:{organization_id}")
+
+    def _publish(self, message: str) -> None:
+        self._evict(message)
+        try:
+            self.bus.publish(message)
+        except Exception:
+            # Other workers still converge once their entries expire
+            pass
+
+    def _evict(self, message: str) -> None:
+        kind, _, identifier = message.partition(":")
+        with self._lock:
+            self.generation += 1
+            if kind == "user":
+                for key in self._user_tokens.pop(identifier, ()):
+                    self._tokens.delete(key)
+            elif kind == "org":
+                self._organizations.delete(identifier)
+
+
+@lru_cache()
+def get_principal_cache() -> PrincipalCache:
+    """Get the process-wide principal cache"""
+    settings = get_settings()
+    bus = None
+    if settings.CACHE_PUBSUB_URL:
+        bus = RedisInvalidationBus(settings.CACHE_PUBSUB_URL, channel="calcforge:principal-invalidations")
+    return PrincipalCache(settings.PRINCIPAL_CACHE_MAX_ENTRIES, settings.PRINCIPAL_CACHE_TTL_SECONDS, bus)
+
+
+def _queue_invalidation(instance, kind: str) -> None:
+    """Invalidate after commit, so a concurrent request can't re-cache the row as it was before the change"""
+    session = object_session(instance)
+    if session is not None:
+        session.info.setdefault("principal_invalidations", set()).add((kind, instance.id))
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, user: User) -> None:
+    state = inspect(user)
+    if any(state.attrs[name].history.has_changes() for name in USER_AUTH_FIELDS):
+        _queue_invalidation(user, "user")
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, user: User) -> None:
+    _queue_invalidation(user, "user")
+
+
+@event.listens_for(Organization, "after_update")
+@event.listens_for(Organization, "after_delete")
+def _organization_changed(mapper, connection, organization: Organization) -> None:
+    _queue_invalidation(organization, "org")
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_invalidations(session: Session) -> None:
+    invalidations = session.info.pop("principal_invalidations", None)
+    if invalidations:
+        cache = get_principal_cache()
+        for kind, identifier in invalidations:
+            if kind == "user":
+                cache.invalidate_user(identifier)
+            else:
+                cache.invalidate_organization(identifier)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session: Session) -> None:
+    session.info.pop("principal_invalidations", None)
@@ -0,0 +1,192 @@
+"""Batched, write-behind ingestion of calculator session rows"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models.session import CalculatorSession
+from .analytics_rollup import apply_daily_rollups
+
+logger = logging.getLogger(__name__)
+
+
+class SessionIngestQueue:
+    """
+    Queues CalculatorSession rows and bulk-inserts them from a worker thread.
+
+    The public calculate endpoint used to commit each session before
+    responding. Rows are queued instead and written in batches of up to
+    batch_size as one multi-row INSERT, so response latency no longer
+    depends on the database. The queue holds at most max_queue rows; when it
+    is full submit() returns False and the caller writes the row itself,
+    which pushes back on clients rather than growing memory. Failed batches
+    are retried with backoff up to max_retries times, then dropped and
+    counted; a batch the database rejects outright (an integrity or data
+    error) is split instead, so only its bad rows are dropped. Tokens of
+    queued rows are tracked so a lead capture for a session that hasn't
+    been written yet can flush it first. after_insert, if given, is called
+    with each batch in the inserting transaction.
+    """
+
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None, batch_size: int = 500,
+                 max_queue: int = 10000, flush_interval: float = 1.0, max_retries: int = 3,
+                 after_insert: Optional[Callable[[Session, List[Dict[str, Any]]], None]] = None):
+        self._session_factory = session_factory
+        self.after_insert = after_insert
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval  # 0 writes every row through immediately
+        self.max_retries = max_retries
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._tokens: set = set()  # Tokens queued or being written
+        self._tokens_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.dropped = 0
+
+    def _new_session(self) -> Session:
+        if self._session_factory is None:
+            from ..database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    def submit(self, row: Dict[str, Any]) -> bool:
+        """Queue a row for insertion; False if the queue is full (or disabled) and the caller must write() it"""
+        if self.flush_interval <= 0:
+            return False
+
+        with self._tokens_lock:
+            self._tokens.add(row["session_token"])
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._tokens_lock:
+                self._tokens.discard(row["session_token"])
+            return False
+        return True
+
+    def is_pending(self, session_token: str) -> bool:
+        with self._tokens_lock:
+            return session_token in self._tokens
+
+    def ensure_written(self, session_token: str) -> None:
+        """Flush the queue if the row for session_token hasn't reached the database yet"""
+        if self.is_pending(session_token):
+            # Waits for a batch the worker is writing, then writes the rest
+            self.flush()
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        rows = []
+        while len(rows) < self.batch_size:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def flush(self) -> int:
+        """Write everything queued so far; returns the number of rows written"""
+        total = 0
+        while True:
+            with self._write_lock:
+                rows = self._drain()
+                if not rows:
+                    return total
+                total += self._write(rows, self.max_retries)
+
+    def write(self, rows: List[Dict[str, Any]]) -> int:
+        """Write rows now, bypassing the queue; returns the number written"""
+        return self._write(rows, self.max_retries)
+
+    def _write(self, rows: List[Dict[str, Any]], retries: int) -> int:
+        try:
+            return self._insert(rows, retries)
+        finally:
+            with self._tokens_lock:
+                self._tokens.difference_update(row["session_token"] for row in rows)
+
+    def _insert(self, rows: List[Dict[str, Any]], retries: int) -> int:
+        attempt = 0
+        while True:
+            db = self._new_session()
+            rejected = False
+            try:
+                db.execute(insert(CalculatorSession.__table__), rows)
+                if self.after_insert is not None:
+                    self.after_insert(db, rows)
+                db.commit()
+                self.written += len(rows)
+                return len(rows)
+            except (IntegrityError, DataError):
+                db.rollback()
+                if len(rows) == 1:
+                    self.dropped += 1
+                    logger.exception("Dropping calculator session %s rejected by the database",
+                                     rows[0].get("session_token"))
+                    return 0
+                rejected = True
+            except Exception:
+                db.rollback()
+                if attempt >= retries:
+                    self.dropped += len(rows)
+                    logger.exception("Dropping %d calculator sessions after %d attempts", len(rows), attempt + 1)
+                    return 0
+            finally:
+                db.close()
+
+            if rejected:
+                # Retrying can't fix a bad row: bisect the batch so only the rejected rows are dropped
+                middle = len(rows) // 2
+                return self._insert(rows[:middle], retries) + self._insert(rows[middle:], retries)
+            attempt += 1
+            time.sleep(min(0.1 * 2 ** attempt, 5.0))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            # Write as soon as a full batch is available, otherwise every flush_interval
+            if self._queue.qsize() < self.batch_size:
+                self._stop.wait(self.flush_interval)
+            self.flush()
+
+    def start(self) -> None:
+        """Start the background writer thread"""
+        if self.flush_interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="session-ingest", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the writer and write everything still queued"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self._queue.qsize(), "written": self.written, "dropped": self.dropped}
+
+
+@lru_cache()
+def get_session_ingest_queue() -> SessionIngestQueue:
+    """Get the process-wide session ingestion queue"""
+    settings = get_settings()
+    ingest_queue = SessionIngestQueue(
+        batch_size=settings.SESSION_INGEST_BATCH_SIZE,
+        max_queue=settings.SESSION_INGEST_MAX_QUEUE,
+        flush_interval=settings.SESSION_INGEST_FLUSH_INTERVAL_SECONDS,
+        max_retries=settings.SESSION_INGEST_MAX_RETRIES,
+        after_insert=apply_daily_rollups
+    )
+    atexit.register(ingest_queue.flush)
+    return ingest_queue
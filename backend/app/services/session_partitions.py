@@ -0,0 +1,207 @@
+"""Monthly range partitions of calculator_sessions: creation ahead of time and retention"""
+import logging
+import re
+import threading
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Callable, ContextManager, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "calculator_sessions"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+PARTITION_PATTERN = re.compile(r"^calculator_sessions_p(\d{4})(\d{2})$")
+# Advisory lock held while maintaining partitions, so app workers starting together take turns
+MAINTENANCE_LOCK_KEY = 0x63616c63
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_p{month:%Y%m}"
+
+
+def ensure_partitions(conn: Connection, start: date, end: date) -> List[str]:
+    """
+    Create the monthly partitions covering [start, end]; returns the ones created.
+
+    A month whose rows already landed in the default partition (written
+    before its partition existed) can't be created as PARTITION OF, which
+    fails on those rows. It is built as a plain table instead, the rows are
+    moved into it from the default partition, and it is then attached.
+    """
+    existing = set(list_partitions(conn))
+    created = []
+    month = month_start(start)
+    while month <= end:
+        name, next_month = partition_name(month), add_months(month, 1)
+        if name not in existing:
+            bounds = f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+            if DEFAULT_PARTITION in existing and _default_has_rows(conn, month, next_month):
+                moved = _attach_from_default(conn, name, bounds, month, next_month)
+                logger.info("Moved %d sessions from %s into new partition %s", moved, DEFAULT_PARTITION, name)
+            else:
+                conn.execute(text(f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARENT_TABLE} {bounds}'))
+            created.append(name)
+        month = next_month
+    return created
+
+
+def _default_has_rows(conn: Connection, start: date, end: date) -> bool:
+    return bool(conn.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end)"
+    ), {"start": start, "end": end}).scalar())
+
+
+def _attach_from_default(conn: Connection, name: str, bounds: str, start: date, end: date) -> int:
+    """Create a month's partition holding its rows from the default partition; returns the rows moved"""
+    conn.execute(text(f'CREATE TABLE "{name}" (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    moved = conn.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end "
+        f'RETURNING *) INSERT INTO "{name}" SELECT * FROM moved'
+    ), {"start": start, "end": end}).rowcount
+    # Attaching checks the default partition no longer holds rows in the range, and builds the parent's indexes
+    conn.execute(text(f'ALTER TABLE {PARENT_TABLE} ATTACH PARTITION "{name}" {bounds}'))
+    return moved
+
+
+def ensure_default_partition(conn: Connection) -> None:
+    """Catch-all partition, so rows outside the monthly ranges are still accepted"""
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+
+
+def list_partitions(conn: Connection) -> List[str]:
+    """Names of the tables currently attached to calculator_sessions"""
+    return list(conn.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "WHERE parent.relname = :parent ORDER BY child.relname"
+    ), {"parent": PARENT_TABLE}).scalars())
+
+
+def expire_partitions(conn: Connection, retention_months: int, archive_schema: str = "",
+                      today: Optional[date] = None) -> List[str]:
+    """
+    Detach monthly partitions that ended more than retention_months ago.
+
+    Detached partitions are moved to archive_schema if one is given,
+    otherwise dropped. Dashboards are unaffected, since they read the daily
+    rollups rather than sessions. Returns the partitions expired.
+    """
+    if retention_months <= 0:
+        return []
+
+    cutoff = add_months(month_start(today or datetime.utcnow().date()), -retention_months)
+    expired = []
+    for name in list_partitions(conn):
+        match = PARTITION_PATTERN.match(name)
+        if not match:
+            continue  # The default partition, or one not made by us
+        if add_months(date(int(match.group(1)), int(match.group(2)), 1), 1) > cutoff:
+            continue
+
+        conn.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{name}"'))
+        if archive_schema:
+            conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{archive_schema}"'))
+            conn.execute(text(f'ALTER TABLE "{name}" SET SCHEMA "{archive_schema}"'))
+        else:
+            conn.execute(text(f'DROP TABLE "{name}"'))
+        expired.append(name)
+
+    return expired
+
+
+def maintain_partitions(conn: Connection, today: Optional[date] = None) -> None:
+    """Create upcoming partitions and expire old ones per settings; run daily"""
+    settings = get_settings()
+    today = today or datetime.utcnow().date()
+    ensure_default_partition(conn)
+    created = ensure_partitions(conn, today, add_months(month_start(today), settings.SESSION_PARTITION_MONTHS_AHEAD))
+    expired = expire_partitions(conn, settings.SESSION_RETENTION_MONTHS, settings.SESSION_ARCHIVE_SCHEMA, today)
+    for name in created:
+        logger.info("Created session partition %s", name)
+    for name in expired:
+        logger.info("%s session partition %s", "Archived" if settings.SESSION_ARCHIVE_SCHEMA else "Dropped", name)
+
+
+class PartitionMaintainer:
+    """
+    Runs maintain_partitions at startup and then every interval seconds.
+
+    Partitions are created SESSION_PARTITION_MONTHS_AHEAD months ahead, so
+    with a daily run next month's partition exists long before its first
+    session. A failed run is logged and retried on the next one; sessions
+    meanwhile land in the default partition. Only PostgreSQL tables are
+    partitioned, so other databases are skipped.
+    """
+
+    def __init__(self, connect: Optional[Callable[[], ContextManager[Connection]]] = None,
+                 interval: float = 86400.0):
+        self._connect = connect
+        self.interval = interval  # 0 maintains at startup only
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self, today: Optional[date] = None) -> bool:
+        """Maintain partitions in one transaction; returns False if skipped or failed"""
+        connect = self._connect
+        if connect is None:
+            from ..database import engine
+            if engine.dialect.name != "postgresql":
+                return False
+            connect = engine.begin
+
+        try:
+            with connect() as conn:
+                conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY})
+                maintain_partitions(conn, today)
+            return True
+        except Exception:
+            logger.exception("Session partition maintenance failed")
+            return False
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self) -> None:
+        """Maintain partitions now, then start the background schedule"""
+        self.run_once()
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="partition-maintainer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+@lru_cache()
+def get_partition_maintainer() -> PartitionMaintainer:
+    """Get the process-wide partition maintainer"""
+    return PartitionMaintainer(interval=get_settings().SESSION_PARTITION_MAINTENANCE_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    from ..database import engine
+
+    logging.basicConfig(level=logging.INFO)
+    with engine.begin() as connection:
+        maintain_partitions(connection)
@@ -1,4 +1,6 @@
 """Security utilities for authentication and authorization"""
+import hashlib
+import secrets
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -58,6 +60,16 @@ def verify_token(token: str, token_type: str = "access") -> Optional[dict]:
         return None
 
 
+def generate_api_key() -> str:
+    """Generate a new API key; only its hash is stored"""
+    return f"cf_{secrets.token_urlsafe(32)}"
+
+
+def hash_api_key(key: str) -> str:
+    """Hash an API key for storage and lookup (keys are random, so SHA-256 suffices)"""
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
 def generate_slug(text: str) -> str:
     """Generate a URL-friendly slug from text"""
     import re
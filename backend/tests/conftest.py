@@ -0,0 +1,144 @@
+"""Shared test fixtures: fake database sessions, and a real SQLite database"""
+import asyncio
+from typing import Any, Callable, List, Optional
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import INET, UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+
+class FakeResult:
+    """Rows returned by a FakeDB query"""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.rowcount = len(self.rows)
+
+    def all(self):
+        return self.rows
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def scalar(self):
+        return self.rows[0] if self.rows else None
+
+    def scalars(self):
+        return self.rows
+
+
+class FakeDB:
+    """
+    Stand-in for a sync Session or Connection.
+
+    query(sql, statement, params) answers a statement with its rows, or
+    returns None for statements it doesn't answer; those are recorded in
+    `statements` (their SQL) and `batches` (their parameters, if any). Each
+    execute raises `error` instead while `failures` is non-zero.
+    """
+
+    def __init__(self, query: Optional[Callable[[str, Any, Any], Optional[list]]] = None, failures: int = 0,
+                 error: Exception = RuntimeError("database unavailable")):
+        self.query = query
+        self.failures = failures
+        self.error = error
+        self.statements: List[str] = []
+        self.batches: List[Any] = []
+        self.queries = 0
+        self.commits = 0
+
+    def execute(self, statement, params=None):
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        sql = str(statement)
+        rows = self.query(sql, statement, params) if self.query is not None else None
+        if rows is not None:
+            self.queries += 1
+            return FakeResult(rows)
+        self.statements.append(sql)
+        if params is not None:
+            self.batches.append(params)
+        return FakeResult()
+
+    def scalar(self, statement, params=None):
+        return self.execute(statement, params).scalar()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeAsyncDB(FakeDB):
+    """FakeDB with the AsyncSession interface"""
+
+    async def execute(self, statement, params=None):
+        return FakeDB.execute(self, statement, params)
+
+    async def scalar(self, statement, params=None):
+        return FakeDB.execute(self, statement, params).scalar()
+
+    async def commit(self):
+        FakeDB.commit(self)
+
+    async def rollback(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_db():
+    """Factory for fake sync sessions and connections (see FakeDB)"""
+    return FakeDB
+
+
+@pytest.fixture
+def fake_async_db():
+    """Factory for fake async sessions (see FakeDB)"""
+    return FakeAsyncDB
+
+
+# The models use PostgreSQL column types; SQLite stores them as text
+@compiles(UUID, "sqlite")
+def _uuid_on_sqlite(type_, compiler, **kw):
+    return "CHAR(32)"
+
+
+@compiles(INET, "sqlite")
+def _inet_on_sqlite(type_, compiler, **kw):
+    return "VARCHAR(45)"
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """
+    A SQLite database with every table, served to the API by get_db through aiosqlite.
+
+    Yields a sync session factory on the same file, for the background
+    writers (session ingestion, counters).
+    """
+    import app.models  # noqa: F401 (registers every table)
+    from app import database
+
+    url = f"sqlite:///{tmp_path / 'calcforge.db'}"
+    engine = create_engine(url)
+    database.Base.metadata.create_all(engine)
+
+    monkeypatch.setattr(database.settings, "DATABASE_URL", url)
+    database.get_async_engine.cache_clear()
+    database.get_async_sessionmaker.cache_clear()
+    yield sessionmaker(bind=engine)
+
+    asyncio.run(database.get_async_engine().dispose())
+    database.get_async_engine.cache_clear()
+    database.get_async_sessionmaker.cache_clear()
+    engine.dispose()
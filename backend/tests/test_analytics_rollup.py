@@ -0,0 +1,108 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy.dialects import postgresql
+from app.services.analytics_rollup import (
+    apply_daily_rollups, bucket_percentiles, daily_stats_upsert, result_bucket, session_deltas
+)
+from app.services.calculator_service import CalculatorService
+
+
+def test_result_buckets_preserve_order():
+    """Bucket numbers increase with the value, through zero and negatives"""
+    values = [-5000.0, -12.5, -0.3, 0.0, 1e-9, 0.25, 1.0, 1.1, 99.0, 4.2e6]
+    buckets = [result_bucket(value) for value in values]
+    assert buckets == sorted(buckets)
+    assert result_bucket(0.0) == result_bucket(1e-9) == 0
+    assert result_bucket(-7.0) == -result_bucket(7.0)
+
+
+def test_bucket_percentiles_track_exact_percentiles():
+    """Percentiles estimated from buckets stay within a bucket width of the exact ones"""
+    values = np.random.default_rng(7).lognormal(mean=10, sigma=1.5, size=5000)
+    buckets = {}
+    for value in values:
+        count, total = buckets.get(result_bucket(value), (0, 0.0))
+        buckets[result_bucket(value)] = (count + 1, total + value)
+
+    fractions = {"p10": 0.1, "median": 0.5, "p90": 0.9}
+    estimates = bucket_percentiles(buckets, fractions)
+    for name, fraction in fractions.items():
+        assert estimates[name] == pytest.approx(np.percentile(values, fraction * 100), rel=0.13)
+
+
+def test_session_deltas_sum_rows_per_day():
+    """Session rows roll up into per-day counts and per-metric histograms"""
+    calculator_id = uuid.uuid4()
+    start = datetime(2026, 3, 1, 23, 59)
+    rows = [
+        {"calculator_id": calculator_id, "created_at": start, "completed_at": start + timedelta(seconds=30),
+         "lead_email": "a@example.com", "results": {"roi": 120.0, "label": "high", "ok": True}},
+        {"calculator_id": calculator_id, "created_at": start, "completed_at": None,
+         "results": {"roi": 80.0}},
+        {"calculator_id": calculator_id, "created_at": start + timedelta(minutes=5),
+         "completed_at": start + timedelta(minutes=5), "results": {"roi": 120.0}},
+    ]
+
+    daily, buckets = session_deltas(rows)
+    first_day = daily[(calculator_id, start.date())]
+    assert first_day == {"views": 2, "completions": 1, "leads": 1, "timed_completions": 1, "completion_seconds": 30.0}
+    # Completed the moment it started: no client start time, so not timed
+    second_day = daily[(calculator_id, (start + timedelta(days=1)).date())]
+    assert second_day["completions"] == 1 and second_day["timed_completions"] == 0
+    assert {key[2] for key in buckets} == {"roi"}
+    assert buckets[(calculator_id, start.date(), "roi", result_bucket(120.0))] == [1, 120.0]
+
+    statement, params = daily_stats_upsert(daily)
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (calculator_id, day) DO UPDATE" in sql
+    assert "views = (calculator_daily_stats.views + excluded.views)" in sql
+    assert len(params) == 2
+
+
+def test_analytics_reads_days_and_percentiles_from_rollups(sqlite_db):
+    """The dashboard's per-day counts and result percentiles come from the rolled-up sessions"""
+    from app.database import get_async_sessionmaker
+    from app.models.calculator import Calculator
+    from app.models.organization import Organization
+
+    organization_id, calculator_id = uuid.uuid4(), uuid.uuid4()
+    start = datetime(2026, 3, 1, 9, 0)
+    roi = [float(value) for value in range(10, 160, 10)]
+    rows = [
+        {"calculator_id": calculator_id, "created_at": start + timedelta(days=i // 10, minutes=i),
+         "completed_at": start + timedelta(days=i // 10, minutes=i, seconds=40),
+         "lead_email": "a@example.com" if i % 4 == 0 else None, "results": {"roi": value, "label": "high"}}
+        for i, value in enumerate(roi)
+    ]
+    with sqlite_db() as db:
+        db.add(Organization(id=organization_id, name="Acme", slug="acme"))
+        db.add(Calculator(id=calculator_id, organization_id=organization_id, name="ROI", slug="roi", config={}))
+        db.flush()
+        apply_daily_rollups(db, rows[:6])
+        apply_daily_rollups(db, rows[6:])  # Later batches add to the same day's rows
+        db.commit()
+
+    async def analytics():
+        async with get_async_sessionmaker()() as db:
+            return await CalculatorService.get_analytics(db, calculator_id, organization_id)
+
+    result = asyncio.run(analytics())
+
+    assert result.sessions_by_day == [{"date": "2026-03-01", "count": 10, "leads": 3},
+                                      {"date": "2026-03-02", "count": 5, "leads": 1}]
+    assert result.leads_captured == 4
+    assert result.avg_time_to_complete == pytest.approx(40.0)
+    [summary] = result.top_results
+    assert summary["metric"] == "roi" and summary["count"] == 15
+    assert summary["avg"] == pytest.approx(np.mean(roi))
+    # Each bucket's mean stands in for its values, so estimates fall within a bucket of the ranked value
+    for name, fraction in {"p10": 0.1, "median": 0.5, "p90": 0.9}.items():
+        assert summary[name] == pytest.approx(np.percentile(roi, fraction * 100, method="lower"), rel=0.13)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
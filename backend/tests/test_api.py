@@ -1,3 +1,5 @@
+import json
+import time
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
@@ -108,6 +110,84 @@ def test_calculate_roi_basic():
     assert isinstance(data["npv_5y"], (int, float))
 
 
+def test_calculate_roi_monte_carlo():
+    """Test Monte Carlo mode via query parameters"""
+    payload = {
+        "annual_calls": 100000,
+        "intents": [
+            {
+                "name": "Test Intent",
+                "volume_share": 1.0,
+                "avg_minutes": 3.0,
+                "containment_m0": 0.5,
+                "containment_m3": 0.8,
+                "handoff_minutes": 1.0,
+                "revenue_per_abandon": None
+            }
+        ],
+        "agent_cost_per_min": 0.8,
+        "telco_cost_per_min": 0.05,
+        "polyai_cost_per_min": 0.12,
+        "baseline_abandon_rate": 0.15,
+        "ai_abandon_rate": 0.08
+    }
+
+    response = client.post("/api/calc?draws=5000&seed=1", json=payload)
+    assert response.status_code == 200
+
+    data = response.json()
+    assert set(data["distribution"]) == {"npv_5y", "roi_5y", "payback_months"}
+    assert data["p10_p50_p90"] == data["distribution"]["npv_5y"]
+
+    response = client.post("/api/calc?draws=-1", json=payload)
+    assert response.status_code == 422
+
+
+def test_calculate_roi_batch():
+    """Test batch calculation streams one NDJSON line per deal"""
+    deal = {
+        "annual_calls": 100000,
+        "intents": [
+            {
+                "name": "Test Intent",
+                "volume_share": 1.0,
+                "avg_minutes": 3.0,
+                "containment_m0": 0.5,
+                "containment_m3": 0.8,
+                "handoff_minutes": 1.0,
+                "revenue_per_abandon": None
+            }
+        ],
+        "agent_cost_per_min": 0.8,
+        "telco_cost_per_min": 0.05,
+        "polyai_cost_per_min": 0.12,
+        "baseline_abandon_rate": 0.15,
+        "ai_abandon_rate": 0.08
+    }
+    invalid = {**deal, "annual_calls": -1}
+
+    response = client.post("/api/calc/batch", json=[deal, invalid, deal])
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert "error" in lines[1]
+    single = client.post("/api/calc", json=deal).json()
+    assert lines[0]["results"]["npv_5y"] == pytest.approx(single["npv_5y"])
+
+    ndjson = "\n".join(json.dumps(d) for d in [deal, deal]) + "\n"
+    response = client.post(
+        "/api/calc/batch", content=ndjson,
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 2
+
+    response = client.post("/api/calc/batch", json=deal)
+    assert response.status_code == 400
+
+
 def test_calculate_roi_invalid_volume_shares():
     """Test ROI calculation with invalid volume shares"""
     payload = {
@@ -272,7 +352,18 @@ def test_export_pdf():
         "risk_adjustment": 0.0
     }
     
-    response = client.post("/api/export/pdf", json=payload)
+    # The report renders as a background job; the client keeps its event loop alive while it runs
+    with TestClient(app) as export_client:
+        response = export_client.post("/api/export/pdf", json=payload)
+        assert response.status_code == 202
+        status_url = response.json()["status_url"]
+
+        for _ in range(300):
+            response = export_client.get(status_url)
+            if response.status_code != 202:
+                break
+            time.sleep(0.1)
+
     assert response.status_code == 200
     assert response.headers["content-type"] == "application/pdf"
     assert "attachment" in response.headers["content-disposition"]
@@ -315,5 +406,126 @@ def test_export_csv():
     assert len(response.content) > 100  # Should have content
 
 
+def test_executor_sheds_load_when_full():
+    """Test that a saturated calculation executor rejects instead of queueing"""
+    import asyncio
+    import time
+    from app.executor import CalculationExecutor, ExecutorBusy
+
+    async def scenario():
+        executor = CalculationExecutor("thread", max_workers=1, max_pending=0, queue_timeout=0.05)
+        running = asyncio.ensure_future(executor.run(time.sleep, 0.3))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ExecutorBusy):
+            await executor.run(time.sleep, 0)
+        await running
+        assert await executor.run(sum, [1, 2, 3]) == 6
+        executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_export_returns_503_when_executor_busy(monkeypatch):
+    """Test that CSV export reports a full calculation queue as 503 with Retry-After"""
+    from app import main
+    from app.executor import ExecutorBusy
+
+    async def busy(*args, **kwargs):
+        raise ExecutorBusy("Calculation queue full (1 jobs in flight)")
+
+    monkeypatch.setattr(main, "cached_calculate", busy)
+    payload = {
+        "annual_calls": 100000,
+        "intents": [{"name": "Test Intent", "volume_share": 1.0, "avg_minutes": 3.0, "containment_m0": 0.5,
+                     "containment_m3": 0.8, "handoff_minutes": 1.0, "revenue_per_abandon": None}],
+        "agent_cost_per_min": 0.8, "telco_cost_per_min": 0.05, "polyai_cost_per_min": 0.12,
+        "acw_minutes": 1.0, "baseline_abandon_rate": 0.15, "ai_abandon_rate": 0.08,
+        "business_hours_only": True, "night_fraction": 0.3, "inflation": 0.03,
+        "volume_growth": 0.05, "discount_rate": 0.10, "risk_adjustment": 0.0
+    }
+
+    response = client.post("/api/export/csv", json=payload)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert "queue full" in response.json()["detail"]
+
+
+def test_result_cache_hits_for_reordered_intents(monkeypatch):
+    """Test that equivalent inputs share a cached result and CSV export reuses it"""
+    from app.result_cache import get_result_cache
+
+    intents = [
+        {"name": "Billing", "volume_share": 0.6, "avg_minutes": 4.0, "containment_m0": 0.3,
+         "containment_m3": 0.6, "handoff_minutes": 1.5, "revenue_per_abandon": None},
+        {"name": "Outage", "volume_share": 0.4, "avg_minutes": 2.5, "containment_m0": 0.5,
+         "containment_m3": 0.75, "handoff_minutes": 1.0, "revenue_per_abandon": 20.0},
+    ]
+    payload = {
+        "annual_calls": 123457,
+        "intents": intents,
+        "agent_cost_per_min": 0.8,
+        "telco_cost_per_min": 0.05,
+        "polyai_cost_per_min": 0.12,
+        "baseline_abandon_rate": 0.15,
+        "ai_abandon_rate": 0.08,
+    }
+    cache = get_result_cache()
+    cache.clear()
+    hits = cache.hits
+
+    first = client.post("/api/calc", json=payload)
+    assert first.headers["X-Cache"] == "MISS"
+
+    reordered = client.post("/api/calc", json={**payload, "intents": intents[::-1], "agent_cost_per_min": 0.8000000000001})
+    assert reordered.headers["X-Cache"] == "HIT"
+    assert reordered.json() == first.json()
+
+    assert client.post("/api/export/csv", json=payload).status_code == 200
+    assert cache.hits == hits + 2
+
+    # The counters are for admins only
+    from app.middleware.auth import require_admin
+    assert client.get("/api/calc/cache").status_code == 403
+    monkeypatch.setitem(app.dependency_overrides, require_admin, lambda: None)
+    assert client.get("/api/calc/cache").json()["hits"] == cache.hits
+
+
+def test_calculation_session_patch():
+    """Test incremental recalculation through session edits"""
+    from app.models import VerticalTemplate
+    from app.templates import get_template
+
+    payload = get_template(VerticalTemplate.RETAIL).model_dump()
+
+    created = client.post("/api/calc/sessions", json=payload)
+    assert created.status_code == 201
+    session = created.json()
+    assert session["version"] == 0
+    assert session["results"]["npv_5y"] == pytest.approx(client.post("/api/calc", json=payload).json()["npv_5y"])
+
+    edit = {"version": 0, "changes": {"agent_cost_per_min": 1.2}, "intents": {"0": {"containment_m3": 0.95}}}
+    response = client.patch(f"/api/calc/sessions/{session['id']}", json=edit)
+    assert response.status_code == 200
+    assert response.json()["version"] == 1
+
+    payload["agent_cost_per_min"] = 1.2
+    payload["intents"][0]["containment_m3"] = 0.95
+    expected = client.post("/api/calc", json=payload).json()
+    assert response.json()["results"]["npv_5y"] == pytest.approx(expected["npv_5y"])
+
+    # Stale version, invalid values and unknown sessions are rejected
+    assert client.patch(f"/api/calc/sessions/{session['id']}", json=edit).status_code == 409
+    invalid = {"changes": {"discount_rate": 5}}
+    assert client.patch(f"/api/calc/sessions/{session['id']}", json=invalid).status_code == 422
+
+    # Unknown fields, in the deal or in an intent, are rejected rather than dropped
+    response = client.patch(f"/api/calc/sessions/{session['id']}", json={"changes": {"agent_cost": 1.0}})
+    assert response.status_code == 400
+    response = client.patch(f"/api/calc/sessions/{session['id']}", json={"intents": {"0": {"containment": 0.9}}})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown intent 0 fields: containment"
+    assert client.patch("/api/calc/sessions/unknown", json={}).status_code == 404
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
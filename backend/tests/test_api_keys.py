@@ -0,0 +1,155 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from app.models.organization import Organization
+from app.services.api_keys import APIKeyIndex, KeyUsageRecorder
+from app.services.calculator_cache import LocalInvalidationBus
+from app.utils.security import generate_api_key, hash_api_key
+
+NOW = datetime(2026, 10, 1, tzinfo=timezone.utc)
+
+
+class KeyStore:
+    """api_keys and organizations rows, answering the key index's queries on the key hash and created_at bound"""
+
+    def __init__(self):
+        self.keys = []
+        self.organizations = {}
+
+    def add(self, key, created_at=NOW, **fields):
+        row = SimpleNamespace(id=uuid.uuid4(), key_hash=hash_api_key(key), organization_id=uuid.uuid4(),
+                              is_active=True, expires_at=None, created_at=created_at)
+        row.__dict__.update(fields)
+        self.keys.append(row)
+        return row
+
+    def query(self, sql, statement, params):
+        values = statement.compile().params.values()
+        if "FROM organizations" in sql:
+            return [self.organizations[value] for value in values if value in self.organizations]
+        hashes = [value for value in values if isinstance(value, str)]
+        since = [value for value in values if isinstance(value, datetime)]
+        return [row for row in self.keys if row.is_active
+                and (not hashes or row.key_hash in hashes)
+                and (not since or row.created_at >= since[0])]
+
+
+def test_api_key_index_resolves_keys_without_queries(fake_async_db):
+    """Keys load once, then resolve from memory; unknown and expired keys are rejected"""
+    store = KeyStore()
+    db = fake_async_db(store.query)
+    key, expired = generate_api_key(), generate_api_key()
+    row = store.add(key)
+    store.add(expired, expires_at=NOW - timedelta(days=1))
+    index = APIKeyIndex(refresh_interval=60, reload_interval=600)
+
+    entry = asyncio.run(index.lookup(db, key))
+    assert entry.id == row.id and entry.organization_id == row.organization_id
+    assert db.queries == 1
+
+    for _ in range(10):
+        assert asyncio.run(index.lookup(db, key)).id == row.id
+    assert asyncio.run(index.lookup(db, expired)) is None
+    assert db.queries == 1
+
+    # Unknown keys cost one query, then are remembered
+    assert asyncio.run(index.lookup(db, "cf_unknown")) is None
+    assert asyncio.run(index.lookup(db, "cf_unknown")) is None
+    assert db.queries == 2
+
+
+def test_api_key_index_refreshes_incrementally_and_invalidates(fake_async_db):
+    """Refreshes only read newer keys, and invalidations reach other workers"""
+    store = KeyStore()
+    db = fake_async_db(store.query)
+    old_key, new_key = generate_api_key(), generate_api_key()
+    old_row = store.add(old_key)
+    bus = LocalInvalidationBus()
+    worker_a = APIKeyIndex(refresh_interval=0, reload_interval=600, bus=bus)
+    worker_b = APIKeyIndex(refresh_interval=0, reload_interval=600, bus=bus)
+
+    asyncio.run(worker_b.lookup(db, old_key))
+    store.add(new_key, created_at=NOW + timedelta(minutes=5))
+    assert asyncio.run(worker_b.lookup(db, new_key)) is not None
+    assert len(worker_b) == 2
+
+    # A deactivated key stays out once invalidated, even after the next refresh
+    old_row.is_active = False
+    worker_a.invalidate(old_row.key_hash)
+    assert asyncio.run(worker_b.lookup(db, old_key)) is None
+
+
+def test_key_usage_recorder_coalesces_uses(fake_db):
+    """Uses are coalesced to the latest per key and written as one batch"""
+    session = fake_db()
+    recorder = KeyUsageRecorder(lambda: session, flush_interval=60)
+    key_id = uuid.uuid4()
+    for minutes in (3, 1, 2):
+        recorder.record(key_id, NOW + timedelta(minutes=minutes))
+
+    assert recorder.flush() == 1
+    assert session.batches == [[{"key_id": key_id, "used_at": NOW + timedelta(minutes=3)}]]
+    assert recorder.flush() == 0
+
+
+def test_public_calculate_authenticates_api_keys(monkeypatch, fake_async_db):
+    """Public calculate accepts a valid X-API-Key, rejects revoked and foreign keys, and stays open without one"""
+    from fastapi.testclient import TestClient
+    from app.api import calculators
+    from app.database import get_db
+    from app.main import app
+    from app.middleware import auth
+    from app.services.principal_cache import PrincipalCache
+
+    store = KeyStore()
+    db = fake_async_db(store.query)
+    organization = Organization(id=uuid.uuid4(), name="Acme", slug="acme")
+    other = Organization(id=uuid.uuid4(), name="Other", slug="other")
+    store.organizations = {organization.id: organization, other.id: other}
+    key, revoked, foreign = generate_api_key(), generate_api_key(), generate_api_key()
+    store.add(key, organization_id=organization.id)
+    store.add(revoked, organization_id=organization.id, is_active=False)
+    store.add(foreign, organization_id=other.id)
+
+    calculator = SimpleNamespace(id=uuid.uuid4(), organization_id=organization.id)
+    used = []
+
+    async def get_published_calculator(db, org_slug, calc_slug):
+        return calculator
+
+    async def create_session(db, calculator, inputs, *tracking):
+        return SimpleNamespace(id=uuid.uuid4(), session_token="token", calculator_id=calculator.id,
+                               inputs=inputs, results={"roi": 1.0}, completed=True, created_at=NOW)
+
+    async def override_get_db():
+        yield db
+
+    index, cache = APIKeyIndex(refresh_interval=60, reload_interval=600), PrincipalCache()
+    monkeypatch.setattr(auth, "get_api_key_index", lambda: index)
+    monkeypatch.setattr(auth, "get_principal_cache", lambda: cache)
+    monkeypatch.setattr(auth, "get_key_usage_recorder", lambda: SimpleNamespace(record=used.append))
+    monkeypatch.setattr(calculators.CalculatorService, "get_published_calculator", get_published_calculator)
+    monkeypatch.setattr(calculators.CalculatorService, "create_session", create_session)
+    monkeypatch.setitem(app.dependency_overrides, get_db, override_get_db)
+    client = TestClient(app)
+    url = "/api/calculators/public/acme/roi/calculate"
+
+    response = client.post(url, json={"calls": 1000}, headers={"X-API-Key": key})
+    assert response.status_code == 200
+    assert response.json()["results"] == {"roi": 1.0}
+    assert len(used) == 1
+
+    response = client.post(url, json={"calls": 1000}, headers={"X-API-Key": revoked})
+    assert response.status_code == 401
+    assert response.headers["www-authenticate"] == "APIKey"
+
+    assert client.post(url, json={"calls": 1000}, headers={"X-API-Key": foreign}).status_code == 403
+    assert client.post(url, json={"calls": 1000}).status_code == 200
+    assert len(used) == 2  # The valid and the foreign key
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -1,6 +1,7 @@
 import pytest
+import numpy as np
 from app.models import DealInputs, IntentRow
-from app.calc_engine import ROICalculator
+from app.calc_engine import ROICalculator, BatchROICalculator, IncrementalROICalculator, YEAR_FIELDS, pack_intents, pack_params, yearly_arrays
 
 
 def test_basic_calculation():
@@ -389,5 +390,305 @@ def test_multiple_intents():
     assert results.yearly[0].revenue_retained > 0
 
 
+def test_yearly_arrays_batched_matches_single():
+    """Stacked parameter rows should match evaluating each deal on its own"""
+    inputs = DealInputs(
+        annual_calls=100000,
+        intents=[
+            IntentRow(name="A", volume_share=0.7, avg_minutes=2.0, containment_m0=0.5,
+                      containment_m3=0.8, handoff_minutes=1.0, revenue_per_abandon=20.0),
+            IntentRow(name="B", volume_share=0.3, avg_minutes=4.0, containment_m0=0.2,
+                      containment_m3=0.4, handoff_minutes=2.0, revenue_per_abandon=None)
+        ],
+        agent_cost_per_min=0.8,
+        telco_cost_per_min=0.05,
+        polyai_cost_per_min=0.12,
+        baseline_abandon_rate=0.15,
+        ai_abandon_rate=0.08
+    )
+
+    cols = pack_intents(inputs.intents)
+    params = pack_params(inputs)
+    single = yearly_arrays(cols, params)
+
+    yearly = ROICalculator(inputs).calculate().yearly
+    for field in YEAR_FIELDS:
+        assert np.allclose(single[field], [getattr(yr, field) for yr in yearly])
+
+    growth = np.array([0.0, 0.05, 0.2])
+    batched = yearly_arrays(cols, {**params, "volume_growth": growth})
+    assert batched["total_value"].shape == (3, 5)
+    for row, g in enumerate(growth):
+        expected = yearly_arrays(cols, {**params, "volume_growth": g})
+        assert np.allclose(batched["discounted_value"][row], expected["discounted_value"])
+
+
+def test_tornado_matches_individual_recalculation():
+    """Batched tornado deltas should equal re-running each perturbation, without mutating inputs"""
+    inputs = DealInputs(
+        annual_calls=100000,
+        intents=[
+            IntentRow(name="A", volume_share=0.5, avg_minutes=2.0, containment_m0=0.5,
+                      containment_m3=0.9, handoff_minutes=1.0, revenue_per_abandon=None),
+            IntentRow(name="B", volume_share=0.5, avg_minutes=6.0, containment_m0=0.2,
+                      containment_m3=0.4, handoff_minutes=2.0, revenue_per_abandon=None)
+        ],
+        agent_cost_per_min=0.8,
+        telco_cost_per_min=0.05,
+        polyai_cost_per_min=0.12,
+        baseline_abandon_rate=0.15,
+        ai_abandon_rate=0.08
+    )
+    before = inputs.model_dump()
+
+    tornado = dict(ROICalculator(inputs)._calculate_tornado())
+    assert inputs.model_dump() == before
+
+    def npv(deal):
+        return sum(yr.discounted_value for yr in ROICalculator(deal)._calculate_yearly_results())
+
+    high = inputs.model_copy(deep=True)
+    high.intents[1].containment_m3 = 0.4 * 1.2
+    low = inputs.model_copy(deep=True)
+    low.intents[1].containment_m3 = 0.4 * 0.8
+    assert tornado["Containment_B"] == pytest.approx(abs(npv(high) - npv(low)) / 2)
+
+    high = inputs.model_copy(update={"agent_cost_per_min": 0.8 * 1.2})
+    low = inputs.model_copy(update={"agent_cost_per_min": 0.8 * 0.8})
+    assert tornado["agent_cost_per_min"] == pytest.approx(abs(npv(high) - npv(low)) / 2)
+
+
+def test_monte_carlo_scenarios():
+    """Monte Carlo mode should be reproducible per seed and bracket the base NPV"""
+    inputs = DealInputs(
+        annual_calls=100000,
+        intents=[
+            IntentRow(name="A", volume_share=0.6, avg_minutes=3.0, containment_m0=0.5,
+                      containment_m3=0.8, handoff_minutes=1.0, revenue_per_abandon=10.0),
+            IntentRow(name="B", volume_share=0.4, avg_minutes=5.0, containment_m0=0.0,
+                      containment_m3=0.0, handoff_minutes=2.0, revenue_per_abandon=None)
+        ],
+        agent_cost_per_min=0.8,
+        telco_cost_per_min=0.05,
+        polyai_cost_per_min=0.12,
+        baseline_abandon_rate=0.15,
+        ai_abandon_rate=0.08
+    )
+
+    results = ROICalculator(inputs, draws=20000, seed=7).calculate()
+    again = ROICalculator(inputs, draws=20000, seed=7).calculate()
+
+    assert results.distribution == again.distribution
+    assert results.p10_p50_p90 == results.distribution["npv_5y"]
+    for metric in ("npv_5y", "roi_5y"):
+        p = results.distribution[metric]
+        assert p["p10"] <= p["p50"] <= p["p90"]
+    assert results.p10_p50_p90["p10"] < results.npv_5y < results.p10_p50_p90["p90"]
+    assert abs(results.p10_p50_p90["p50"] - results.npv_5y) < results.npv_5y * 0.05
+    assert results.distribution["payback_months"]["p50"] is not None
+
+    # Deterministic mode leaves the distribution unset
+    assert ROICalculator(inputs).calculate().distribution is None
+
+
+def test_monte_carlo_reduces_draws_once(monkeypatch):
+    """The draws x intents matrix is sampled once and reduced once, shared by the totals and payback"""
+    from app import calc_engine
+
+    inputs = DealInputs(
+        annual_calls=100000,
+        intents=[
+            IntentRow(name=f"Intent {i}", volume_share=0.05, avg_minutes=3.0 + i * 0.1, containment_m0=0.3,
+                      containment_m3=0.6 + i * 0.01, handoff_minutes=1.0, revenue_per_abandon=10.0)
+            for i in range(20)
+        ],
+        agent_cost_per_min=0.8,
+        telco_cost_per_min=0.05,
+        polyai_cost_per_min=0.12,
+        baseline_abandon_rate=0.15,
+        ai_abandon_rate=0.08
+    )
+    calls = {"per_call_from_sums": 0, "matrix_samples": 0}
+
+    def per_call_from_sums(sums, params):
+        calls["per_call_from_sums"] += 1
+        return original_per_call_from_sums(sums, params)
+
+    def standard_triangular(rng, c, size, **options):
+        if len(size) > 1:
+            calls["matrix_samples"] += 1
+        return original_standard_triangular(rng, c, size, **options)
+
+    def per_call_minutes(cols, params):
+        raise AssertionError("Monte Carlo draws should not be reduced per call more than once")
+
+    original_per_call_from_sums = calc_engine.per_call_from_sums
+    original_standard_triangular = calc_engine.standard_triangular
+    monkeypatch.setattr(calc_engine, "per_call_from_sums", per_call_from_sums)
+    monkeypatch.setattr(calc_engine, "standard_triangular", standard_triangular)
+    monkeypatch.setattr(calc_engine, "per_call_minutes", per_call_minutes)
+
+    distribution = ROICalculator(inputs, draws=100000, seed=7)._simulate()
+
+    assert calls == {"per_call_from_sums": 1, "matrix_samples": 1}
+    p = distribution["npv_5y"]
+    assert p["p10"] <= p["p50"] <= p["p90"]
+
+
+def test_monte_carlo_100k_draws_of_20_intents_is_fast():
+    """100k draws over 20 intents stay well under the 100 ms budget of an interactive request"""
+    import time
+
+    inputs = DealInputs(
+        annual_calls=1000000,
+        intents=[
+            IntentRow(name=f"Intent {i}", volume_share=0.05, avg_minutes=3.0, containment_m0=0.2,
+                      containment_m3=0.6, handoff_minutes=1.0, revenue_per_abandon=10.0)
+            for i in range(20)
+        ],
+        agent_cost_per_min=0.8,
+        telco_cost_per_min=0.05,
+        polyai_cost_per_min=0.12,
+        baseline_abandon_rate=0.15,
+        ai_abandon_rate=0.08
+    )
+    calculator = ROICalculator(inputs, draws=100000, seed=1)
+    calculator._simulate()  # Warm up
+
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        calculator._simulate()
+        timings.append(time.perf_counter() - start)
+
+    assert min(timings) < 0.075
+
+
+def test_payback_horizon_and_fractional_months():
+    """Payback beyond 36 months needs a longer horizon; fractional payback falls within the whole month"""
+    inputs = DealInputs(
+        annual_calls=100000,
+        intents=[
+            IntentRow(
+                name="Slow Payback Intent",
+                volume_share=1.0,
+                avg_minutes=3.0,
+                containment_m0=0.5,
+                containment_m3=0.8,
+                handoff_minutes=2.5,
+                revenue_per_abandon=None
+            )
+        ],
+        agent_cost_per_min=0.8,
+        telco_cost_per_min=0.05,
+        polyai_cost_per_min=0.6,
+        baseline_abandon_rate=0.15,
+        ai_abandon_rate=0.08,
+        inflation=0.0,
+        volume_growth=0.0
+    )
+
+    assert ROICalculator(inputs).calculate().payback_months is None
+
+    whole = ROICalculator(inputs, payback_horizon=120).calculate().payback_months
+    assert whole == 40
+
+    fractional = ROICalculator(inputs, payback_horizon=120, fractional_payback=True).calculate().payback_months
+    assert whole - 1 < fractional <= whole
+
+
+def test_batch_matches_single_calculation():
+    """Padded batch evaluation should reproduce each deal's individual results"""
+    single_intent = DealInputs(
+        annual_calls=50000,
+        intents=[
+            IntentRow(name="Only", volume_share=1.0, avg_minutes=4.0, containment_m0=0.3,
+                      containment_m3=0.6, handoff_minutes=1.5, revenue_per_abandon=None)
+        ],
+        agent_cost_per_min=0.9,
+        telco_cost_per_min=0.04,
+        polyai_cost_per_min=0.15,
+        baseline_abandon_rate=0.2,
+        ai_abandon_rate=0.1,
+        risk_adjustment=0.1
+    )
+    three_intents = DealInputs(
+        annual_calls=250000,
+        intents=[
+            IntentRow(name="A", volume_share=0.5, avg_minutes=2.0, containment_m0=0.5,
+                      containment_m3=0.9, handoff_minutes=0.5, revenue_per_abandon=15.0),
+            IntentRow(name="B", volume_share=0.3, avg_minutes=5.0, containment_m0=0.2,
+                      containment_m3=0.5, handoff_minutes=2.0, revenue_per_abandon=None),
+            IntentRow(name="C", volume_share=0.2, avg_minutes=1.0, containment_m0=0.0,
+                      containment_m3=0.0, handoff_minutes=0.0, revenue_per_abandon=5.0)
+        ],
+        agent_cost_per_min=0.7,
+        telco_cost_per_min=0.05,
+        polyai_cost_per_min=0.1,
+        baseline_abandon_rate=0.12,
+        ai_abandon_rate=0.06,
+        inflation=0.05,
+        volume_growth=0.2
+    )
+
+    deals = [single_intent, three_intents, single_intent]
+    batch = BatchROICalculator(deals).calculate()
+
+    assert len(batch) == 3
+    for deal, result in zip(deals, batch):
+        expected = ROICalculator(deal).calculate()
+        assert result.payback_months == expected.payback_months
+        assert result.npv_5y == pytest.approx(expected.npv_5y)
+        assert result.roi_5y == pytest.approx(expected.roi_5y)
+        assert [name for name, _ in result.tornado] == [name for name, _ in expected.tornado]
+        assert [v for _, v in result.tornado] == pytest.approx([v for _, v in expected.tornado])
+        assert result.p10_p50_p90 == pytest.approx(expected.p10_p50_p90)
+        assert result.ops_vs_revenue_split == pytest.approx(expected.ops_vs_revenue_split)
+
+    assert BatchROICalculator([]).calculate() == []
+
+
+def test_incremental_matches_full_recalculation():
+    """Incremental updates should reproduce a from-scratch calculation after each edit"""
+    inputs = DealInputs(
+        annual_calls=250000,
+        intents=[
+            IntentRow(name="A", volume_share=0.5, avg_minutes=2.0, containment_m0=0.5,
+                      containment_m3=0.9, handoff_minutes=0.5, revenue_per_abandon=15.0),
+            IntentRow(name="B", volume_share=0.3, avg_minutes=5.0, containment_m0=0.2,
+                      containment_m3=0.5, handoff_minutes=2.0, revenue_per_abandon=None),
+            IntentRow(name="C", volume_share=0.2, avg_minutes=1.0, containment_m0=0.0,
+                      containment_m3=0.0, handoff_minutes=0.0, revenue_per_abandon=5.0)
+        ],
+        agent_cost_per_min=0.7,
+        telco_cost_per_min=0.05,
+        polyai_cost_per_min=0.1,
+        baseline_abandon_rate=0.12,
+        ai_abandon_rate=0.06,
+        risk_adjustment=0.1
+    )
+    calculator = IncrementalROICalculator(inputs)
+
+    edited_intent = inputs.model_copy(deep=True)
+    edited_intent.intents[1].containment_m3 = 0.95
+    edited_global = edited_intent.model_copy(update={"agent_cost_per_min": 0.4, "discount_rate": 0.2})
+    fewer_intents = edited_global.model_copy(update={"intents": [
+        IntentRow(name="All", volume_share=1.0, avg_minutes=3.0, containment_m0=0.3,
+                  containment_m3=0.7, handoff_minutes=1.0, revenue_per_abandon=None)
+    ]})
+
+    for edited in (inputs, edited_intent, edited_global, fewer_intents):
+        result = calculator.update(edited)
+        expected = ROICalculator(edited).calculate()
+        assert result.payback_months == expected.payback_months
+        assert result.npv_5y == pytest.approx(expected.npv_5y)
+        assert result.roi_5y == pytest.approx(expected.roi_5y)
+        assert [name for name, _ in result.tornado] == [name for name, _ in expected.tornado]
+        assert [v for _, v in result.tornado] == pytest.approx([v for _, v in expected.tornado])
+        assert result.p10_p50_p90 == pytest.approx(expected.p10_p50_p90)
+        for got, want in zip(result.yearly, expected.yearly):
+            assert got.model_dump() == pytest.approx(want.model_dump())
+
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
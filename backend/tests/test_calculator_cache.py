@@ -0,0 +1,59 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+from app.schemas.calculator import CalculatorResponse
+from app.services.calculator_cache import LocalInvalidationBus, PublishedCalculatorCache
+
+
+def make_calculator(name: str) -> CalculatorResponse:
+    now = datetime.utcnow()
+    return CalculatorResponse(
+        id=uuid.uuid4(), organization_id=uuid.uuid4(), name=name, slug=name.lower(),
+        description=None, status="published", config={"calculations": {"formulas": {}}},
+        views_count=0, completions_count=0, created_at=now, updated_at=now, published_at=now
+    )
+
+
+def loader(calculator: CalculatorResponse):
+    async def load():
+        return calculator
+    return load
+
+
+def test_published_calculator_cache_hits_and_invalidation():
+    """Repeat lookups are served from cache until the calculator is invalidated"""
+    loads = []
+    calculator = make_calculator("Savings")
+
+    async def load():
+        loads.append(1)
+        return calculator
+
+    cache = PublishedCalculatorCache(max_entries=10, ttl_seconds=60)
+    assert asyncio.run(cache.get("acme", "savings", load)) is calculator
+    assert asyncio.run(cache.get("acme", "savings", load)) is calculator
+    assert len(loads) == 1 and cache.hits == 1
+
+    cache.invalidate(calculator.id)
+    asyncio.run(cache.get("acme", "savings", load))
+    assert len(loads) == 2
+
+
+def test_published_calculator_cache_cross_worker_invalidation():
+    """Invalidations published on a shared bus evict entries in every cache"""
+    bus = LocalInvalidationBus()
+    worker_a = PublishedCalculatorCache(bus=bus)
+    worker_b = PublishedCalculatorCache(bus=bus)
+    calculator = make_calculator("Payback")
+
+    asyncio.run(worker_b.get("acme", "payback", loader(calculator)))
+    worker_a.invalidate(calculator.id)
+
+    reloaded = make_calculator("Payback")
+    assert asyncio.run(worker_b.get("acme", "payback", loader(reloaded))) is reloaded
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,43 @@
+import uuid
+
+import pytest
+from app.services.counters import CounterAggregator
+
+
+def test_counter_aggregator_batches_increments(fake_db):
+    """Increments are summed per calculator and written as one batch"""
+    session = fake_db()
+    aggregator = CounterAggregator(lambda: session, flush_interval=60)
+    popular, other = uuid.uuid4(), uuid.uuid4()
+
+    for _ in range(50):
+        aggregator.increment(popular, views=1, completions=1)
+    aggregator.increment(other, views=2)
+    assert aggregator.pending(popular) == {"views_count": 50, "completions_count": 50}
+
+    assert aggregator.flush() == 2
+    assert len(session.batches) == 1
+    rows = {row["calculator_id"]: row for row in session.batches[0]}
+    assert rows[popular]["views_count"] == 50
+    assert rows[other] == {"calculator_id": other, "views_count": 2, "completions_count": 0}
+    assert aggregator.pending(popular) == {"views_count": 0, "completions_count": 0}
+    assert aggregator.flush() == 0
+
+
+def test_counter_aggregator_keeps_increments_when_flush_fails(fake_db):
+    """A failed flush keeps its increments for the next attempt"""
+    session = fake_db(failures=1)
+    aggregator = CounterAggregator(lambda: session, flush_interval=60)
+    calculator_id = uuid.uuid4()
+
+    aggregator.increment(calculator_id, views=3, completions=1)
+    assert aggregator.flush() == 0
+    aggregator.increment(calculator_id, views=1)
+
+    assert aggregator.flush() == 1
+    assert session.batches[0][0]["views_count"] == 4
+    assert session.batches[0][0]["completions_count"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
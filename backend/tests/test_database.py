@@ -0,0 +1,79 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.models.calculator import Calculator
+from app.models.session import CalculatorSession
+from app.services import calculator_service
+from app.services.analytics_rollup import apply_daily_rollups
+from app.services.counters import CounterAggregator
+from app.services.session_ingest import SessionIngestQueue
+
+
+def test_get_db_yields_async_sessions(sqlite_db):
+    """get_db serves sessions on the asyncio driver for DATABASE_URL"""
+
+    async def query():
+        async for db in get_db():
+            assert isinstance(db, AsyncSession)
+            assert db.bind.url.drivername == "sqlite+aiosqlite"
+            return await db.scalar(text("SELECT 1"))
+
+    assert asyncio.run(query()) == 1
+
+
+def test_public_calculator_round_trip(sqlite_db, monkeypatch):
+    """Signup, login, create and publish a calculator, calculate publicly and capture a lead"""
+    from app.main import app
+
+    ingest = SessionIngestQueue(sqlite_db, flush_interval=60, after_insert=apply_daily_rollups)
+    counters = CounterAggregator(sqlite_db, flush_interval=60)
+    monkeypatch.setattr(calculator_service, "get_session_ingest_queue", lambda: ingest)
+    monkeypatch.setattr(calculator_service, "get_counter_aggregator", lambda: counters)
+    client = TestClient(app)
+
+    account = {"email": "owner@example.com", "password": "Corr3ct-horse", "organization_name": "Acme Telecom"}
+    assert client.post("/api/auth/signup", json=account).status_code == 201
+    response = client.post("/api/auth/login", json={"email": account["email"], "password": account["password"]})
+    assert response.status_code == 200
+    org_slug = response.json()["organization"]["slug"]
+    headers = {"Authorization": f"Bearer {response.json()['tokens']['access_token']}"}
+
+    config = {"calculations": {"formulas": {"savings": "calls * 2", "roi": "savings / 10"}}}
+    response = client.post("/api/calculators", json={"name": "Call ROI", "config": config}, headers=headers)
+    assert response.status_code == 201
+    calculator_id = response.json()["id"]
+    response = client.post(f"/api/calculators/{calculator_id}/publish", headers=headers)
+    assert response.json()["status"] == "published"
+
+    started_at = datetime.now(timezone.utc) - timedelta(seconds=90)
+    response = client.post(f"/api/calculators/public/{org_slug}/call-roi/calculate", json={"calls": 100},
+                           params={"started_at": started_at.isoformat()})
+    assert response.status_code == 200
+    assert response.json()["results"] == {"savings": 200, "roi": 20.0}
+    session_token = response.json()["session_token"]
+    assert ingest.is_pending(session_token)
+
+    # Capturing the lead writes the still-queued session first
+    lead = {"session_token": session_token, "email": "lead@example.com", "name": "Lee"}
+    assert client.post("/api/calculators/sessions/capture-lead", json=lead).status_code == 200
+
+    analytics = client.get(f"/api/calculators/{calculator_id}/analytics", headers=headers).json()
+    assert analytics["total_completions"] == 1
+    assert analytics["leads_captured"] == 1
+    assert 90 <= analytics["avg_time_to_complete"] < 120
+
+    assert counters.flush() == 1
+    with sqlite_db() as db:
+        session = db.scalar(select(CalculatorSession).where(CalculatorSession.session_token == session_token))
+        assert session.lead_email == "lead@example.com"
+        assert db.scalar(select(Calculator.views_count)) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,77 @@
+import asyncio
+import os
+import time
+
+import pytest
+from app import export_jobs
+from app.executor import CalculationExecutor, ExecutorBusy
+from app.export_jobs import ExportJobs
+
+
+def fake_render(directory, job, inputs, results):
+    with open(export_jobs.artifact_path(directory, job["id"], job["format"]), "wb") as f:
+        f.write(b"%PDF-" + inputs)
+    export_jobs._write_status(directory, {**job, "status": export_jobs.DONE, "finished_at": time.time()})
+
+
+def make_jobs(tmp_path, **options) -> ExportJobs:
+    executor = CalculationExecutor(backend="thread", max_workers=1, max_pending=options.pop("max_pending", 4),
+                                   name="Export")
+    return ExportJobs(str(tmp_path), executor, **options)
+
+
+def test_export_job_runs_in_background_and_expires(tmp_path, monkeypatch):
+    """Submit returns at once; the job is then served from its status file until it expires"""
+    monkeypatch.setattr(export_jobs, "render_export", fake_render)
+    jobs = make_jobs(tmp_path, ttl_seconds=3600)
+
+    async def scenario():
+        job = await jobs.submit("pdf", b"report", None)
+        assert job["status"] == "pending"
+        assert jobs.get(job["id"])["status"] == "pending"
+        await asyncio.gather(*jobs._tasks)
+        return job["id"]
+
+    job_id = asyncio.run(scenario())
+    job = jobs.get(job_id)
+    assert job["status"] == "done"
+    with open(jobs.artifact(job), "rb") as f:
+        assert f.read() == b"%PDF-report"
+
+    # Past the TTL the job is gone, and cleanup deletes its files
+    jobs.ttl_seconds = 0
+    assert jobs.get(job_id) is None
+    assert jobs.cleanup() == 1
+    assert os.listdir(tmp_path) == []
+
+
+def test_export_jobs_reject_unknown_ids_and_overload(tmp_path):
+    """Malformed ids never touch the filesystem, and a full queue sheds load"""
+    jobs = make_jobs(tmp_path, max_pending=0)
+    assert jobs.get("../../etc/passwd") is None
+    assert jobs.get("0" * 32) is None
+
+    async def scenario():
+        await jobs.submit("xlsx", None, None)
+        with pytest.raises(ExecutorBusy):
+            await jobs.submit("xlsx", None, None)
+        with pytest.raises(ValueError):
+            await jobs.submit("docx", None, None)
+        await asyncio.gather(*jobs._tasks)
+
+    asyncio.run(scenario())
+    jobs.shutdown()
+
+
+def test_failed_render_is_recorded(tmp_path):
+    """A render that raises leaves a failed job with its error and no artifact"""
+    job = {"id": "a" * 32, "format": "xlsx", "status": "pending", "created_at": 0}
+    export_jobs.render_export(str(tmp_path), job, None, None)
+
+    failed = make_jobs(tmp_path).get(job["id"])
+    assert failed["status"] == "failed" and failed["error"]
+    assert sorted(os.listdir(tmp_path)) == [f"{job['id']}.json"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,95 @@
+import asyncio
+import io
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from app.calc_engine import calculate
+from app.executor import CalculationExecutor, ExecutorBusy
+from app.exports import ExcelExporter, PDFExporter, report_key
+from app.utils.cache import LocalCacheBackend
+from app.models import DealInputs, IntentRow
+
+
+def make_inputs() -> DealInputs:
+    return DealInputs(
+        annual_calls=100000,
+        intents=[IntentRow(name="Billing enquiries with a long name", volume_share=1.0, avg_minutes=3.0,
+                           containment_m0=0.5, containment_m3=0.8, handoff_minutes=1.0)],
+        agent_cost_per_min=0.8, telco_cost_per_min=0.05, polyai_cost_per_min=0.12, acw_minutes=1.0,
+        baseline_abandon_rate=0.15, ai_abandon_rate=0.08, business_hours_only=True, night_fraction=0.3,
+        inflation=0.03, volume_growth=0.05, discount_rate=0.1, risk_adjustment=0.9,
+    )
+
+
+def test_streamed_workbook_matches_sheets_and_widths():
+    """The streamed workbook arrives in chunks, with styled headers and capped column widths"""
+    inputs = make_inputs()
+    results = calculate(inputs)
+
+    async def scenario():
+        executor = CalculationExecutor("thread", max_workers=1)
+        stream = await ExcelExporter().stream_workbook(inputs, results, executor, chunk_size=1024)
+        chunks = list(stream)
+        executor.shutdown()
+        return chunks
+
+    chunks = asyncio.run(scenario())
+    assert len(chunks) > 1
+
+    wb = openpyxl.load_workbook(io.BytesIO(b"".join(chunks)))
+    assert wb.sheetnames == ["Inputs", "Intents", "Calcs_5Y", "Sensitivity", "Scenarios", "Notes"]
+    assert wb["Inputs"]["A1"].font.b
+    assert wb["Intents"]["A2"].value == "Billing enquiries with a long name"
+    assert wb["Intents"].column_dimensions["A"].width == 20
+    assert wb["Inputs"].column_dimensions["C"].width == len("Fraction of calls outside business hours") + 2
+    assert wb["Calcs_5Y"].cell(row=len(results.yearly) + 4, column=1).value == "5Y ROI (%)"
+    assert wb["Notes"].column_dimensions["A"].width == 80
+
+
+def test_stream_stops_writing_when_closed_early():
+    """Closing the stream early doesn't leave the writer blocked on its executor slot"""
+    inputs = make_inputs()
+    results = calculate(inputs)
+
+    async def scenario():
+        executor = CalculationExecutor("thread", max_workers=1, max_pending=0, queue_timeout=0.05)
+        stream = await ExcelExporter().stream_workbook(inputs, results, executor, chunk_size=256)
+        assert next(stream)
+        with pytest.raises(ExecutorBusy):
+            await ExcelExporter().stream_workbook(inputs, results, executor)
+
+        stream.close()
+        for _ in range(100):
+            if executor.in_flight == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert executor.in_flight == 0
+        executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_pdf_reports_are_cached_by_inputs_and_results():
+    """A repeat export of the same deal is served from the report cache"""
+    inputs = make_inputs()
+    results = calculate(inputs)
+    cache = LocalCacheBackend(max_entries=4, ttl_seconds=60)
+    cache.set(report_key(inputs, results), b"%PDF-cached")
+
+    assert PDFExporter(cache).create_report(inputs, results) == b"%PDF-cached"
+    changed = inputs.model_copy(update={"annual_calls": 200000})
+    assert report_key(changed, calculate(changed)) != report_key(inputs, results)
+
+
+def test_pdf_html_escapes_user_text():
+    """Intent names are escaped in the report markup"""
+    inputs = make_inputs()
+    inputs.intents[0].name = "<b>Billing</b>"
+    html = PDFExporter(LocalCacheBackend())._generate_html(inputs, calculate(inputs))
+    assert "&lt;b&gt;Billing&lt;/b&gt;" in html and "<b>Billing" not in html
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,173 @@
+import pytest
+import numpy as np
+from simpleeval import simple_eval
+from app.services.formula_engine import CompiledFormula, FormulaEngine
+
+
+def test_compiled_formula_matches_simple_eval():
+    """Compiled formulas should evaluate exactly like simple_eval"""
+    variables = {"a": 3, "b": 2, "c": 5, "cashflows": [100.0, 200.0, 300.0]}
+    formulas = [
+        "a * b + c",
+        "a ** 2 - b / c",
+        "-a if a > b else b",
+        "a < b < c",
+        "a and b or c",
+        "max(a, b, c) + round(a / 3, 2)",
+        "npv(0.1, cashflows) + avg(cashflows[1:])",
+        "a // b % c",
+    ]
+
+    for formula in formulas:
+        compiled = FormulaEngine.compile(formula)
+        assert isinstance(compiled, CompiledFormula)
+        assert compiled(variables) == simple_eval(formula, names=variables, functions=FormulaEngine.SAFE_FUNCTIONS)
+
+    assert FormulaEngine.compile("a * b + c") is FormulaEngine.compile("a * b + c")
+    assert FormulaEngine.compile("max(a, b) * rate").variables == {"a", "b", "rate"}
+
+
+def test_compiled_formula_attributes_and_fstrings_match_simple_eval():
+    """Attribute access, method calls and f-strings evaluate like simple_eval"""
+    variables = {"a": 3, "rate": 0.0725, "plan": {"seats": 40}, "tier": "pro"}
+    formulas = [
+        "a.real + a.imag",
+        "plan.seats * 2",
+        "tier.upper()",
+        "f'{tier} plan at {rate:.1%}'",
+        "f'{plan.seats} seats for {a * 10}'",
+    ]
+
+    for formula in formulas:
+        expected = simple_eval(formula, names=variables, functions=FormulaEngine.SAFE_FUNCTIONS)
+        assert FormulaEngine.compile(formula)(variables) == expected
+
+    # Attributes simple_eval refuses are refused when compiling
+    for formula in ("a.__class__", "tier.format(a)", "f'{a.func_globals}'"):
+        with pytest.raises(ValueError, match="Invalid formula"):
+            FormulaEngine.compile(formula)
+    with pytest.raises(ValueError, match="Invalid formula"):
+        FormulaEngine.evaluate("plan.missing", variables)
+
+
+def test_compiled_formula_errors():
+    """Invalid formulas fail at compile time, missing variables at evaluation"""
+    with pytest.raises(ValueError, match="Invalid formula"):
+        FormulaEngine.compile("__import__('os')")
+    with pytest.raises(ValueError, match="Invalid formula"):
+        FormulaEngine.compile("a.__class__")
+    with pytest.raises(ValueError, match="Invalid formula"):
+        FormulaEngine.evaluate("9 ** 9999999", {})
+    with pytest.raises(ValueError, match="Variable not defined"):
+        FormulaEngine.evaluate("missing * 2", {})
+    with pytest.raises(ValueError, match="Division by zero"):
+        FormulaEngine.evaluate(FormulaEngine.compile("a / b"), {"a": 1, "b": 0})
+
+
+def test_calculate_roi_metrics_with_compiled_formulas():
+    """Compiled and source formulas give the same metrics"""
+    formulas = {
+        "roi": "(savings / ai_cost) * 100",
+        "savings": "baseline_cost - ai_cost",
+        "baseline_cost": "annual_calls * agent_cost_per_min * avg_minutes",
+        "ai_cost": "annual_calls * ai_cost_per_min * avg_minutes * (1 - containment)",
+    }
+    inputs = {
+        "annual_calls": 100000,
+        "agent_cost_per_min": 0.8,
+        "ai_cost_per_min": 0.12,
+        "avg_minutes": 5,
+        "containment": 0.7
+    }
+
+    expected = FormulaEngine.calculate_roi_metrics(inputs, formulas)
+    compiled = FormulaEngine.calculate_roi_metrics(inputs, FormulaEngine.compile_formulas(formulas))
+
+    assert compiled == expected
+    assert expected["savings"] == pytest.approx(400000 - 18000)
+
+
+def test_formula_plan_orders_deep_chains():
+    """Dependency order handles chains deeper than any fixed number of passes"""
+    formulas = {f"step_{i}": f"step_{i - 1} + 1" for i in range(60, 0, -1)}
+    formulas["step_0"] = "start * 2"
+
+    plan = FormulaEngine.plan(formulas)
+    assert plan.order[0] == "step_0"
+    assert plan.inputs == {"start"}
+
+    results = FormulaEngine.calculate_roi_metrics({"start": 5}, plan)
+    assert results["step_60"] == 70
+
+
+def test_formula_plan_diagnostics():
+    """Cycles and missing variables are reported precisely"""
+    with pytest.raises(ValueError, match="Circular dependency between formulas: a -> b -> c -> a"):
+        FormulaEngine.plan({"total": "a + 1", "a": "b * 2", "b": "c - 1", "c": "a / 2"})
+
+    with pytest.raises(ValueError, match="Formula 'broken': Invalid formula"):
+        FormulaEngine.plan({"broken": "nofunc(1)"})
+
+    plan = FormulaEngine.plan({"cost": "calls * rate", "margin": "cost * markup"})
+    with pytest.raises(ValueError, match="Formula 'cost' is missing input variables: rate"):
+        plan.run({"calls": 10, "markup": 1.2})
+
+
+def test_calculate_columns_matches_row_by_row():
+    """Columnar evaluation should match evaluating each row on its own"""
+    formulas = {
+        "best": "max(a, b, 0)",
+        "capped": "min(cashflows)",
+        "value": "npv(rate, cashflows) if best > 1 else avg(cashflows)",
+        "payment": "pmt(rate + 0.01, 12, value)",
+        "flag": "a > 0 and b < 2",
+        "ratio": "a / b",
+    }
+    columns = {
+        "a": np.array([3.0, -1.0, 0.5, 2.0]),
+        "b": np.array([1.0, 4.0, 0.0, -2.0]),
+        "rate": np.array([0.1, 0.05, 0.0, 0.2]),
+        "cashflows": np.array([[100.0, 200.0, 300.0], [50.0, 50.0, 50.0], [0.0, 10.0, 20.0], [5.0, 4.0, 3.0]]),
+    }
+
+    results = FormulaEngine.calculate_columns(columns, formulas)
+
+    for row in range(4):
+        inputs = {name: column[row].tolist() for name, column in columns.items()}
+        if inputs["b"] == 0:
+            # Division by zero yields inf per row instead of failing the batch
+            assert np.isinf(results["ratio"][row])
+            continue
+        expected = FormulaEngine.calculate_roi_metrics(inputs, formulas)
+        for name, value in expected.items():
+            assert results[name][row] == pytest.approx(value)
+
+    constant = FormulaEngine.calculate_columns({"a": np.arange(5)}, {"fee": "100", "total": "a + fee"})
+    assert constant["fee"].tolist() == [100] * 5
+    assert constant["total"].tolist() == [100, 101, 102, 103, 104]
+
+    with pytest.raises(ValueError, match="cannot be evaluated by column"):
+        FormulaEngine.calculate_columns({"n": np.arange(3)}, {"items": "range(n)"})
+
+
+def test_calculate_columns_refuses_attributes():
+    """Attributes and methods of the NumPy columns can't be reached, so formulas can't write files"""
+    for formula in ("x.tofile('/tmp/formula-out')", "x.dump('/tmp/formula-out')", "x.tobytes()", "x.shape", "x.T"):
+        with pytest.raises(ValueError, match="cannot be evaluated by column"):
+            FormulaEngine.calculate_columns({"x": np.arange(3)}, {"out": formula})
+
+
+def test_calculate_columns_division_by_zero():
+    """Division, floor division and modulo by zero give inf or nan, on integer columns too"""
+    columns = {"a": np.array([7, -7, 0, 9]), "b": np.array([0, 0, 0, 2])}
+    results = FormulaEngine.calculate_columns(columns, {"ratio": "a / b", "floored": "a // b", "rest": "a % b"})
+
+    for name in ("ratio", "floored"):
+        assert results[name][:2].tolist() == [np.inf, -np.inf]
+        assert np.isnan(results[name][2])
+    assert np.isnan(results["rest"][:3]).all()
+    assert (results["ratio"][3], results["floored"][3], results["rest"][3]) == (4.5, 4.0, 1.0)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+from app.executor import ExecutorBusy
+from app.services import passwords
+from app.services.passwords import PasswordHasher, TooManyAttempts
+
+
+def slow_verify(password, hashed_password):
+    time.sleep(0.2)
+    return password == hashed_password
+
+
+def test_password_hasher_admission_control(monkeypatch):
+    """A client's attempts beyond its cap give up after client_timeout, and the pool sheds load when full"""
+    monkeypatch.setattr(passwords, "verify_password", slow_verify)
+    hasher = PasswordHasher(max_workers=1, max_pending=0, queue_timeout=0.05, max_per_client=1, client_timeout=0.05)
+
+    async def scenario():
+        first = asyncio.ensure_future(hasher.verify("secret", "secret", "10.0.0.1"))
+        await asyncio.sleep(0.02)
+
+        with pytest.raises(TooManyAttempts):
+            await hasher.verify("secret", "secret", "10.0.0.1")
+        with pytest.raises(ExecutorBusy):
+            await hasher.verify("secret", "secret", "10.0.0.2")
+
+        assert hasher.stats()["in_flight"] == 1
+        assert await first is True
+
+    asyncio.run(scenario())
+
+    stats = hasher.stats()
+    assert stats["in_flight"] == 0 and stats["clients"] == 0
+    assert stats["throttled"] == 1 and stats["rejected"] == 1
+
+
+def test_password_hasher_queues_attempts_over_the_client_cap(monkeypatch):
+    """Attempts from one address beyond its cap wait their turn instead of failing"""
+    monkeypatch.setattr(passwords, "verify_password", slow_verify)
+    hasher = PasswordHasher(max_workers=2, max_pending=0, queue_timeout=0.05, max_per_client=1, client_timeout=1.0)
+
+    async def scenario():
+        attempts = [asyncio.ensure_future(hasher.verify("secret", "secret", "10.0.0.1")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        stats = hasher.stats()
+        assert stats["in_flight"] == 1 and stats["client_waiting"] == 2
+        return await asyncio.gather(*attempts)
+
+    started = time.monotonic()
+    assert asyncio.run(scenario()) == [True, True, True]
+    assert time.monotonic() - started >= 0.6  # One at a time
+    stats = hasher.stats()
+    assert stats["throttled"] == 0 and stats["clients"] == 0
+
+
+def test_password_pool_stats_require_an_admin(monkeypatch):
+    """Pool statistics are served to admins only"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.middleware.auth import require_admin
+
+    client = TestClient(app)
+    assert client.get("/api/auth/password-pool").status_code == 403
+
+    monkeypatch.setitem(app.dependency_overrides, require_admin, lambda: None)
+    assert "throttled" in client.get("/api/auth/password-pool").json()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
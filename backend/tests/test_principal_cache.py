@@ -0,0 +1,58 @@
+import time
+import uuid
+
+import pytest
+from app.models.organization import Organization
+from app.models.user import User
+from app.services.calculator_cache import LocalInvalidationBus
+from app.services.principal_cache import PrincipalCache
+
+
+def make_user(**fields) -> User:
+    return User(id=uuid.uuid4(), email="ana@example.com", organization_id=uuid.uuid4(),
+                role="admin", is_active=True, **fields)
+
+
+def test_principal_cache_hits_and_invalidation():
+    """Verified tokens are served from cache until the user is invalidated"""
+    cache = PrincipalCache(max_entries=10, ttl_seconds=60)
+    user = make_user()
+    claims = {"sub": str(user.id), "exp": time.time() + 600}
+
+    assert cache.get_user("token-a") is None
+    cache.set_user("token-a", claims, user, cache.generation)
+
+    cached_claims, cached_user = cache.get_user("token-a")
+    assert cached_claims == claims
+    assert cached_user is not user and cached_user.id == user.id and cached_user.role == "admin"
+
+    cache.invalidate_user(user.id)
+    assert cache.get_user("token-a") is None
+
+    # An invalidation during the lookup keeps the stale row out of the cache
+    generation = cache.generation
+    cache.invalidate_user(user.id)
+    cache.set_user("token-a", claims, user, generation)
+    assert cache.get_user("token-a") is None
+
+
+def test_principal_cache_respects_token_expiry_and_shared_invalidations():
+    """Expired tokens miss, and invalidations reach other workers through the bus"""
+    bus = LocalInvalidationBus()
+    worker_a = PrincipalCache(bus=bus)
+    worker_b = PrincipalCache(bus=bus)
+    user = make_user()
+
+    worker_b.set_user("expired", {"exp": time.time() - 1}, user, worker_b.generation)
+    assert worker_b.get_user("expired") is None
+
+    organization = Organization(id=user.organization_id, name="Acme", slug="acme")
+    worker_b.set_organization(organization, worker_b.generation)
+    assert worker_b.get_organization(user.organization_id).slug == "acme"
+
+    worker_a.invalidate_organization(user.organization_id)
+    assert worker_b.get_organization(user.organization_id) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
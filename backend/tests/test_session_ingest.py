@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+from app.services.session_ingest import SessionIngestQueue
+
+
+def reject_invalid(sql, statement, rows):
+    """Fails an INSERT holding a row marked invalid, as a constraint violation would"""
+    if any(row.get("invalid") for row in rows):
+        raise IntegrityError(sql, rows, Exception("constraint violated"))
+
+
+def make_row(i):
+    return {"session_token": f"token-{i}", "inputs": {"calls": i}}
+
+
+def test_session_ingest_writes_in_batches(fake_db):
+    """Queued rows are inserted in batches of at most batch_size"""
+    session = fake_db()
+    ingest = SessionIngestQueue(lambda: session, batch_size=4, max_queue=100, flush_interval=60)
+
+    for i in range(10):
+        assert ingest.submit(make_row(i))
+    assert ingest.is_pending("token-3")
+
+    assert ingest.flush() == 10
+    assert [len(batch) for batch in session.batches] == [4, 4, 2]
+    assert not ingest.is_pending("token-3")
+    assert ingest.stats() == {"queued": 0, "written": 10, "dropped": 0}
+
+
+def test_session_ingest_bounds_memory_and_retries(fake_db):
+    """A full queue refuses rows, and failed batches are retried"""
+    session = fake_db(failures=1)
+    ingest = SessionIngestQueue(lambda: session, batch_size=10, max_queue=2, flush_interval=60, max_retries=1)
+
+    assert ingest.submit(make_row(1))
+    assert ingest.submit(make_row(2))
+    assert not ingest.submit(make_row(3))
+    assert not ingest.is_pending("token-3")
+
+    ingest.ensure_written("token-1")
+    assert session.batches == [[make_row(1), make_row(2)]]
+
+    session.failures = 2
+    ingest.submit(make_row(4))
+    assert ingest.flush() == 0
+    assert ingest.stats()["dropped"] == 1
+
+
+def test_session_ingest_drops_only_invalid_rows(fake_db):
+    """A batch the database rejects is split, so only the invalid row is dropped, without retries"""
+    session = fake_db(reject_invalid)
+    ingest = SessionIngestQueue(lambda: session, batch_size=8, max_queue=100, flush_interval=60, max_retries=3)
+
+    for i in range(8):
+        assert ingest.submit({**make_row(i), "invalid": i == 5})
+
+    assert ingest.flush() == 7
+    assert sorted(row["session_token"] for batch in session.batches for row in batch) == [
+        f"token-{i}" for i in range(8) if i != 5
+    ]
+    assert ingest.stats() == {"queued": 0, "written": 7, "dropped": 1}
+    assert not ingest.is_pending("token-5")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
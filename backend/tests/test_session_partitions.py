@@ -0,0 +1,94 @@
+from contextlib import nullcontext
+from datetime import date, datetime
+
+import pytest
+from app.services.session_partitions import (
+    PartitionMaintainer, add_months, ensure_partitions, expire_partitions, month_start
+)
+
+
+def partition_listing(partitions):
+    """Answers the partition listing query with `partitions`"""
+    return lambda sql, statement, params: partitions if "pg_inherits" in sql else None
+
+
+def test_add_months_wraps_years():
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+
+def test_ensure_partitions_creates_missing_months(fake_db):
+    """Only months without a partition are created"""
+    conn = fake_db(partition_listing(["calculator_sessions_p202610"]))
+    created = ensure_partitions(conn, date(2026, 10, 16), date(2026, 12, 1))
+
+    assert created == ["calculator_sessions_p202611", "calculator_sessions_p202612"]
+    assert "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')" in conn.statements[-1]
+
+
+def test_ensure_partitions_moves_rows_out_of_the_default_partition(fake_db):
+    """A month with rows in the default partition is filled from it, then attached"""
+    def query(sql, statement, params):
+        if "pg_inherits" in sql:
+            return ["calculator_sessions_default", "calculator_sessions_p202610"]
+        if "SELECT EXISTS" in sql:
+            return [params["start"] == date(2026, 11, 1)]
+
+    conn = fake_db(query)
+    created = ensure_partitions(conn, date(2026, 10, 16), date(2026, 12, 1))
+
+    assert created == ["calculator_sessions_p202611", "calculator_sessions_p202612"]
+    assert conn.queries == 3  # The listing, and a row check per missing month
+    create, move, attach, create_next = conn.statements
+    assert create.startswith('CREATE TABLE "calculator_sessions_p202611" (LIKE calculator_sessions')
+    assert "DELETE FROM calculator_sessions_default" in move
+    assert 'INSERT INTO "calculator_sessions_p202611"' in move
+    assert conn.batches[0] == {"start": date(2026, 11, 1), "end": date(2026, 12, 1)}
+    assert attach == ('ALTER TABLE calculator_sessions ATTACH PARTITION "calculator_sessions_p202611" '
+                      "FOR VALUES FROM ('2026-11-01') TO ('2026-12-01')")
+    assert 'PARTITION OF calculator_sessions' in create_next
+
+
+def test_expire_partitions_keeps_retention_window(fake_db):
+    """Partitions that ended before the retention window are detached and archived or dropped"""
+    partitions = ["calculator_sessions_default", "calculator_sessions_p202409",
+                  "calculator_sessions_p202410", "calculator_sessions_p202411"]
+
+    conn = fake_db(partition_listing(partitions))
+    assert expire_partitions(conn, 24, today=date(2026, 10, 16)) == ["calculator_sessions_p202409"]
+    assert conn.statements == [
+        'ALTER TABLE calculator_sessions DETACH PARTITION "calculator_sessions_p202409"',
+        'DROP TABLE "calculator_sessions_p202409"',
+    ]
+
+    conn = fake_db(partition_listing(partitions))
+    expire_partitions(conn, 24, archive_schema="archive", today=date(2026, 10, 16))
+    assert conn.statements[-1] == 'ALTER TABLE "calculator_sessions_p202409" SET SCHEMA "archive"'
+
+    assert expire_partitions(fake_db(partition_listing(partitions)), 0) == []
+
+
+def test_startup_creates_next_months_partition(fake_db, monkeypatch):
+    """The app's startup hook maintains partitions, so next month's exists before its first session"""
+    from app import main
+
+    conn = fake_db(partition_listing(["calculator_sessions_default"]))
+    maintainer = PartitionMaintainer(connect=lambda: nullcontext(conn), interval=0)
+    monkeypatch.setattr(main, "get_partition_maintainer", lambda: maintainer)
+
+    main.start_partition_maintenance()
+
+    next_month = add_months(month_start(datetime.utcnow().date()), 1)
+    assert conn.statements[0].startswith("SELECT pg_advisory_xact_lock")
+    assert any(f'"calculator_sessions_p{next_month:%Y%m}" PARTITION OF' in sql for sql in conn.statements)
+    main.stop_partition_maintenance()
+
+
+def test_failed_maintenance_is_logged_not_raised(fake_db):
+    """A database error at startup doesn't stop the app from starting"""
+    conn = fake_db(failures=1)
+    assert PartitionMaintainer(connect=lambda: nullcontext(conn), interval=0).run_once() is False
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
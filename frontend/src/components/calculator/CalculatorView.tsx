@@ -57,6 +57,8 @@ export default function CalculatorView({ orgSlug, calcSlug, embedded = false }:
   const [leadName, setLeadName] = useState('');
   const [leadCompany, setLeadCompany] = useState('');
   const [leadCaptured, setLeadCaptured] = useState(false);
+  // When the visitor opened the calculator, sent with each calculation for time-to-complete analytics
+  const [startedAt] = useState(() => new Date().toISOString());
 
   const API_BASE = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
@@ -99,7 +101,9 @@ export default function CalculatorView({ orgSlug, calcSlug, embedded = false }:
 
     setCalculating(true);
     try {
-      const response = await axios.post(`${API_BASE}/api/calculators/public/${orgSlug}/${calcSlug}/calculate`, inputs);
+      const response = await axios.post(`${API_BASE}/api/calculators/public/${orgSlug}/${calcSlug}/calculate`, inputs, {
+        params: { started_at: startedAt },
+      });
       setResults(response.data.results);
       setSessionToken(response.data.session_token);
 
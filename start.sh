@@ -7,4 +7,5 @@ echo "Working directory: $(pwd)"
 echo "Contents: $(ls -la)"
 
 echo "Starting uvicorn server..."
-exec uvicorn app.main:app --host 0.0.0.0 --port ${PORT:-8000}
\ No newline at end of file
+# Trust X-Forwarded-For from the platform proxy, so client IPs (per-IP limits) are real
+exec uvicorn app.main:app --host 0.0.0.0 --port ${PORT:-8000} --proxy-headers --forwarded-allow-ips "${FORWARDED_ALLOW_IPS:-*}"
\ No newline at end of file